@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Proteção das rotas administrativas (inicialização do banco e estatísticas internas)
+
+Com app.config['TOKEN_ADMIN'] (variável DASHBOARD_TOKEN_ADMIN), a requisição
+precisa enviar o token no cabeçalho X-Token-Admin. Sem token configurado, as
+rotas só atendem requisições da própria máquina.
+"""
+
+import hmac
+from functools import wraps
+from flask import current_app, jsonify, request
+
+CABECALHO_TOKEN_ADMIN = 'X-Token-Admin'
+ENDERECOS_LOCAIS = ('127.0.0.1', '::1')
+
+
+def exigir_admin(view):
+    """Decorator que responde 403 a requisições sem o token de administração"""
+    @wraps(view)
+    def protegida(*args, **kwargs):
+        token = current_app.config.get('TOKEN_ADMIN')
+        if token:
+            autorizado = hmac.compare_digest(request.headers.get(CABECALHO_TOKEN_ADMIN, ''), token)
+        else:
+            autorizado = request.remote_addr in ENDERECOS_LOCAIS
+        if not autorizado:
+            return jsonify({'success': False, 'error': 'Acesso não autorizado'}), 403
+        return view(*args, **kwargs)
+    return protegida
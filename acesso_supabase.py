@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Acesso assíncrono ao Supabase (PostgREST) para as consultas feitas a cada clique
+
+Em vez de uma chamada bloqueante por tabela (setor, depois indicador, depois
+valores), cada operação usa selects embutidos para trazer os dados relacionados
+em uma só requisição, e as chamadas independentes rodam ao mesmo tempo com
+asyncio.gather. As requisições saem de um único loop de eventos por processo,
+com conexões HTTP mantidas abertas entre os cliques.
+
+O httpx já é dependência do cliente supabase.
+"""
+
+import os
+import asyncio
+import threading
+import httpx
+from consulta_series import argumentos_rpc_serie, resposta_serie
+
+TIMEOUT_PADRAO = 10  # Segundos por requisição
+CONEXOES_PADRAO = 10  # Conexões HTTP mantidas abertas por processo
+
+
+class AcessoSupabase:
+    """Cliente assíncrono da API REST do Supabase, usado a partir das views síncronas do Flask via executar()"""
+
+    def __init__(self, url, chave, timeout=TIMEOUT_PADRAO, max_conexoes=CONEXOES_PADRAO):
+        self.url_rest = url.rstrip('/') + '/rest/v1'
+        self.cabecalhos = {'apikey': chave, 'Authorization': f'Bearer {chave}'}
+        self.timeout = timeout
+        self.max_conexoes = max_conexoes
+        self._trava = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._cliente = None
+
+    def _obter_loop(self):
+        """Um loop de eventos em uma thread por processo (threads não sobrevivem a um fork)"""
+        with self._trava:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._cliente = None
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='acesso-supabase', daemon=True).start()
+            return self._loop
+
+    def executar(self, corrotina):
+        """Executa uma corrotina no loop do processo e retorna o resultado (bloqueia a thread chamadora)"""
+        futuro = asyncio.run_coroutine_threadsafe(corrotina, self._obter_loop())
+        return futuro.result()
+
+    def _cliente_http(self):
+        # Criado dentro do loop, na primeira requisição
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                base_url=self.url_rest,
+                headers=self.cabecalhos,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_conexoes, max_keepalive_connections=self.max_conexoes)
+            )
+        return self._cliente
+
+    async def selecionar(self, tabela, **parametros):
+        """GET em uma tabela com parâmetros do PostgREST (select, filtros, order, limit)"""
+        resposta = await self._cliente_http().get(f'/{tabela}', params=parametros)
+        resposta.raise_for_status()
+        return resposta.json()
+
+    async def inserir(self, tabela, registros, on_conflict=None, retornar=True, ignorar_duplicados=False):
+        """POST de um registro ou lista de registros; com on_conflict, faz upsert nas colunas indicadas
+
+        Com ignorar_duplicados, as linhas que já existem ficam como estão e não são retornadas.
+        """
+        preferencias = ['return=representation' if retornar else 'return=minimal']
+        parametros = {}
+        if on_conflict:
+            preferencias.append('resolution=ignore-duplicates' if ignorar_duplicados else 'resolution=merge-duplicates')
+            parametros['on_conflict'] = on_conflict
+
+        resposta = await self._cliente_http().post(
+            f'/{tabela}', json=registros, params=parametros, headers={'Prefer': ','.join(preferencias)}
+        )
+        resposta.raise_for_status()
+        return resposta.json() if retornar else None
+
+    async def rpc(self, funcao, argumentos):
+        """Chama uma função SQL exposta pelo PostgREST"""
+        resposta = await self._cliente_http().post(f'/rpc/{funcao}', json=argumentos)
+        resposta.raise_for_status()
+        return resposta.json()
+
+    async def buscar_indicador(self, setor, indicador, com_valores=False):
+        """Retorna o indicador com o setor embutido (e os valores, se pedido) em uma única requisição, ou None"""
+        select = 'id,nome,setor:setores!inner(id,nome)'
+        parametros = {'nome': f'eq.{indicador}', 'setor.nome': f'eq.{setor}', 'limit': 1}
+        if com_valores:
+            select += ',valores:valores_indicadores(data,valor,meta)'
+            parametros['valores.order'] = 'data.asc'
+
+        indicadores = await self.selecionar('indicadores', select=select, **parametros)
+        return indicadores[0] if indicadores else None
+
+    async def semear(self, setores, indicadores_por_setor):
+        """Cadastra os setores e indicadores que faltarem, em duas requisições; pode rodar a cada início"""
+        # merge-duplicates devolve também os setores que já existiam, com os IDs
+        setores_db = await self.inserir('setores', [{'nome': nome} for nome in setores], on_conflict='nome')
+        ids_setores = {setor['nome']: setor['id'] for setor in setores_db}
+
+        registros = [
+            {'nome': indicador, 'setor_id': ids_setores[setor]}
+            for setor, indicadores in indicadores_por_setor.items() if setor in ids_setores
+            for indicador in indicadores
+        ]
+        if registros:
+            await self.inserir('indicadores', registros, on_conflict='setor_id,nome', retornar=False, ignorar_duplicados=True)
+
+    async def carregar_catalogo(self):
+        """Setores (id, nome) e indicadores (id, nome, setor_id), lidos ao mesmo tempo, para o catálogo"""
+        setores, indicadores = await asyncio.gather(
+            self.selecionar('setores', select='id,nome'),
+            self.selecionar('indicadores', select='id,nome,setor_id')
+        )
+        return (
+            [(setor['id'], setor['nome']) for setor in setores],
+            [(indicador['id'], indicador['nome'], indicador['setor_id']) for indicador in indicadores]
+        )
+
+    async def criar_indicador(self, setor_id, nome):
+        """Cria o indicador com um upsert em (setor_id, nome) e retorna o ID, já existindo ou não"""
+        indicadores = await self.inserir('indicadores', {'nome': nome, 'setor_id': setor_id}, on_conflict='setor_id,nome')
+        return indicadores[0]['id']
+
+    async def consultar_serie(self, indicador_id, parametros):
+        """Série de um indicador pela função consultar_serie; retorna a resposta de resposta_serie"""
+        pontos = await self.rpc('consultar_serie', argumentos_rpc_serie(indicador_id, parametros))
+        linhas = [(ponto['data'], ponto['valor'], ponto['meta'], ponto['quantidade'], ponto['total']) for ponto in pontos]
+        return resposta_serie(linhas, parametros)
+
+    async def salvar_valor(self, indicador_id, data, valor, meta=None):
+        """Grava um valor do indicador; a mesma data enviada de novo substitui o valor anterior"""
+        await self.gravar_valores([{
+            'indicador_id': indicador_id,
+            'data': data,
+            'valor': valor,
+            'meta': meta
+        }])
+
+    async def gravar_valores(self, registros):
+        """Upsert de valores em (indicador_id, data)"""
+        await self.inserir('valores_indicadores', registros, on_conflict='indicador_id,data', retornar=False)
+
+    async def atualizar_agregados(self, indicador_id, desde=None):
+        """Recalcula os agregados do indicador a partir de desde (todos, com None) pela função de sql/agregados.sql"""
+        await self.rpc('atualizar_agregados', {'p_indicador_id': indicador_id, 'p_desde': desde})
+
+    async def agregados(self, indicadores_ids, periodo):
+        """Agregados de um período para uma lista de indicadores, em ordem de data"""
+        return await self.selecionar(
+            'agregados_indicadores',
+            indicador_id=f"in.({','.join(str(indicador_id) for indicador_id in indicadores_ids)})",
+            periodo=f'eq.{periodo}',
+            order='inicio.asc'
+        )
+
+    async def data_mais_recente(self, indicador_id):
+        """Data mais recente já gravada para o indicador (texto ISO), ou None se não houver valores"""
+        valores = await self.selecionar(
+            'valores_indicadores', select='data', indicador_id=f'eq.{indicador_id}', order='data.desc', limit=1
+        )
+        return valores[0]['data'] if valores else None
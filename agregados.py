@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Agregados pré-calculados dos indicadores por mês, trimestre e ano
+
+Para cada indicador e período ficam guardados o último valor, a média, o
+mínimo, o máximo, a meta do último valor e o atingimento (último valor sobre a
+meta, em %). A visão de um setor inteiro sai desses agregados em uma consulta,
+em vez de uma chamada de /get_dados por indicador.
+  - nos apps com banco, ficam na tabela agregados_indicadores, atualizada por
+    SQL_ATUALIZAR_AGREGADOS (PostgreSQL) ou pela função atualizar_agregados
+    (sql/agregados.sql, chamada por RPC no Supabase);
+  - no app sem banco, ficam em arquivos Parquet por versão de aba
+    (AgregadosArquivo), com a versão dada pelo conteúdo (versao_aba).
+A atualização é incremental: só os períodos a partir da data alterada são
+recalculados.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+import pandas as pd
+from consulta_series import PERIODOS
+
+ULTIMOS_PADRAO = 12  # Períodos por indicador na visão do setor
+FREQUENCIAS = {'mes': 'M', 'trimestre': 'Q', 'ano': 'Y'}  # Período -> frequência do pandas
+LIMITE_AGREGADOS_PADRAO = 64 * 1024 * 1024  # Tamanho máximo dos arquivos de agregados
+COLUNAS_AGREGADOS = ['periodo', 'inicio', 'ultimo', 'media', 'minimo', 'maximo', 'meta', 'atingimento', 'quantidade']
+
+# Recalcula os agregados de um indicador a partir de %(desde)s (ou todos, com None)
+SQL_ATUALIZAR_AGREGADOS = f"""
+    INSERT INTO agregados_indicadores
+        (indicador_id, periodo, inicio, ultimo, media, minimo, maximo, meta, atingimento, quantidade)
+    SELECT %(indicador_id)s, p.periodo, a.inicio, a.ultimo, a.media, a.minimo, a.maximo, a.meta,
+           CASE WHEN a.meta <> 0 THEN a.ultimo / a.meta * 100 END, a.quantidade
+    FROM (VALUES {', '.join(f"('{periodo}', '{unidade}')" for periodo, unidade in PERIODOS.items())}) AS p (periodo, unidade)
+    CROSS JOIN LATERAL (
+        SELECT date_trunc(p.unidade, v.data) AS inicio,
+               (array_agg(v.valor ORDER BY v.data DESC))[1] AS ultimo,
+               avg(v.valor) AS media,
+               min(v.valor) AS minimo,
+               max(v.valor) AS maximo,
+               (array_agg(v.meta ORDER BY v.data DESC))[1] AS meta,
+               count(*) AS quantidade
+        FROM valores_indicadores v
+        WHERE v.indicador_id = %(indicador_id)s
+          AND (%(desde)s::timestamp IS NULL OR v.data >= date_trunc(p.unidade, %(desde)s::timestamp))
+        GROUP BY 1
+    ) AS a
+    ON CONFLICT (indicador_id, periodo, inicio) DO UPDATE SET
+        ultimo = EXCLUDED.ultimo,
+        media = EXCLUDED.media,
+        minimo = EXCLUDED.minimo,
+        maximo = EXCLUDED.maximo,
+        meta = EXCLUDED.meta,
+        atingimento = EXCLUDED.atingimento,
+        quantidade = EXCLUDED.quantidade
+"""
+
+# Últimos %(ultimos)s períodos de cada indicador da lista, em ordem de data
+SQL_VISAO_SETOR = """
+    SELECT indicador_id, periodo, inicio, ultimo, media, minimo, maximo, meta, atingimento, quantidade
+    FROM (
+        SELECT a.*, row_number() OVER (PARTITION BY indicador_id ORDER BY inicio DESC) AS ordem
+        FROM agregados_indicadores a
+        WHERE indicador_id = ANY(%(indicadores)s) AND periodo = %(periodo)s
+    ) AS recentes
+    WHERE ordem <= %(ultimos)s
+    ORDER BY indicador_id, inicio
+"""
+
+
+def ler_parametros_visao(args):
+    """Valida os parâmetros da visão do setor (periodo, ultimos); levanta ValueError com a mensagem para o usuário"""
+    periodo = args.get('periodo') or 'mes'
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período não suportado: {periodo} (use {', '.join(PERIODOS)})")
+
+    try:
+        ultimos = int(args['ultimos']) if args.get('ultimos') else ULTIMOS_PADRAO
+    except ValueError:
+        raise ValueError(f"Parâmetro ultimos inválido: {args['ultimos']}")
+    if ultimos < 1:
+        raise ValueError("Parâmetro ultimos deve ser no mínimo 1")
+
+    return {'periodo': periodo, 'ultimos': ultimos}
+
+
+def _inicio_periodo(datas, periodo):
+    return datas.dt.to_period(FREQUENCIAS[periodo]).dt.start_time
+
+
+def _inicio_de(data, periodo):
+    return pd.Timestamp(data).to_period(FREQUENCIAS[periodo]).start_time
+
+
+def calcular_agregados(df_valores, desde=None):
+    """Agregados de um DataFrame com data, valor e meta (de migracao.preparar_valores), com as COLUNAS_AGREGADOS
+
+    Com desde, só os períodos que começam a partir do período de desde são calculados.
+    """
+    ordenado = df_valores.sort_values('data', kind='stable')
+    partes = []
+
+    for periodo in PERIODOS:
+        inicio = _inicio_periodo(ordenado['data'], periodo)
+        selecionado = ordenado.assign(inicio=inicio)
+        if desde is not None:
+            selecionado = selecionado[inicio >= _inicio_de(desde, periodo)]
+        if selecionado.empty:
+            continue
+
+        grupos = selecionado.groupby('inicio')
+        # O último valor do período, mesmo se for nulo (como o array_agg do SQL)
+        ultimas = selecionado.drop_duplicates('inicio', keep='last').set_index('inicio')
+        agregado = pd.DataFrame({
+            'ultimo': ultimas['valor'],
+            'media': grupos['valor'].mean(),
+            'minimo': grupos['valor'].min(),
+            'maximo': grupos['valor'].max(),
+            'meta': ultimas['meta'],
+            'quantidade': grupos.size()
+        })
+        agregado['atingimento'] = (agregado['ultimo'] / agregado['meta'].where(agregado['meta'] != 0)) * 100
+        partes.append(agregado.reset_index().assign(periodo=periodo))
+
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_AGREGADOS)
+    return pd.concat(partes, ignore_index=True)[COLUNAS_AGREGADOS]
+
+
+def pontos_agregados(linhas):
+    """Converte linhas de agregados (dicts ou registros do DataFrame) nos pontos da resposta da API"""
+    pontos = []
+    for linha in linhas:
+        ponto = {}
+        for coluna in COLUNAS_AGREGADOS[1:]:
+            valor = linha[coluna]
+            if coluna == 'inicio':
+                valor = valor.isoformat() if hasattr(valor, 'isoformat') else valor
+            elif valor is not None and pd.isna(valor):
+                valor = None
+            elif coluna == 'quantidade':
+                valor = int(valor)
+            elif valor is not None:
+                valor = float(valor)
+            ponto[coluna] = valor
+        pontos.append(ponto)
+    return pontos
+
+
+def pontos_por_indicador(linhas, indicadores):
+    """Agrupa linhas de agregados_indicadores em {indicador: pontos}, com indicadores como {nome: id}"""
+    linhas_por_id = {indicador_id: [] for indicador_id in indicadores.values()}
+    for linha in linhas:
+        linhas_por_id[linha['indicador_id']].append(linha)
+    return {nome: pontos_agregados(linhas_por_id[indicador_id]) for nome, indicador_id in indicadores.items()}
+
+
+def resposta_visao_setor(setor, parametros, pontos_por_indicador):
+    """Monta a resposta da visão do setor a partir de {indicador: pontos em ordem de data}"""
+    indicadores = []
+    for indicador, pontos in pontos_por_indicador.items():
+        pontos = pontos[-parametros['ultimos']:]
+        indicadores.append({
+            'indicador': indicador,
+            'atual': pontos[-1] if pontos else None,
+            'pontos': pontos
+        })
+
+    return {
+        'setor': setor,
+        'periodo': parametros['periodo'],
+        'indicadores': indicadores
+    }
+
+
+def versao_aba(sessao, nome_planilha, nome_aba):
+    """Versão do conteúdo de uma aba na sessão, ou None se a planilha não tiver hash
+
+    Começa no hash do arquivo enviado e muda a cada lote de linhas anexado
+    (avancar_versao_aba); sessões com o mesmo conteúdo têm a mesma versão.
+    """
+    versao = sessao.get('versoes_abas', {}).get((nome_planilha, nome_aba))
+    if versao is not None:
+        return versao
+    return sessao.get('hashes_planilhas', {}).get(nome_planilha)
+
+
+def registrar_planilha(sessao, nome_planilha, hash_arquivo):
+    """Guarda o hash de uma planilha recebida e descarta as versões das abas da versão anterior"""
+    sessao.setdefault('hashes_planilhas', {})[nome_planilha] = hash_arquivo
+    versoes = sessao.get('versoes_abas', {})
+    for chave in [chave for chave in versoes if chave[0] == nome_planilha]:
+        del versoes[chave]
+
+
+def avancar_versao_aba(sessao, nome_planilha, nome_aba, df_novos):
+    """Encadeia as linhas anexadas à versão da aba; retorna (versão anterior, versão nova), ou (None, None) sem hash"""
+    anterior = versao_aba(sessao, nome_planilha, nome_aba)
+    if anterior is None:
+        return None, None
+
+    sha1 = hashlib.sha1(anterior.encode('utf-8'))
+    sha1.update('\0'.join(str(col) for col in df_novos.columns).encode('utf-8'))
+    sha1.update(pd.util.hash_pandas_object(df_novos.astype(str), index=False).values.tobytes())
+    versao = sha1.hexdigest()
+    sessao.setdefault('versoes_abas', {})[(nome_planilha, nome_aba)] = versao
+    return anterior, versao
+
+
+class AgregadosArquivo:
+    """Agregados das abas de planilhas em arquivos Parquet, endereçados pela versão do conteúdo da aba
+
+    Como a chave é o conteúdo (versao_aba), sessões com versões diferentes da
+    mesma planilha nunca leem nem sobrescrevem os agregados umas das outras.
+    Acima de limite_bytes, os arquivos usados há mais tempo são removidos.
+    """
+
+    def __init__(self, diretorio, limite_bytes=LIMITE_AGREGADOS_PADRAO):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._trava = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, versao, nome_aba):
+        nome = hashlib.sha1(f"{versao}\0{nome_aba}".encode('utf-8')).hexdigest()
+        return os.path.join(self.diretorio, f"{nome}.parquet")
+
+    def _ler(self, caminho):
+        try:
+            agregados = pd.read_parquet(caminho)
+        except (FileNotFoundError, OSError):
+            return None
+        try:
+            os.utime(caminho)  # Marca o uso para a remoção dos mais antigos
+        except OSError:
+            pass
+        return agregados
+
+    def _gravar(self, caminho, agregados):
+        # Arquivo temporário + os.replace: leitores nunca veem um arquivo pela metade
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        os.close(fd)
+        try:
+            agregados.to_parquet(temporario, index=False)
+            os.replace(temporario, caminho)
+        except Exception:
+            os.remove(temporario)
+            raise
+        self._limitar()
+
+    def _limitar(self):
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.name.endswith('.parquet'):
+                try:
+                    info = entrada.stat()
+                except OSError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.limite_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+
+    def obter(self, versao, nome_aba, obter_valores):
+        """Agregados da aba, calculados e gravados na primeira vez, ou None se a aba não tiver valores
+
+        obter_valores() retorna o DataFrame de migracao.preparar_valores (ou None) e
+        só é chamada se os agregados ainda não existirem. Sem versão, os agregados
+        são calculados sem serem gravados.
+        """
+        caminho = self._caminho(versao, nome_aba) if versao is not None else None
+        if caminho is not None:
+            agregados = self._ler(caminho)
+            if agregados is not None:
+                return agregados
+
+        df_valores = obter_valores()
+        if df_valores is None:
+            return None
+        agregados = calcular_agregados(df_valores)
+        if caminho is not None:
+            with self._trava:
+                self._gravar(caminho, agregados)
+        return agregados
+
+    def atualizar(self, versao_anterior, versao, nome_aba, df_valores, desde):
+        """Grava os agregados da versão nova recalculando só os períodos a partir de desde (data das linhas novas)
+
+        Os períodos anteriores vêm dos agregados da versão anterior, se existirem.
+        """
+        if versao is None:
+            return None
+
+        with self._trava:
+            existentes = self._ler(self._caminho(versao_anterior, nome_aba)) if versao_anterior is not None else None
+            if existentes is None:
+                agregados = calcular_agregados(df_valores)
+            else:
+                # Manter os períodos que terminam antes de desde e recalcular o restante
+                limites = {periodo: _inicio_de(desde, periodo) for periodo in PERIODOS}
+                mantidos = existentes[existentes['inicio'] < existentes['periodo'].map(limites)]
+                novos = calcular_agregados(df_valores, desde)
+                partes = [parte for parte in (mantidos, novos) if not parte.empty]
+                agregados = pd.concat(partes, ignore_index=True) if partes else novos
+            self._gravar(self._caminho(versao, nome_aba), agregados)
+        return agregados
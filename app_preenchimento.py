@@ -4,7 +4,6 @@
 from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')  # Usar backend não interativo
 import os
@@ -12,20 +11,101 @@ import io
 import base64
 import json
 import uuid
+import time
 from datetime import datetime
 import tempfile
 from werkzeug.utils import secure_filename
+from carregador_planilhas import (
+    ler_planilha, ler_varias_planilhas, extrair_planilhas_zip, formatar_tempos_abas, EXTENSOES_PLANILHA,
+    LIMITE_STREAMING_PADRAO, LIMITE_PARALELO_PADRAO, WORKERS_LEITURA_PADRAO, WORKERS_LOTE_PADRAO,
+    LIMITE_DESCOMPACTADO_PADRAO
+)
+from cache_planilhas import CachePlanilhas, calcular_hash_arquivo, salvar_com_hash, LIMITE_CACHE_PADRAO
+from requisicao_upload import RequisicaoUpload, MEMORIA_UPLOAD_PADRAO, LIMITE_UPLOAD_PADRAO
+from graficos import (
+    CacheGraficos, gerar_chave_grafico, chave_grafico_valida, renderizar_grafico, extrair_series, FORMATOS_GRAFICO,
+    LIMITE_CACHE_GRAFICOS_PADRAO, LIMITE_CACHE_GRAFICOS_DISCO_PADRAO
+)
+from indice_indicadores import IndiceIndicadores
+from tipos_compactos import normalizar_planilha
+from processamento_incremental import (
+    processar_planilhas, obter_visao, adicionar_planilha, anexar_linhas, obter_aba, contar_abas_pendentes,
+    descartar_blocos_planilha
+)
+from diario_escrita import (
+    DiarioEscrita, CompactadorPlanilhas, INTERVALO_COMPACTACAO_PADRAO, ATRASO_GRAVACAO_PADRAO
+)
+from acesso_admin import exigir_admin
+from armazenamento_sessao import (
+    criar_armazenamento_sessao, TTL_SESSAO_PADRAO, LIMITE_BYTES_SESSOES_PADRAO, LIMITE_SESSOES_PADRAO
+)
+from migracao import identificar_colunas, preparar_valores
+from agregados import (
+    AgregadosArquivo, ler_parametros_visao, pontos_agregados, resposta_visao_setor,
+    versao_aba, registrar_planilha, avancar_versao_aba, LIMITE_AGREGADOS_PADRAO
+)
 
 app = Flask(__name__)
+app.request_class = RequisicaoUpload  # Arquivos enviados acima de UPLOAD_MEMORIA_MAXIMA vão para disco
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('DASHBOARD_LIMITE_UPLOAD_MB', LIMITE_UPLOAD_PADRAO)) * 1024 * 1024  # Tamanho máximo do upload
+app.config['UPLOAD_MEMORIA_MAXIMA'] = MEMORIA_UPLOAD_PADRAO  # Memória por arquivo enviado antes de passar para disco
 app.config['SECRET_KEY'] = str(uuid.uuid4())
+app.config['LIMITE_LEITURA_STREAMING'] = LIMITE_STREAMING_PADRAO  # Planilhas maiores são lidas em modo streaming
+app.config['LEITURA_WORKERS'] = int(os.environ.get('DASHBOARD_LEITURA_WORKERS', WORKERS_LEITURA_PADRAO))  # Processos lendo abas em paralelo
+app.config['LIMITE_LEITURA_PARALELA'] = LIMITE_PARALELO_PADRAO  # Planilhas menores são lidas de forma serial
+app.config['UPLOAD_LOTE_WORKERS'] = int(os.environ.get('DASHBOARD_UPLOAD_LOTE_WORKERS', WORKERS_LOTE_PADRAO))  # Arquivos lidos ao mesmo tempo no upload em lote
+app.config['UPLOAD_LOTE_LIMITE_DESCOMPACTADO'] = LIMITE_DESCOMPACTADO_PADRAO  # Conteúdo máximo extraído de um .zip
+app.config['CACHE_PLANILHAS_DIR'] = os.path.join(app.config['UPLOAD_FOLDER'], '.cache', 'planilhas')
+app.config['CACHE_PLANILHAS_LIMITE'] = LIMITE_CACHE_PADRAO  # Tamanho máximo do cache de planilhas
+app.config['SESSAO_BACKEND'] = os.environ.get('DASHBOARD_SESSAO_BACKEND', 'memoria')  # memoria, sqlite ou compartilhada
+app.config['SESSAO_TTL'] = TTL_SESSAO_PADRAO  # Sessões sem acesso por mais tempo são descartadas
+app.config['SESSAO_LIMITE_BYTES'] = LIMITE_BYTES_SESSOES_PADRAO
+app.config['SESSAO_LIMITE_SESSOES'] = LIMITE_SESSOES_PADRAO
+app.config['SESSAO_ARQUIVO'] = os.path.join(app.config['UPLOAD_FOLDER'], '.cache', 'sessoes.sqlite')
+app.config['TOKEN_ADMIN'] = os.environ.get('DASHBOARD_TOKEN_ADMIN')  # Token das rotas administrativas (sem ele, só acesso local)
+app.config['CACHE_GRAFICOS_LIMITE'] = LIMITE_CACHE_GRAFICOS_PADRAO  # Memória máxima para gráficos renderizados
+app.config['CACHE_GRAFICOS_DIR'] = os.path.join(app.config['UPLOAD_FOLDER'], '.cache', 'graficos')
+app.config['CACHE_GRAFICOS_LIMITE_DISCO'] = LIMITE_CACHE_GRAFICOS_DISCO_PADRAO  # Gráficos compartilhados entre processos
+app.config['DIARIO_ESCRITA_ARQUIVO'] = os.path.join(app.config['UPLOAD_FOLDER'], '.cache', 'diario_escrita.sqlite')
+app.config['COMPACTACAO_INTERVALO'] = INTERVALO_COMPACTACAO_PADRAO  # Segundos entre verificações do diário
+app.config['COMPACTACAO_ATRASO'] = ATRASO_GRAVACAO_PADRAO  # Segundos agrupando edições de uma planilha antes de gravá-la
+app.config['AGREGADOS_DIR'] = os.path.join(app.config['UPLOAD_FOLDER'], '.cache', 'agregados')  # Agregados por versão de aba em Parquet
+app.config['AGREGADOS_LIMITE'] = LIMITE_AGREGADOS_PADRAO  # Tamanho máximo dos arquivos de agregados
 
 # Criar pasta de uploads se não existir
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+app.config['UPLOAD_TEMP_DIR'] = app.config['UPLOAD_FOLDER']  # Temporários no mesmo disco das planilhas (o /tmp pode estar em memória)
 
-# Armazenar dados das planilhas em memória (sessão)
-session_data = {}
+# Cache de planilhas já lidas, endereçado pelo hash do arquivo
+cache_planilhas = CachePlanilhas(app.config['CACHE_PLANILHAS_DIR'], app.config['CACHE_PLANILHAS_LIMITE'])
+
+# Agregados mensais, trimestrais e anuais de cada aba, para a visão do setor
+agregados_arquivo = AgregadosArquivo(app.config['AGREGADOS_DIR'], app.config['AGREGADOS_LIMITE'])
+
+# Cache de gráficos renderizados, chaveado pelo conteúdo dos dados e pelas opções
+cache_graficos = CacheGraficos(
+    app.config['CACHE_GRAFICOS_LIMITE'],
+    diretorio=app.config['CACHE_GRAFICOS_DIR'],
+    limite_bytes_disco=app.config['CACHE_GRAFICOS_LIMITE_DISCO']
+)
+
+# Linhas salvas pelo formulário aguardam no diário até serem gravadas nas planilhas em segundo plano
+diario_escrita = DiarioEscrita(app.config['DIARIO_ESCRITA_ARQUIVO'])
+compactador_planilhas = CompactadorPlanilhas(
+    diario_escrita, app.config['UPLOAD_FOLDER'],
+    intervalo_segundos=app.config['COMPACTACAO_INTERVALO'],
+    atraso_segundos=app.config['COMPACTACAO_ATRASO']
+)
+
+# Armazenar dados das planilhas por sessão, com expiração e limite de memória
+session_store = criar_armazenamento_sessao(
+    app.config['SESSAO_BACKEND'],
+    ttl_segundos=app.config['SESSAO_TTL'],
+    limite_bytes=app.config['SESSAO_LIMITE_BYTES'],
+    limite_sessoes=app.config['SESSAO_LIMITE_SESSOES'],
+    caminho=app.config['SESSAO_ARQUIVO']
+)
 
 # Lista de setores da empresa
 SETORES = [
@@ -54,138 +134,121 @@ def gerar_id_sessao():
     """Gera um ID único para a sessão"""
     return str(uuid.uuid4())
 
-def carregar_planilha(file_path):
-    """Carrega uma planilha Excel e retorna um dicionário com os dados de cada aba"""
+def obter_planilha_cache(hash_arquivo):
+    """Retorna (dados, bytes economizados pela normalização de tipos) de uma planilha do cache, ou (None, 0)"""
+    dados_planilha = cache_planilhas.obter(hash_arquivo)
+    if dados_planilha is None:
+        return None, 0
+    
+    economia = cache_planilhas.bytes_economizados(hash_arquivo)
+    if economia is None:
+        # Entrada gravada antes da normalização de tipos
+        dados_planilha, economia = normalizar_planilha(dados_planilha)
+    return dados_planilha, economia
+
+def armazenar_planilha_cache(hash_arquivo, dados_planilha):
+    """Normaliza os tipos de uma planilha recém-lida e a grava no cache; retorna (dados, bytes economizados)"""
+    dados_planilha, economia = normalizar_planilha(dados_planilha)
+    cache_planilhas.armazenar(hash_arquivo, dados_planilha, bytes_economizados=economia)
+    return dados_planilha, economia
+
+def carregar_planilha(file_path, hash_arquivo=None):
+    """Carrega uma planilha Excel e retorna os dados de cada aba, os tempos de leitura por aba e os bytes economizados"""
     try:
-        xls = pd.ExcelFile(file_path)
-        dados_planilha = {}
+        # Uma planilha idêntica já lida é obtida direto do cache
+        hash_arquivo = hash_arquivo or calcular_hash_arquivo(file_path)
+        dados_planilha, economia = obter_planilha_cache(hash_arquivo)
+        if dados_planilha is not None:
+            print(f"Planilha {file_path} obtida do cache ({hash_arquivo[:12]})")
+            return dados_planilha, {}, economia
         
-        for sheet_name in xls.sheet_names:
-            dados_planilha[sheet_name] = pd.read_excel(file_path, sheet_name=sheet_name)
+        # Ler todas as abas em uma única passada pelo arquivo
+        dados_planilha, tempos_abas = ler_planilha(
+            file_path,
+            limite_streaming=app.config['LIMITE_LEITURA_STREAMING'],
+            max_workers=app.config['LEITURA_WORKERS'],
+            limite_paralelo=app.config['LIMITE_LEITURA_PARALELA']
+        )
         
-        return dados_planilha
+        print(f"Planilha {file_path} carregada: {formatar_tempos_abas(tempos_abas)}")
+        
+        # Tipos compactos antes de guardar a planilha no cache e na sessão
+        dados_planilha, economia = armazenar_planilha_cache(hash_arquivo, dados_planilha)
+        
+        return dados_planilha, tempos_abas, economia
     except Exception as e:
         print(f"Erro ao carregar planilha {file_path}: {str(e)}")
-        return None
+        return None, {}, 0
 
-def processar_dados(planilhas):
-    """Processa os dados das planilhas para facilitar a visualização"""
-    dados_processados = {}
-    
-    for nome_planilha, abas in planilhas.items():
-        # Identificar o setor com base no nome da planilha
-        setor_identificado = None
-        for setor in SETORES:
-            if setor.lower() in nome_planilha.lower():
-                setor_identificado = setor
-                break
+def carregar_planilhas_lote(caminhos, hashes=None):
+    """Carrega várias planilhas (as que não estão no cache são lidas em paralelo) e retorna o resultado de cada uma"""
+    resultados = {}
+    pendentes = {}
+    hashes = hashes or {}
+    
+    for caminho in caminhos:
+        inicio = time.perf_counter()
+        try:
+            hash_arquivo = hashes.get(caminho) or calcular_hash_arquivo(caminho)
+            dados_planilha, economia = obter_planilha_cache(hash_arquivo)
+        except Exception as e:
+            resultados[caminho] = {'dados': None, 'erro': str(e), 'origem': None, 'tempos_abas': {}, 'tempo': time.perf_counter() - inicio}
+            continue
         
-        if not setor_identificado:
-            # Se não conseguir identificar o setor pelo nome, usar "Outros"
-            setor_identificado = "Outros"
+        if dados_planilha is not None:
+            resultados[caminho] = {
+                'dados': dados_planilha, 'erro': None, 'origem': 'cache', 'tempos_abas': {},
+                'tempo': time.perf_counter() - inicio, 'bytes_economizados': economia, 'hash': hash_arquivo
+            }
+        else:
+            pendentes[caminho] = hash_arquivo
+    
+    # Ler os arquivos restantes de uma vez, um por processo
+    inicio = time.perf_counter()
+    lidos = ler_varias_planilhas(
+        list(pendentes),
+        max_workers=app.config['UPLOAD_LOTE_WORKERS'],
+        limite_streaming=app.config['LIMITE_LEITURA_STREAMING']
+    )
+    tempo_leitura = time.perf_counter() - inicio
+    
+    for caminho, resultado in lidos.items():
+        if isinstance(resultado, Exception):
+            print(f"Erro ao carregar planilha {caminho}: {str(resultado)}")
+            resultados[caminho] = {'dados': None, 'erro': str(resultado), 'origem': None, 'tempos_abas': {}, 'tempo': tempo_leitura}
+            continue
         
-        # Processar cada aba da planilha
-        for nome_aba, df in abas.items():
-            # Identificar o indicador com base no nome da aba
-            indicador_identificado = nome_aba
-            
-            # Armazenar os dados processados
-            if setor_identificado not in dados_processados:
-                dados_processados[setor_identificado] = {}
-            
-            dados_processados[setor_identificado][indicador_identificado] = df
+        dados_planilha, tempos_abas = resultado
+        print(f"Planilha {caminho} carregada: {formatar_tempos_abas(tempos_abas)}")
+        dados_planilha, economia = armazenar_planilha_cache(pendentes[caminho], dados_planilha)
+        resultados[caminho] = {
+            'dados': dados_planilha, 'erro': None, 'origem': 'leitura', 'tempos_abas': tempos_abas,
+            'tempo': sum(tempos_abas.values()), 'bytes_economizados': economia, 'hash': pendentes[caminho]
+        }
     
-    return dados_processados
+    return resultados
 
-def criar_grafico(df, titulo, tipo_grafico='linha', mostrar_tendencia=False):
-    """Cria um gráfico com os dados do DataFrame e retorna como imagem base64"""
-    plt.figure(figsize=(10, 6))
-    ax = plt.subplot(111)
-    
-    # Tentar identificar dados numéricos para o gráfico
-    dados_numericos = df.select_dtypes(include=['number'])
-    
-    if not dados_numericos.empty:
-        # Se tiver dados numéricos, criar gráficos conforme seleção
-        if len(dados_numericos.columns) > 0:
-            # Identificar possíveis colunas para o eixo x
-            x_col = None
-            
-            # Priorizar colunas de data
-            for col in df.columns:
-                if 'data' in str(col).lower() or 'mes' in str(col).lower() or 'ano' in str(col).lower():
-                    x_col = col
-                    break
-            
-            # Se não encontrou coluna de data, usar a primeira coluna
-            if x_col is None and len(df.columns) > 0:
-                x_col = df.columns[0]
-            
-            # Criar gráfico conforme seleção
-            if tipo_grafico == 'linha':
-                # Gráfico de linha
-                for col in dados_numericos.columns:
-                    ax.plot(df[x_col] if x_col else range(len(df)), dados_numericos[col], 
-                           marker='o', label=str(col))
-                    
-                    # Adicionar linha de tendência se selecionado
-                    if mostrar_tendencia:
-                        x = range(len(df))
-                        y = dados_numericos[col].values
-                        z = np.polyfit(x, y, 1)
-                        p = np.poly1d(z)
-                        ax.plot(x, p(x), "r--", alpha=0.5)
-            
-            elif tipo_grafico == 'barra':
-                # Gráfico de barras
-                if len(dados_numericos.columns) == 1:
-                    # Uma única série
-                    ax.bar(df[x_col] if x_col else range(len(df)), 
-                          dados_numericos[dados_numericos.columns[0]])
-                else:
-                    # Múltiplas séries
-                    x = range(len(df))
-                    width = 0.8 / len(dados_numericos.columns)
-                    for i, col in enumerate(dados_numericos.columns):
-                        ax.bar([p + width*i for p in x], dados_numericos[col], 
-                              width=width, label=str(col))
-            
-            elif tipo_grafico == 'pizza' and len(dados_numericos.columns) == 1:
-                # Gráfico de pizza (apenas para uma série)
-                ax.pie(dados_numericos[dados_numericos.columns[0]], 
-                      labels=df[x_col] if x_col else None,
-                      autopct='%1.1f%%', shadow=True, startangle=90)
-                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
-            
-            else:
-                # Gráfico de linha (padrão)
-                for col in dados_numericos.columns:
-                    ax.plot(df[x_col] if x_col else range(len(df)), dados_numericos[col], 
-                           marker='o', label=str(col))
-            
-            ax.set_title(titulo)
-            ax.legend()
-            ax.grid(True, linestyle='--', alpha=0.7)
-            
-            # Rotacionar labels do eixo x para melhor visualização
-            plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
-            
-            plt.tight_layout()
-    else:
-        # Se não tiver dados numéricos, exibir mensagem
-        ax.text(0.5, 0.5, "Não foram encontrados dados numéricos para gerar o gráfico", 
-               horizontalalignment='center', verticalalignment='center')
-    
-    # Salvar o gráfico em um buffer de memória
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
+def processar_dados(planilhas):
+    """Processa os dados das planilhas e monta o índice de setores e indicadores"""
+    return processar_planilhas(planilhas, SETORES)
+
+def criar_grafico(df, titulo, tipo_grafico='linha', mostrar_tendencia=False, formato='png'):
+    """Cria um gráfico com os dados do DataFrame e retorna o identificador usado em /grafico/<id>"""
+    chave = gerar_chave_grafico(df, titulo, tipo_grafico, mostrar_tendencia, formato)
     
-    # Converter para base64 para exibir no HTML
-    data = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
+    # Só renderizar se os mesmos dados e opções não estiverem no cache
+    if cache_graficos.obter(chave) is None:
+        grafico = renderizar_grafico(df, titulo, tipo_grafico, mostrar_tendencia, formato)
+        cache_graficos.armazenar(chave, grafico, formato)
     
-    return f'data:image/png;base64,{data}'
+    return chave
+
+def valores_aba(df):
+    """DataFrame com data, valor e meta de uma aba, ou None se as colunas não forem identificadas"""
+    col_data, col_valor, col_meta = identificar_colunas(df)
+    if not col_data or not col_valor:
+        return None
+    return preparar_valores(df, col_data, col_valor, col_meta)
 
 def salvar_dados_planilha(file_path, sheet_name, df):
     """Salva os dados do DataFrame na planilha Excel"""
@@ -213,15 +276,17 @@ def index():
     """Página inicial do dashboard"""
     # Gerar um ID de sessão se não existir
     session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in session_data:
+    dados_sessao = session_store.obter(session_id) if session_id else None
+    if dados_sessao is None:
         session_id = gerar_id_sessao()
-        session_data[session_id] = {
+        dados_sessao = {
             'planilhas': {},
-            'dados_processados': {}
+            'dados_processados': {},
+            'indice_indicadores': IndiceIndicadores()
         }
+        session_store.salvar(session_id, dados_sessao)
     
     # Obter dados da sessão
-    dados_sessao = session_data.get(session_id, {})
     planilhas = dados_sessao.get('planilhas', {})
     
     # Renderizar a página inicial
@@ -236,17 +301,27 @@ def index():
     # Criar resposta a partir do template renderizado
     response = app.make_response(rendered_template)
     
-    # Definir cookie de sessão
-    if not request.cookies.get('session_id'):
+    # Definir cookie de sessão (também quando a sessão anterior expirou)
+    if request.cookies.get('session_id') != session_id:
         response.set_cookie('session_id', session_id)
     
     return response
 
+@app.errorhandler(413)
+def upload_muito_grande(e):
+    """Resposta JSON para uploads acima de MAX_CONTENT_LENGTH"""
+    limite_mb = app.config['MAX_CONTENT_LENGTH'] / 1024 / 1024
+    return jsonify({
+        'success': False,
+        'error': f'Arquivo acima do limite de {limite_mb:.0f} MB (DASHBOARD_LIMITE_UPLOAD_MB)'
+    }), 413
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Endpoint para upload de planilhas"""
     session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in session_data:
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
         return redirect(url_for('index'))
     
     # Verificar se o arquivo foi enviado
@@ -264,36 +339,134 @@ def upload_file():
         # Salvar o arquivo temporariamente
         filename = secure_filename(file.filename)
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        
+        # Gravar o arquivo calculando o hash na mesma passada; no cache, a planilha nem é relida
+        try:
+            hash_arquivo, _ = salvar_com_hash(
+                file.stream, file_path, trava=compactador_planilhas.substituindo(filename)
+            )
+        except Exception as e:
+            return jsonify({'success': False, 'error': f'Erro ao salvar o arquivo {filename}: {str(e)}'})
         
         # Carregar a planilha
         nome_arquivo = os.path.splitext(filename)[0]
-        dados_planilha = carregar_planilha(file_path)
+        dados_planilha, tempos_abas, economia = carregar_planilha(file_path, hash_arquivo)
         
         if dados_planilha:
-            # Armazenar os dados na sessão
-            session_data[session_id]['planilhas'][nome_arquivo] = dados_planilha
-            
-            # Processar os dados
-            session_data[session_id]['dados_processados'] = processar_dados(
-                session_data[session_id]['planilhas']
-            )
+            # Armazenar os dados na sessão e aplicar só a planilha nova aos dados processados
+            dados_processados, indice = obter_visao(sessao, SETORES)
+            descartar_blocos_planilha(sessao, nome_arquivo)
+            registrar_planilha(sessao, nome_arquivo, hash_arquivo)
+            sessao['planilhas'][nome_arquivo] = dados_planilha
+            sessao.setdefault('economia_tipos', {})[nome_arquivo] = economia
+            adicionar_planilha(dados_processados, indice, sessao['planilhas'], nome_arquivo, dados_planilha, SETORES)
+            session_store.salvar(session_id, sessao)
             
             return jsonify({
                 'success': True, 
                 'message': f'Arquivo {filename} carregado com sucesso',
-                'planilhas_carregadas': list(session_data[session_id]['planilhas'].keys())
+                'planilhas_carregadas': list(sessao['planilhas'].keys()),
+                'tempos_abas': tempos_abas,
+                'bytes_economizados': economia
             })
         else:
             return jsonify({'success': False, 'error': f'Erro ao carregar o arquivo {filename}'})
     
     return jsonify({'success': False, 'error': 'Formato de arquivo não suportado'})
 
+@app.route('/upload_lote', methods=['POST'])
+def upload_lote():
+    """Endpoint para upload de várias planilhas (ou de um .zip com planilhas) de uma só vez"""
+    session_id = request.cookies.get('session_id')
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
+        return redirect(url_for('index'))
+    
+    arquivos = request.files.getlist('files') + request.files.getlist('file')
+    if not arquivos or all(arquivo.filename == '' for arquivo in arquivos):
+        return jsonify({'success': False, 'error': 'Nenhum arquivo enviado'})
+    
+    inicio = time.perf_counter()
+    status_arquivos = []
+    caminhos = []
+    hashes = {}
+    
+    # Salvar os arquivos enviados, extraindo as planilhas dos .zip
+    for arquivo in arquivos:
+        filename = secure_filename(arquivo.filename)
+        if filename.lower().endswith(EXTENSOES_PLANILHA):
+            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            try:
+                hashes[file_path], _ = salvar_com_hash(
+                    arquivo.stream, file_path, trava=compactador_planilhas.substituindo(filename)
+                )
+            except Exception as e:
+                status_arquivos.append({'arquivo': filename, 'success': False, 'error': f'Erro ao salvar o arquivo: {str(e)}'})
+                continue
+            caminhos.append(file_path)
+        elif filename.lower().endswith('.zip'):
+            try:
+                caminhos.extend(extrair_planilhas_zip(
+                    arquivo.stream, app.config['UPLOAD_FOLDER'], app.config['UPLOAD_LOTE_LIMITE_DESCOMPACTADO'],
+                    travar=compactador_planilhas.substituindo
+                ))
+            except Exception as e:
+                status_arquivos.append({'arquivo': filename, 'success': False, 'error': f'Erro ao extrair o arquivo: {str(e)}'})
+        else:
+            status_arquivos.append({'arquivo': filename or arquivo.filename, 'success': False, 'error': 'Formato de arquivo não suportado'})
+    
+    # Carregar as planilhas em paralelo
+    resultados = carregar_planilhas_lote(caminhos, hashes)
+    
+    # Aplicar todas as planilhas carregadas aos dados processados de uma vez
+    dados_processados, indice = obter_visao(sessao, SETORES)
+    carregadas = {}
+    for file_path in caminhos:
+        resultado = resultados[file_path]
+        filename = os.path.basename(file_path)
+        if not resultado['dados']:
+            status_arquivos.append({
+                'arquivo': filename,
+                'success': False,
+                'error': resultado['erro'] or f'Erro ao carregar o arquivo {filename}'
+            })
+            continue
+        
+        nome_arquivo = os.path.splitext(filename)[0]
+        descartar_blocos_planilha(sessao, nome_arquivo)
+        registrar_planilha(sessao, nome_arquivo, resultado['hash'])
+        sessao['planilhas'][nome_arquivo] = resultado['dados']
+        sessao.setdefault('economia_tipos', {})[nome_arquivo] = resultado['bytes_economizados']
+        adicionar_planilha(dados_processados, indice, sessao['planilhas'], nome_arquivo, resultado['dados'], SETORES)
+        carregadas[nome_arquivo] = resultado['dados']
+        
+        status_arquivos.append({
+            'arquivo': filename,
+            'success': True,
+            'origem': resultado['origem'],
+            'tempo_ms': round(resultado['tempo'] * 1000, 1),
+            'bytes_economizados': resultado['bytes_economizados'],
+            'tempos_abas': {aba: round(tempo * 1000, 1) for aba, tempo in resultado['tempos_abas'].items()}
+        })
+    
+    if carregadas:
+        session_store.salvar(session_id, sessao)
+    
+    return jsonify({
+        'success': bool(carregadas),
+        'message': f'{len(carregadas)} de {len(status_arquivos)} arquivo(s) carregado(s)',
+        'error': None if carregadas else 'Nenhuma planilha foi carregada',
+        'arquivos': status_arquivos,
+        'planilhas_carregadas': list(sessao['planilhas'].keys()),
+        'tempo_total_ms': round((time.perf_counter() - inicio) * 1000, 1)
+    })
+
 @app.route('/get_indicadores', methods=['GET'])
 def get_indicadores():
     """Endpoint para obter indicadores de um setor"""
     session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in session_data:
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
         return jsonify({'success': False, 'error': 'Sessão inválida'})
     
     setor = request.args.get('setor')
@@ -304,7 +477,7 @@ def get_indicadores():
     indicadores = INDICADORES_POR_SETOR.get(setor, [])
     
     # Adicionar indicadores encontrados nas planilhas
-    dados_processados = session_data[session_id].get('dados_processados', {})
+    dados_processados = sessao.get('dados_processados', {})
     if setor in dados_processados:
         for indicador in dados_processados[setor].keys():
             if indicador not in indicadores:
@@ -316,61 +489,61 @@ def get_indicadores():
 def get_dados():
     """Endpoint para obter dados de um indicador"""
     session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in session_data:
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
         return jsonify({'success': False, 'error': 'Sessão inválida'})
     
     setor = request.args.get('setor')
     indicador = request.args.get('indicador')
     tipo_grafico = request.args.get('tipo_grafico', 'linha')
     mostrar_tendencia = request.args.get('mostrar_tendencia', 'false').lower() == 'true'
+    formato = request.args.get('formato', 'png')
+    modo = request.args.get('modo', 'imagem')  # imagem (PNG/SVG) ou dados (séries para o navegador)
     
     if not setor or not indicador:
         return jsonify({'success': False, 'error': 'Setor ou indicador não especificado'})
     
+    if formato not in FORMATOS_GRAFICO:
+        return jsonify({'success': False, 'error': f'Formato de gráfico não suportado: {formato}'})
+    
     # Buscar dados do indicador
     dados_encontrados = False
     df_indicador = None
     
-    # Obter dados processados da sessão
-    dados_processados = session_data[session_id].get('dados_processados', {})
-    planilhas = session_data[session_id].get('planilhas', {})
-    
-    # Primeiro, verificar nos dados processados
-    if setor in dados_processados:
-        for nome_indicador, df in dados_processados[setor].items():
-            if indicador.lower() in nome_indicador.lower():
-                df_indicador = df
-                dados_encontrados = True
-                break
-    
-    # Se não encontrou nos dados processados, buscar nas planilhas originais
-    if not dados_encontrados:
-        for nome_planilha, abas in planilhas.items():
-            # Verificar se o nome da planilha contém o setor
-            if setor.lower() in nome_planilha.lower():
-                for nome_aba, df in abas.items():
-                    # Verificar se o nome da aba ou conteúdo contém o indicador
-                    if (indicador.lower() in nome_aba.lower() or 
-                        any(indicador.lower() in str(col).lower() for col in df.columns)):
-                        
-                        df_indicador = df
-                        dados_encontrados = True
-                        break
-            
-            if dados_encontrados:
-                break
+    # Obter dados da sessão
+    planilhas = sessao.get('planilhas', {})
+    indice = sessao.get('indice_indicadores')
+    
+    # Localizar o indicador pelo índice montado no upload
+    localizacao = indice.buscar(setor, indicador) if indice else None
+    if localizacao:
+        nome_planilha, nome_aba = localizacao
+        pendentes = contar_abas_pendentes(sessao)
+        df_indicador = obter_aba(sessao, nome_planilha, nome_aba)
+        if contar_abas_pendentes(sessao) != pendentes:
+            # A leitura consolidou os blocos anexados: gravar a aba consolidada para não repetir o concat a cada leitura
+            session_store.salvar(session_id, sessao)
+        dados_encontrados = True
     
     if dados_encontrados and df_indicador is not None:
         # Converter DataFrame para HTML (tabela)
         tabela_html = df_indicador.to_html(classes='table table-striped table-bordered', index=False)
         
-        # Criar gráfico
-        grafico_base64 = criar_grafico(df_indicador, indicador, tipo_grafico, mostrar_tendencia)
+        # No modo dados, o gráfico é desenhado no navegador a partir das séries
+        if modo == 'dados':
+            return jsonify({
+                'success': True,
+                'tabela_html': tabela_html,
+                'series': extrair_series(df_indicador, tipo_grafico, mostrar_tendencia)
+            })
+        
+        # Criar gráfico (a imagem é servida separadamente em /grafico/<id>)
+        grafico_id = criar_grafico(df_indicador, indicador, tipo_grafico, mostrar_tendencia, formato)
         
         return jsonify({
             'success': True,
             'tabela_html': tabela_html,
-            'grafico_base64': grafico_base64
+            'grafico_url': url_for('obter_grafico', grafico_id=grafico_id)
         })
     else:
         return jsonify({
@@ -378,11 +551,84 @@ def get_dados():
             'error': f'Não foram encontrados dados para o indicador {indicador}'
         })
 
+@app.route('/visao_setor', methods=['GET'])
+def visao_setor():
+    """Endpoint com os agregados de todos os indicadores de um setor (último, média, mínimo, máximo e atingimento da meta)"""
+    session_id = request.cookies.get('session_id')
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
+        return jsonify({'success': False, 'error': 'Sessão inválida'})
+    
+    setor = request.args.get('setor')
+    if not setor:
+        return jsonify({'success': False, 'error': 'Setor não especificado'})
+    
+    try:
+        parametros = ler_parametros_visao(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Agregados de cada indicador do setor, calculados na primeira consulta e mantidos em Parquet pela versão da aba
+    pendentes = contar_abas_pendentes(sessao)
+    sem_indice = sessao.get('indice_indicadores') is None
+    dados_processados, indice = obter_visao(sessao, SETORES)
+    pontos = {}
+    for indicador in dados_processados.get(setor, {}):
+        localizacao = indice.buscar(setor, indicador)
+        if not localizacao:
+            continue
+        
+        nome_planilha, nome_aba = localizacao
+        try:
+            agregados = agregados_arquivo.obter(
+                versao_aba(sessao, nome_planilha, nome_aba), nome_aba,
+                lambda: valores_aba(obter_aba(sessao, nome_planilha, nome_aba))
+            )
+        except Exception as e:
+            print(f"Erro ao calcular agregados do indicador {indicador}: {str(e)}")
+            continue
+        
+        if agregados is not None:
+            selecionados = agregados[agregados['periodo'] == parametros['periodo']].sort_values('inicio')
+            pontos[indicador] = pontos_agregados(selecionados.to_dict('records'))
+    
+    # Gravar a sessão se a consulta montou o índice ou consolidou blocos anexados, para não repetir o trabalho
+    if sem_indice or contar_abas_pendentes(sessao) != pendentes:
+        session_store.salvar(session_id, sessao)
+    
+    return jsonify(dict(resposta_visao_setor(setor, parametros, pontos), success=True))
+
+@app.route('/grafico/<grafico_id>', methods=['GET'])
+def obter_grafico(grafico_id):
+    """Endpoint que serve a imagem de um gráfico renderizado, com suporte a cache HTTP"""
+    if not chave_grafico_valida(grafico_id):
+        return jsonify({'success': False, 'error': 'Gráfico não encontrado'}), 404
+    
+    # O identificador é o hash dos dados e das opções, então a imagem nunca muda
+    if grafico_id in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(grafico_id)
+        return response
+    
+    grafico = cache_graficos.obter(grafico_id)
+    if grafico is None:
+        return jsonify({'success': False, 'error': 'Gráfico não encontrado'}), 404
+    
+    imagem, formato = grafico
+    response = app.response_class(imagem, mimetype=FORMATOS_GRAFICO[formato])
+    response.set_etag(grafico_id)
+    response.cache_control.private = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    
+    return response
+
 @app.route('/get_estrutura_indicador', methods=['GET'])
 def get_estrutura_indicador():
     """Endpoint para obter a estrutura de um indicador para preenchimento"""
     session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in session_data:
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
         return jsonify({'success': False, 'error': 'Sessão inválida'})
     
     setor = request.args.get('setor')
@@ -397,46 +643,20 @@ def get_estrutura_indicador():
     nome_planilha_encontrada = None
     nome_aba_encontrada = None
     
-    # Obter dados processados da sessão
-    dados_processados = session_data[session_id].get('dados_processados', {})
-    planilhas = session_data[session_id].get('planilhas', {})
-    
-    # Primeiro, verificar nos dados processados
-    if setor in dados_processados:
-        for nome_indicador, df in dados_processados[setor].items():
-            if indicador.lower() in nome_indicador.lower():
-                df_indicador = df
-                dados_encontrados = True
-                
-                # Encontrar o nome da planilha e da aba
-                for nome_planilha, abas in planilhas.items():
-                    if setor.lower() in nome_planilha.lower():
-                        for nome_aba, df_aba in abas.items():
-                            if nome_indicador.lower() == nome_aba.lower():
-                                nome_planilha_encontrada = nome_planilha
-                                nome_aba_encontrada = nome_aba
-                                break
-                
-                break
-    
-    # Se não encontrou nos dados processados, buscar nas planilhas originais
-    if not dados_encontrados:
-        for nome_planilha, abas in planilhas.items():
-            # Verificar se o nome da planilha contém o setor
-            if setor.lower() in nome_planilha.lower():
-                for nome_aba, df in abas.items():
-                    # Verificar se o nome da aba ou conteúdo contém o indicador
-                    if (indicador.lower() in nome_aba.lower() or 
-                        any(indicador.lower() in str(col).lower() for col in df.columns)):
-                        
-                        df_indicador = df
-                        dados_encontrados = True
-                        nome_planilha_encontrada = nome_planilha
-                        nome_aba_encontrada = nome_aba
-                        break
-            
-            if dados_encontrados:
-                break
+    # Obter dados da sessão
+    planilhas = sessao.get('planilhas', {})
+    indice = sessao.get('indice_indicadores')
+    
+    # Localizar o indicador pelo índice montado no upload
+    localizacao = indice.buscar(setor, indicador) if indice else None
+    if localizacao:
+        nome_planilha_encontrada, nome_aba_encontrada = localizacao
+        pendentes = contar_abas_pendentes(sessao)
+        df_indicador = obter_aba(sessao, nome_planilha_encontrada, nome_aba_encontrada)
+        if contar_abas_pendentes(sessao) != pendentes:
+            # A leitura consolidou os blocos anexados: gravar a aba consolidada para não repetir o concat a cada leitura
+            session_store.salvar(session_id, sessao)
+        dados_encontrados = True
     
     if dados_encontrados and df_indicador is not None:
         # Obter informações sobre as colunas
@@ -469,7 +689,8 @@ def get_estrutura_indicador():
 def salvar_dados():
     """Endpoint para salvar novos dados de um indicador"""
     session_id = request.cookies.get('session_id')
-    if not session_id or session_id not in session_data:
+    sessao = session_store.obter(session_id) if session_id else None
+    if sessao is None:
         return jsonify({'success': False, 'error': 'Sessão inválida'})
     
     # Obter dados do formulário
@@ -487,7 +708,7 @@ def salvar_dados():
         return jsonify({'success': False, 'error': 'Dados incompletos'})
     
     # Verificar se a planilha existe na sessão
-    planilhas = session_data[session_id].get('planilhas', {})
+    planilhas = sessao.get('planilhas', {})
     if nome_planilha not in planilhas or nome_aba not in planilhas[nome_planilha]:
         return jsonify({'success': False, 'error': 'Planilha ou aba não encontrada'})
     
@@ -502,23 +723,32 @@ def salvar_dados():
         if col not in df_atual.columns:
             return jsonify({'success': False, 'error': f'Coluna {col} não encontrada no indicador'})
     
-    # Adicionar novos dados ao DataFrame
-    df_atualizado = pd.concat([df_atual, df_novos], ignore_index=True)
+    # Anexar os novos dados à aba e atualizar só ela nos dados processados
+    obter_visao(sessao, SETORES)
+    anexar_linhas(sessao, nome_planilha, nome_aba, df_novos)
+    versao_anterior, versao = avancar_versao_aba(sessao, nome_planilha, nome_aba, df_novos)
     
-    # Atualizar o DataFrame na sessão
-    planilhas[nome_planilha][nome_aba] = df_atualizado
+    # Gravar os agregados da nova versão da aba recalculando só a partir da data das linhas novas (que ficam no fim da aba)
+    try:
+        df_aba = obter_aba(sessao, nome_planilha, nome_aba)
+        df_valores = valores_aba(df_aba)
+        if df_valores is not None:
+            # Linhas com data inválida não entram nos valores; sem data válida nas linhas novas, os agregados são calculados na próxima consulta
+            desde = df_valores['data'][df_valores.index >= len(df_aba) - len(df_novos)].min()
+            if not pd.isna(desde):
+                agregados_arquivo.atualizar(versao_anterior, versao, nome_aba, df_valores, desde)
+    except Exception as e:
+        print(f"Erro ao atualizar agregados da aba {nome_aba}: {str(e)}")
     
-    # Atualizar os dados processados
-    session_data[session_id]['dados_processados'] = processar_dados(planilhas)
+    session_store.salvar(session_id, sessao)
     
     # Salvar os dados na planilha original
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{nome_planilha}.xlsx")
     if os.path.exists(file_path):
         try:
-            # Criar um ExcelWriter com o arquivo existente
-            with pd.ExcelWriter(file_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                # Salvar o DataFrame atualizado na aba
-                df_atualizado.to_excel(writer, sheet_name=nome_aba, index=False)
+            # Registrar as linhas no diário; a thread de gravação da planilha as grava em segundo plano
+            diario_escrita.registrar_dataframe(os.path.basename(file_path), nome_aba, df_novos, df_atual.columns)
+            compactador_planilhas.agendar(os.path.basename(file_path))
             
             return jsonify({
                 'success': True,
@@ -535,5 +765,33 @@ def salvar_dados():
             'error': 'Arquivo da planilha não encontrado'
         })
 
+@app.route('/estatisticas_sessoes', methods=['GET'])
+@exigir_admin
+def estatisticas_sessoes():
+    """Endpoint para consultar a memória ocupada pelas sessões e as remoções realizadas"""
+    # Memória economizada pela normalização de tipos nas planilhas da sessão atual
+    session_id = request.cookies.get('session_id')
+    sessao = session_store.obter(session_id) if session_id else None
+    economia_tipos = sessao.get('economia_tipos', {}) if sessao else {}
+    
+    return jsonify({
+        'success': True,
+        'estatisticas': session_store.estatisticas(),
+        'economia_tipos': {
+            'bytes_economizados': sum(economia_tipos.values()),
+            'por_planilha': economia_tipos
+        }
+    })
+
+@app.route('/status_gravacao', methods=['GET'])
+def status_gravacao():
+    """Endpoint para consultar se as edições já foram gravadas nas planilhas"""
+    nome_planilha = request.args.get('planilha')
+    arquivo = f"{nome_planilha}.xlsx" if nome_planilha else None
+    return jsonify({
+        'success': True,
+        'status': compactador_planilhas.estatisticas(arquivo)
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Armazenamentos dos dados de sessão: em memória, em SQLite e em memória compartilhada
+
+As abas (DataFrames) de uma sessão nunca são alteradas no lugar: cada mudança
+cria um DataFrame novo. Por isso o tamanho de cada DataFrame é medido uma só
+vez, e os armazenamentos persistentes gravam as abas separadas do restante da
+sessão, regravando a cada requisição só as abas novas.
+"""
+
+import io
+import os
+import sys
+import fcntl
+import time
+import uuid
+import pickle
+import struct
+import sqlite3
+import hashlib
+import weakref
+import tempfile
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+import pandas as pd
+
+TTL_SESSAO_PADRAO = 8 * 60 * 60  # 8 horas
+LIMITE_BYTES_SESSOES_PADRAO = 1024 * 1024 * 1024  # 1GB
+LIMITE_SESSOES_PADRAO = 200
+
+
+class _ValoresDataFrames:
+    """Valores associados a DataFrames enquanto os objetos existirem, por escopo (ex.: a sessão)"""
+
+    def __init__(self):
+        self._valores = {}  # (escopo, id do DataFrame) -> (referência fraca, valor)
+        self._lock = threading.RLock()  # O coletor de lixo pode chamar _remover com a trava já tomada
+
+    def obter(self, df, escopo=None):
+        entrada = self._valores.get((escopo, id(df)))
+        if entrada is not None and entrada[0]() is df:
+            return entrada[1]
+        return None
+
+    def guardar(self, df, valor, escopo=None):
+        chave = (escopo, id(df))
+
+        def _remover(referencia):
+            with self._lock:
+                entrada = self._valores.get(chave)
+                if entrada is not None and entrada[0] is referencia:
+                    del self._valores[chave]
+
+        with self._lock:
+            self._valores[chave] = (weakref.ref(df, _remover), valor)
+
+
+# Memória de cada DataFrame, medida uma vez (memory_usage(deep=True) percorre as colunas de texto)
+_tamanhos_dataframes = _ValoresDataFrames()
+
+
+def _tamanho_dataframe(df):
+    tamanho = _tamanhos_dataframes.obter(df)
+    if tamanho is None:
+        tamanho = int(df.memory_usage(deep=True).sum())
+        _tamanhos_dataframes.guardar(df, tamanho)
+    return tamanho
+
+
+def calcular_tamanho_sessao(dados):
+    """Estima a memória ocupada pelos dados de uma sessão, contando cada DataFrame uma única vez
+
+    Só os DataFrames ainda não medidos são percorridos; o custo acompanha o que
+    mudou na sessão, não o tamanho dela.
+    """
+    vistos = set()
+
+    def _tamanho(obj):
+        if id(obj) in vistos:
+            return 0
+        vistos.add(id(obj))
+
+        if isinstance(obj, pd.DataFrame):
+            return _tamanho_dataframe(obj)
+        if isinstance(obj, dict):
+            return sys.getsizeof(obj) + sum(_tamanho(k) + _tamanho(v) for k, v in obj.items())
+        if isinstance(obj, (list, tuple, set)):
+            return sys.getsizeof(obj) + sum(_tamanho(item) for item in obj)
+        return sys.getsizeof(obj)
+
+    return _tamanho(dados)
+
+
+class ArmazenamentoSessao:
+    """Interface comum dos armazenamentos de dados de sessão"""
+
+    def __init__(self, ttl_segundos=TTL_SESSAO_PADRAO):
+        self.ttl_segundos = ttl_segundos
+        self._contadores = {
+            'acertos': 0,
+            'faltas': 0,
+            'expiradas': 0,
+            'removidas_por_limite': 0
+        }
+        self._lock_contadores = threading.Lock()
+
+    def _contar(self, chave, quantidade=1):
+        with self._lock_contadores:
+            self._contadores[chave] += quantidade
+
+    def _expirada(self, ultimo_acesso):
+        return self.ttl_segundos is not None and time.time() - ultimo_acesso > self.ttl_segundos
+
+    def obter(self, session_id):
+        """Retorna os dados da sessão ou None se não existir ou tiver expirado"""
+        raise NotImplementedError
+
+    def salvar(self, session_id, dados):
+        """Grava os dados da sessão, aplicando os limites do armazenamento"""
+        raise NotImplementedError
+
+    def remover(self, session_id):
+        """Remove a sessão do armazenamento"""
+        raise NotImplementedError
+
+    def existe(self, session_id):
+        """Verifica se a sessão existe e não expirou"""
+        return bool(session_id) and self.obter(session_id) is not None
+
+    def tamanhos(self):
+        """Retorna um dicionário {session_id: bytes ocupados} (uso interno: as chaves dão acesso às sessões)"""
+        raise NotImplementedError
+
+    def estatisticas(self):
+        """Retorna contadores de acesso e remoção e a memória ocupada pelas sessões
+
+        Os tamanhos por sessão vêm chaveados por um hash truncado do identificador,
+        nunca pelo identificador em si, que vale como credencial da sessão.
+        """
+        tamanhos = self.tamanhos()
+        with self._lock_contadores:
+            estatisticas = dict(self._contadores)
+        estatisticas.update({
+            'backend': self.__class__.__name__,
+            'sessoes': len(tamanhos),
+            'bytes_total': sum(tamanhos.values()),
+            'bytes_por_sessao': {
+                hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:12]: tamanho
+                for session_id, tamanho in tamanhos.items()
+            }
+        })
+        return estatisticas
+
+
+class ArmazenamentoAbasSeparadas(ArmazenamentoSessao):
+    """Base dos armazenamentos serializados, com as abas gravadas separadas do estado da sessão
+
+    Cada DataFrame vira uma aba com chave própria; o estado (dicionários, índice,
+    referências às abas) é serializado à parte e é pequeno. A cada gravação, só
+    as abas que ainda não foram gravadas para a sessão são serializadas.
+    """
+
+    def __init__(self, ttl_segundos=TTL_SESSAO_PADRAO):
+        super().__init__(ttl_segundos)
+        self._chaves_abas = _ValoresDataFrames()  # DataFrame já gravado ou lido -> chave da aba, por sessão
+
+    def _serializar(self, session_id, dados, existentes):
+        """Retorna (estado, {chave: aba serializada} das abas a gravar, chaves referenciadas)
+
+        existentes são as chaves já gravadas para a sessão; uma aba conhecida cuja
+        chave não está lá (removida por outro processo) é gravada de novo.
+        """
+        novas = {}
+        chaves = {}
+
+        class _Serializador(pickle.Pickler):
+            def persistent_id(pickler, obj):
+                if not isinstance(obj, pd.DataFrame):
+                    return None
+                chave = chaves.get(id(obj))
+                if chave is None:
+                    chave = self._chaves_abas.obter(obj, session_id)
+                    if chave is None or chave not in existentes:
+                        chave = chave or uuid.uuid4().hex
+                        novas[chave] = (obj, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+                    chaves[id(obj)] = chave
+                return chave
+
+        buffer = io.BytesIO()
+        _Serializador(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(dados)
+        return buffer.getvalue(), novas, set(chaves.values())
+
+    def _registrar_abas(self, session_id, novas):
+        """Marca as abas gravadas, para não serializá-las de novo enquanto os objetos existirem"""
+        for chave, (df, _) in novas.items():
+            self._chaves_abas.guardar(df, chave, session_id)
+
+    def _desserializar(self, session_id, estado, ler_aba):
+        """Reconstrói a sessão; ler_aba(chave) retorna a aba serializada ou levanta KeyError"""
+        carregadas = {}
+
+        class _Desserializador(pickle.Unpickler):
+            def persistent_load(unpickler, chave):
+                if chave not in carregadas:
+                    df = pickle.loads(ler_aba(chave))
+                    self._chaves_abas.guardar(df, chave, session_id)
+                    carregadas[chave] = df
+                return carregadas[chave]
+
+        return _Desserializador(io.BytesIO(estado)).load()
+
+
+class ArmazenamentoMemoria(ArmazenamentoSessao):
+    """Sessões em memória do processo, com expiração por TTL e remoção LRU"""
+
+    def __init__(self, ttl_segundos=TTL_SESSAO_PADRAO, limite_bytes=LIMITE_BYTES_SESSOES_PADRAO,
+                 limite_sessoes=LIMITE_SESSOES_PADRAO):
+        super().__init__(ttl_segundos)
+        self.limite_bytes = limite_bytes
+        self.limite_sessoes = limite_sessoes
+        self._sessoes = OrderedDict()  # session_id -> [dados, tamanho, ultimo_acesso]
+        self._lock = threading.RLock()
+
+    def obter(self, session_id):
+        with self._lock:
+            entrada = self._sessoes.get(session_id)
+            if entrada is None:
+                self._contar('faltas')
+                return None
+
+            if self._expirada(entrada[2]):
+                del self._sessoes[session_id]
+                self._contar('expiradas')
+                self._contar('faltas')
+                return None
+
+            entrada[2] = time.time()
+            self._sessoes.move_to_end(session_id)
+            self._contar('acertos')
+            return entrada[0]
+
+    def salvar(self, session_id, dados):
+        tamanho = calcular_tamanho_sessao(dados)
+        with self._lock:
+            self._sessoes[session_id] = [dados, tamanho, time.time()]
+            self._sessoes.move_to_end(session_id)
+            self._remover_excedente(session_id)
+
+    def _remover_excedente(self, session_id_atual):
+        """Remove sessões expiradas e, depois, as usadas há mais tempo até caber nos limites"""
+        for session_id in [s for s, entrada in self._sessoes.items() if self._expirada(entrada[2])]:
+            del self._sessoes[session_id]
+            self._contar('expiradas')
+
+        total = sum(entrada[1] for entrada in self._sessoes.values())
+        while self._sessoes and (total > self.limite_bytes or len(self._sessoes) > self.limite_sessoes):
+            session_id, entrada = next(iter(self._sessoes.items()))
+            if session_id == session_id_atual:
+                # Nunca remover a sessão que acabou de ser gravada
+                break
+            del self._sessoes[session_id]
+            total -= entrada[1]
+            self._contar('removidas_por_limite')
+
+    def remover(self, session_id):
+        with self._lock:
+            self._sessoes.pop(session_id, None)
+
+    def tamanhos(self):
+        with self._lock:
+            return {session_id: entrada[1] for session_id, entrada in self._sessoes.items()}
+
+
+class ArmazenamentoSQLite(ArmazenamentoAbasSeparadas):
+    """Sessões serializadas em um arquivo SQLite, compartilhado entre processos, com as abas na tabela abas"""
+
+    def __init__(self, caminho, ttl_segundos=TTL_SESSAO_PADRAO, limite_bytes=LIMITE_BYTES_SESSOES_PADRAO):
+        super().__init__(ttl_segundos)
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessoes (
+                    session_id TEXT PRIMARY KEY,
+                    dados BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS abas (
+                    session_id TEXT NOT NULL,
+                    chave TEXT NOT NULL,
+                    dados BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    PRIMARY KEY (session_id, chave)
+                )
+            """)
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def obter(self, session_id):
+        with self._conectar() as conn:
+            linha = conn.execute(
+                'SELECT dados, ultimo_acesso FROM sessoes WHERE session_id = ?', (session_id,)
+            ).fetchone()
+
+            if linha is None:
+                self._contar('faltas')
+                return None
+
+            if self._expirada(linha[1]):
+                self._apagar(conn, session_id)
+                self._contar('expiradas')
+                self._contar('faltas')
+                return None
+
+            conn.execute('UPDATE sessoes SET ultimo_acesso = ? WHERE session_id = ?', (time.time(), session_id))
+
+            def ler_aba(chave):
+                aba = conn.execute(
+                    'SELECT dados FROM abas WHERE session_id = ? AND chave = ?', (session_id, chave)
+                ).fetchone()
+                if aba is None:
+                    raise KeyError(chave)
+                return aba[0]
+
+            try:
+                dados = self._desserializar(session_id, linha[0], ler_aba)
+            except KeyError:
+                # Aba removida por outro processo entre as leituras: tratar como sessão ausente
+                self._contar('faltas')
+                return None
+
+        self._contar('acertos')
+        return dados
+
+    def salvar(self, session_id, dados):
+        with self._conectar() as conn:
+            existentes = dict(conn.execute('SELECT chave, tamanho FROM abas WHERE session_id = ?', (session_id,)).fetchall())
+            estado, novas, chaves = self._serializar(session_id, dados, existentes)
+
+            conn.executemany(
+                'INSERT OR REPLACE INTO abas (session_id, chave, dados, tamanho) VALUES (?, ?, ?, ?)',
+                [(session_id, chave, blob, len(blob)) for chave, (_, blob) in novas.items()]
+            )
+            conn.executemany(
+                'DELETE FROM abas WHERE session_id = ? AND chave = ?',
+                [(session_id, chave) for chave in set(existentes) - chaves]
+            )
+
+            tamanho = len(estado) + sum(
+                len(novas[chave][1]) if chave in novas else existentes[chave] for chave in chaves
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO sessoes (session_id, dados, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)',
+                (session_id, estado, tamanho, time.time())
+            )
+            self._remover_excedente(conn, session_id)
+        self._registrar_abas(session_id, novas)
+
+    @staticmethod
+    def _apagar(conn, session_id):
+        conn.execute('DELETE FROM sessoes WHERE session_id = ?', (session_id,))
+        conn.execute('DELETE FROM abas WHERE session_id = ?', (session_id,))
+
+    def _remover_excedente(self, conn, session_id_atual):
+        """Remove sessões expiradas e, depois, as usadas há mais tempo até caber no limite"""
+        if self.ttl_segundos is not None:
+            cursor = conn.execute('DELETE FROM sessoes WHERE ultimo_acesso < ?', (time.time() - self.ttl_segundos,))
+            if cursor.rowcount > 0:
+                self._contar('expiradas', cursor.rowcount)
+                conn.execute('DELETE FROM abas WHERE session_id NOT IN (SELECT session_id FROM sessoes)')
+
+        total = conn.execute('SELECT COALESCE(SUM(tamanho), 0) FROM sessoes').fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+
+        for session_id, tamanho in conn.execute(
+            'SELECT session_id, tamanho FROM sessoes WHERE session_id != ? ORDER BY ultimo_acesso',
+            (session_id_atual,)
+        ).fetchall():
+            if total <= self.limite_bytes:
+                break
+            self._apagar(conn, session_id)
+            total -= tamanho
+            self._contar('removidas_por_limite')
+
+    def remover(self, session_id):
+        with self._conectar() as conn:
+            self._apagar(conn, session_id)
+
+    def tamanhos(self):
+        with self._conectar() as conn:
+            return dict(conn.execute('SELECT session_id, tamanho FROM sessoes').fetchall())
+
+
+class ArmazenamentoMemoriaCompartilhada(ArmazenamentoAbasSeparadas):
+    """Sessões serializadas em segmentos de memória compartilhada, visíveis a todos os processos do host
+
+    Cada sessão tem um segmento com o estado e um segmento por aba, com o nome
+    do segmento da sessão seguido da chave da aba. Como um segmento é recriado a
+    cada gravação, leituras e gravações passam por uma trava fcntl entre
+    processos: compartilhada para ler, exclusiva para gravar ou remover.
+    """
+
+    # Cabeçalho de cada segmento: tamanho dos dados (uint64) e último acesso (double)
+    _CABECALHO = struct.Struct('<Qd')
+    _DIRETORIO_SHM = '/dev/shm'
+
+    def __init__(self, prefixo='dashboard_sessao', ttl_segundos=TTL_SESSAO_PADRAO,
+                 limite_bytes=LIMITE_BYTES_SESSOES_PADRAO):
+        super().__init__(ttl_segundos)
+        self.prefixo = prefixo
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        self._tamanho_nome = len(prefixo) + 1 + 24
+        diretorio_trava = self._DIRETORIO_SHM if os.path.isdir(self._DIRETORIO_SHM) else tempfile.gettempdir()
+        self._caminho_trava = os.path.join(diretorio_trava, f"{prefixo}.lock")
+
+    @contextmanager
+    def _travar(self, exclusiva):
+        """Trava entre processos (e entre threads, com um descritor por uso) dos segmentos deste prefixo"""
+        with open(self._caminho_trava, 'a') as arquivo_trava:
+            fcntl.flock(arquivo_trava, fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(arquivo_trava, fcntl.LOCK_UN)
+
+    def _nome_segmento(self, session_id):
+        return f"{self.prefixo}_{hashlib.sha1(session_id.encode('utf-8')).hexdigest()[:24]}"
+
+    @staticmethod
+    def _abrir(nome, **kwargs):
+        from multiprocessing import shared_memory, resource_tracker
+
+        shm = shared_memory.SharedMemory(name=nome, **kwargs)
+        # O segmento deve sobreviver ao processo que o criou
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+    def _ler_segmento(self, nome):
+        """Retorna (dados serializados, último acesso) de um segmento ou None"""
+        try:
+            shm = self._abrir(nome)
+        except FileNotFoundError:
+            return None
+        try:
+            tamanho, ultimo_acesso = self._CABECALHO.unpack_from(shm.buf, 0)
+            inicio = self._CABECALHO.size
+            return bytes(shm.buf[inicio:inicio + tamanho]), ultimo_acesso
+        finally:
+            shm.close()
+
+    def _escrever_segmento(self, nome, blob):
+        # Segmentos não mudam de tamanho: recriar a cada gravação (sempre com a trava exclusiva)
+        self._apagar_segmento(nome)
+        shm = self._abrir(nome, create=True, size=self._CABECALHO.size + len(blob))
+        try:
+            self._CABECALHO.pack_into(shm.buf, 0, len(blob), time.time())
+            shm.buf[self._CABECALHO.size:self._CABECALHO.size + len(blob)] = blob
+        finally:
+            shm.close()
+
+    def _apagar_segmento(self, nome):
+        from multiprocessing import shared_memory
+
+        try:
+            # Sem _abrir: o unlink() já remove o registro no resource_tracker
+            shm = shared_memory.SharedMemory(name=nome)
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _listar_segmentos(self):
+        """Lista os segmentos desta aplicação como (último acesso, tamanho, nome)"""
+        if not os.path.isdir(self._DIRETORIO_SHM):
+            return []
+
+        segmentos = []
+        for nome in os.listdir(self._DIRETORIO_SHM):
+            if not nome.startswith(self.prefixo + '_'):
+                continue
+            try:
+                segmentos.append((
+                    os.path.getmtime(os.path.join(self._DIRETORIO_SHM, nome)),
+                    os.path.getsize(os.path.join(self._DIRETORIO_SHM, nome)),
+                    nome
+                ))
+            except OSError:
+                continue
+        return segmentos
+
+    def _listar_sessoes(self):
+        """Agrupa os segmentos por sessão: {nome: [último acesso, tamanho total, segmentos das abas]}
+
+        O último acesso é o do segmento mais recente da sessão: o do estado é
+        atualizado a cada leitura, e as abas de uma gravação em andamento em outro
+        processo ainda não expiraram.
+        """
+        sessoes = {}
+        for ultimo_acesso, tamanho, nome in self._listar_segmentos():
+            sessao = sessoes.setdefault(nome[:self._tamanho_nome], [0.0, 0, []])
+            if len(nome) != self._tamanho_nome:
+                sessao[2].append(nome)
+            sessao[0] = max(sessao[0], ultimo_acesso)
+            sessao[1] += tamanho
+        return sessoes
+
+    def _apagar_sessao(self, nome, segmentos_abas):
+        self._apagar_segmento(nome)
+        for segmento in segmentos_abas:
+            self._apagar_segmento(segmento)
+
+    def obter(self, session_id):
+        nome = self._nome_segmento(session_id)
+        with self._travar(exclusiva=False):
+            conteudo = self._ler_segmento(nome)
+            if conteudo is None:
+                self._contar('faltas')
+                return None
+
+            blob, ultimo_acesso = conteudo
+            if not self._expirada(ultimo_acesso):
+                def ler_aba(chave):
+                    aba = self._ler_segmento(f"{nome}_{chave}")
+                    if aba is None:
+                        raise KeyError(chave)
+                    return aba[0]
+
+                try:
+                    dados = self._desserializar(session_id, blob, ler_aba)
+                except KeyError:
+                    # Estado gravado sem uma das abas (ex.: processo interrompido no meio da gravação)
+                    self._contar('faltas')
+                    return None
+                self._contar('acertos')
+
+                # Atualizar o último acesso no cabeçalho para a política LRU
+                try:
+                    shm = self._abrir(nome)
+                    try:
+                        self._CABECALHO.pack_into(shm.buf, 0, len(blob), time.time())
+                    finally:
+                        shm.close()
+                    os.utime(os.path.join(self._DIRETORIO_SHM, nome), None)
+                except OSError:
+                    pass
+
+                return dados
+
+        # Sessão expirada: removê-la com a trava exclusiva, se ninguém a regravou nesse meio tempo
+        with self._lock, self._travar(exclusiva=True):
+            conteudo = self._ler_segmento(nome)
+            if conteudo is not None and self._expirada(conteudo[1]):
+                self._apagar_sessao(nome, self._listar_sessoes().get(nome, [0.0, 0, []])[2])
+                self._contar('expiradas')
+        self._contar('faltas')
+        return None
+
+    def salvar(self, session_id, dados):
+        nome = self._nome_segmento(session_id)
+
+        with self._lock, self._travar(exclusiva=True):
+            segmentos_abas = self._listar_sessoes().get(nome, [0.0, 0, []])[2]
+            existentes = {segmento[len(nome) + 1:] for segmento in segmentos_abas}
+            estado, novas, chaves = self._serializar(session_id, dados, existentes)
+
+            for chave, (_, blob) in novas.items():
+                self._escrever_segmento(f"{nome}_{chave}", blob)
+            for chave in existentes - chaves:
+                self._apagar_segmento(f"{nome}_{chave}")
+            self._escrever_segmento(nome, estado)
+
+            self._remover_excedente(nome)
+        self._registrar_abas(session_id, novas)
+
+    def _remover_excedente(self, nome_atual):
+        """Remove sessões expiradas e, depois, as usadas há mais tempo até caber no limite"""
+        sessoes = self._listar_sessoes()
+        total = sum(tamanho for _, tamanho, _ in sessoes.values())
+
+        for nome, (ultimo_acesso, tamanho, segmentos_abas) in sorted(sessoes.items(), key=lambda item: item[1][0]):
+            if nome == nome_atual:
+                continue
+            if self._expirada(ultimo_acesso):
+                self._apagar_sessao(nome, segmentos_abas)
+                total -= tamanho
+                self._contar('expiradas')
+            elif total > self.limite_bytes:
+                self._apagar_sessao(nome, segmentos_abas)
+                total -= tamanho
+                self._contar('removidas_por_limite')
+
+    def remover(self, session_id):
+        nome = self._nome_segmento(session_id)
+        with self._lock, self._travar(exclusiva=True):
+            self._apagar_sessao(nome, self._listar_sessoes().get(nome, [0.0, 0, []])[2])
+
+    def tamanhos(self):
+        return {nome: tamanho for nome, (_, tamanho, _) in self._listar_sessoes().items()}
+
+
+def criar_armazenamento_sessao(backend='memoria', ttl_segundos=TTL_SESSAO_PADRAO,
+                               limite_bytes=LIMITE_BYTES_SESSOES_PADRAO, limite_sessoes=LIMITE_SESSOES_PADRAO,
+                               caminho=None):
+    """Cria o armazenamento de sessão conforme o backend configurado"""
+    if backend == 'memoria':
+        return ArmazenamentoMemoria(ttl_segundos, limite_bytes, limite_sessoes)
+    if backend == 'sqlite':
+        return ArmazenamentoSQLite(caminho, ttl_segundos, limite_bytes)
+    if backend == 'compartilhada':
+        return ArmazenamentoMemoriaCompartilhada(ttl_segundos=ttl_segundos, limite_bytes=limite_bytes)
+    raise ValueError(f"Backend de sessão desconhecido: {backend}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Mede quantos gráficos por segundo são renderizados com diferentes números de workers
+
+Uso:
+    python benchmark_graficos.py [quantidade_graficos]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from graficos import renderizar_grafico, renderizar_em_paralelo
+
+
+def gerar_tarefas(quantidade):
+    """Gera gráficos de exemplo com dados mensais, alternando os tipos de gráfico"""
+    rng = np.random.default_rng(42)
+    tipos = ['linha', 'barra', 'pizza']
+    tarefas = []
+    for i in range(quantidade):
+        df = pd.DataFrame({
+            'Data': pd.date_range('2022-01-01', periods=36, freq='MS'),
+            'Valor': rng.normal(100, 15, 36)
+        })
+        if tipos[i % 3] != 'pizza':
+            df['Meta'] = 100.0
+        tarefas.append({
+            'df': df,
+            'titulo': f'Indicador {i}',
+            'tipo_grafico': tipos[i % 3],
+            'mostrar_tendencia': i % 2 == 0
+        })
+    return tarefas
+
+
+def medir(tarefas, max_workers, usar_processos):
+    """Retorna gráficos por segundo para a configuração informada"""
+    inicio = time.perf_counter()
+    if max_workers == 1:
+        for tarefa in tarefas:
+            renderizar_grafico(**tarefa)
+    else:
+        renderizar_em_paralelo(tarefas, max_workers=max_workers, usar_processos=usar_processos)
+    return len(tarefas) / (time.perf_counter() - inicio)
+
+
+if __name__ == '__main__':
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    tarefas = gerar_tarefas(quantidade)
+    nucleos = os.cpu_count() or 1
+
+    # Aquecer caches de fontes do matplotlib
+    renderizar_grafico(**tarefas[0])
+
+    workers = sorted({1, 2, 4, nucleos} & set(range(1, nucleos + 1)))
+    base = medir(tarefas, 1, False)
+    print(f"{quantidade} gráficos, {nucleos} núcleo(s)")
+    print(f"{'modo':<10}{'workers':>8}{'gráficos/s':>14}{'ganho':>8}")
+    print(f"{'serial':<10}{1:>8}{base:>14.1f}{1.0:>7.1f}x")
+    for usar_processos, modo in ((False, 'threads'), (True, 'processos')):
+        for n in workers[1:]:
+            taxa = medir(tarefas, n, usar_processos)
+            print(f"{modo:<10}{n:>8}{taxa:>14.1f}{taxa / base:>7.1f}x")
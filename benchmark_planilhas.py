@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Mede o tempo de leitura de uma planilha com várias abas usando diferentes números de workers
+
+Uso:
+    python benchmark_planilhas.py [arquivo.xlsx]
+    python benchmark_planilhas.py --gerar [quantidade_abas] [linhas_por_aba]
+
+Sem arquivo, gera uma planilha de exemplo parecida com as consolidadas da Direção.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from carregador_planilhas import ler_planilha
+
+
+def gerar_planilha(caminho, quantidade_abas, linhas_por_aba):
+    """Gera uma planilha com abas de indicadores mensais"""
+    rng = np.random.default_rng(42)
+    with pd.ExcelWriter(caminho, engine='openpyxl') as writer:
+        for i in range(quantidade_abas):
+            df = pd.DataFrame({
+                'Data': pd.date_range('2000-01-01', periods=linhas_por_aba, freq='D'),
+                'Valor': rng.normal(100, 15, linhas_por_aba),
+                'Meta': 100.0,
+                'Responsável': [f'Pessoa {j % 7}' for j in range(linhas_por_aba)]
+            })
+            df.to_excel(writer, sheet_name=f'Indicador {i + 1}', index=False)
+
+
+def medir(caminho, max_workers, repeticoes=3):
+    """Retorna o menor tempo de leitura (segundos) entre as repetições"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        ler_planilha(caminho, max_workers=max_workers, limite_paralelo=0)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+if __name__ == '__main__':
+    argumentos = sys.argv[1:]
+    temporario = None
+
+    if argumentos and argumentos[0] != '--gerar':
+        caminho = argumentos[0]
+    else:
+        quantidade_abas = int(argumentos[1]) if len(argumentos) > 1 else 24
+        linhas_por_aba = int(argumentos[2]) if len(argumentos) > 2 else 2000
+        temporario = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        temporario.close()
+        caminho = temporario.name
+        print(f"Gerando planilha com {quantidade_abas} aba(s) de {linhas_por_aba} linha(s)...")
+        gerar_planilha(caminho, quantidade_abas, linhas_por_aba)
+
+    try:
+        nucleos = os.cpu_count() or 1
+        workers = sorted({1, 2, 4, 8, nucleos} & set(range(1, nucleos + 1)))
+
+        # Aquecer o pool de processos de cada tamanho antes de medir
+        for n in workers[1:]:
+            ler_planilha(caminho, max_workers=n, limite_paralelo=0)
+
+        base = medir(caminho, 1)
+        print(f"{os.path.basename(caminho)}: {os.path.getsize(caminho) / 1024 / 1024:.1f} MB, {nucleos} núcleo(s)")
+        print(f"{'workers':>8}{'tempo (s)':>12}{'ganho':>8}")
+        print(f"{1:>8}{base:>12.2f}{1.0:>7.1f}x")
+        for n in workers[1:]:
+            tempo = medir(caminho, n)
+            print(f"{n:>8}{tempo:>12.2f}{base / tempo:>7.1f}x")
+    finally:
+        if temporario is not None:
+            os.remove(caminho)
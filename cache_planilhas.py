@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import nullcontext
+import pandas as pd
+
+# Formato colunar preferido; sem o pyarrow, o cache usa pickle
+try:
+    import pyarrow  # noqa: F401
+    FORMATO_PADRAO = 'feather'
+except ImportError:
+    FORMATO_PADRAO = 'pickle'
+
+ARQUIVO_MANIFESTO = 'manifesto.json'
+LIMITE_CACHE_PADRAO = 512 * 1024 * 1024  # 512MB
+
+
+def compativel_com_arrow(df):
+    """Verifica se a aba pode ser convertida para Arrow (Feather/IPC) sem alterar os valores"""
+    if not all(isinstance(col, str) for col in df.columns) or df.columns.has_duplicates:
+        return False
+
+    # O Arrow converteria silenciosamente colunas com tipos mistos (ex.: datas e números)
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty'):
+            return False
+
+    return True
+
+
+def calcular_hash_arquivo(file_path, tamanho_bloco=1024 * 1024):
+    """Calcula o hash SHA-256 do conteúdo de um arquivo"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+def salvar_com_hash(origem, caminho_destino, tamanho_bloco=1024 * 1024, trava=None):
+    """Grava um fluxo em disco calculando o hash SHA-256 na mesma passada
+
+    O conteúdo vai para um temporário no mesmo diretório, renomeado por cima do
+    destino no final; com trava (um gerenciador de contexto), só a troca do
+    arquivo acontece dentro dela. Retorna (hash, tamanho em bytes).
+    """
+    sha256 = hashlib.sha256()
+    tamanho = 0
+    descritor, temporario = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(caminho_destino)), prefix='.recebendo-'
+    )
+    try:
+        with os.fdopen(descritor, 'wb') as saida:
+            for bloco in iter(lambda: origem.read(tamanho_bloco), b''):
+                sha256.update(bloco)
+                saida.write(bloco)
+                tamanho += len(bloco)
+        os.chmod(temporario, 0o644)
+        with trava if trava is not None else nullcontext():
+            os.replace(temporario, caminho_destino)
+    except Exception:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return sha256.hexdigest(), tamanho
+
+
+class CachePlanilhas:
+    """Cache em disco de planilhas já lidas, endereçado pelo hash do arquivo"""
+
+    def __init__(self, diretorio, limite_bytes=LIMITE_CACHE_PADRAO):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho_entrada(self, hash_arquivo):
+        return os.path.join(self.diretorio, hash_arquivo)
+
+    def obter(self, hash_arquivo):
+        """Retorna o dicionário {aba: DataFrame} do cache ou None se não existir"""
+        caminho = self._caminho_entrada(hash_arquivo)
+        caminho_manifesto = os.path.join(caminho, ARQUIVO_MANIFESTO)
+
+        try:
+            with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+                manifesto = json.load(f)
+
+            dados_planilha = {}
+            for aba in manifesto['abas']:
+                caminho_aba = os.path.join(caminho, aba['arquivo'])
+                if aba['formato'] == 'feather':
+                    dados_planilha[aba['nome']] = pd.read_feather(caminho_aba)
+                else:
+                    dados_planilha[aba['nome']] = pd.read_pickle(caminho_aba)
+
+            # Atualizar a data de acesso para a política LRU
+            os.utime(caminho_manifesto, None)
+
+            return dados_planilha
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Erro ao ler planilha do cache {hash_arquivo}: {str(e)}")
+            shutil.rmtree(caminho, ignore_errors=True)
+            return None
+
+    def bytes_economizados(self, hash_arquivo):
+        """Retorna a memória economizada pela normalização de tipos da entrada, ou None se não registrada"""
+        try:
+            with open(os.path.join(self._caminho_entrada(hash_arquivo), ARQUIVO_MANIFESTO), 'r', encoding='utf-8') as f:
+                return json.load(f).get('bytes_economizados')
+        except (OSError, ValueError):
+            return None
+
+    def armazenar(self, hash_arquivo, dados_planilha, bytes_economizados=None):
+        """Grava as abas da planilha no cache e aplica o limite de tamanho"""
+        caminho = self._caminho_entrada(hash_arquivo)
+        if os.path.exists(caminho):
+            return
+
+        # Gravar em um diretório temporário e renomear ao final
+        caminho_tmp = f"{caminho}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(caminho_tmp, exist_ok=True)
+
+            abas = []
+            tamanho = 0
+            for i, (nome_aba, df) in enumerate(dados_planilha.items()):
+                formato, arquivo = self._gravar_aba(caminho_tmp, i, df)
+                tamanho += os.path.getsize(os.path.join(caminho_tmp, arquivo))
+                abas.append({'nome': nome_aba, 'arquivo': arquivo, 'formato': formato})
+
+            manifesto = {'abas': abas, 'tamanho': tamanho, 'criado_em': time.time()}
+            if bytes_economizados is not None:
+                manifesto['bytes_economizados'] = bytes_economizados
+            with open(os.path.join(caminho_tmp, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f, ensure_ascii=False)
+
+            os.rename(caminho_tmp, caminho)
+        except OSError:
+            # Outra requisição gravou a mesma planilha ao mesmo tempo
+            shutil.rmtree(caminho_tmp, ignore_errors=True)
+            return
+        except Exception as e:
+            print(f"Erro ao gravar planilha no cache {hash_arquivo}: {str(e)}")
+            shutil.rmtree(caminho_tmp, ignore_errors=True)
+            return
+
+        self.remover_excedente()
+
+    def _gravar_aba(self, diretorio, indice, df):
+        """Grava uma aba no formato colunar, usando pickle quando o formato não suporta os dados"""
+        if FORMATO_PADRAO == 'feather' and compativel_com_arrow(df):
+            arquivo = f"aba_{indice:04d}.feather"
+            try:
+                # O Feather exige índice padrão
+                df.reset_index(drop=True).to_feather(os.path.join(diretorio, arquivo))
+                return 'feather', arquivo
+            except Exception:
+                if os.path.exists(os.path.join(diretorio, arquivo)):
+                    os.remove(os.path.join(diretorio, arquivo))
+
+        arquivo = f"aba_{indice:04d}.pkl"
+        df.to_pickle(os.path.join(diretorio, arquivo))
+        return 'pickle', arquivo
+
+    def _listar_entradas(self):
+        """Lista as entradas do cache como (data de acesso, tamanho, caminho)"""
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome)
+            caminho_manifesto = os.path.join(caminho, ARQUIVO_MANIFESTO)
+            try:
+                with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+                    tamanho = json.load(f).get('tamanho', 0)
+                entradas.append((os.path.getmtime(caminho_manifesto), tamanho, caminho))
+            except (OSError, ValueError):
+                continue
+        return entradas
+
+    def remover_excedente(self):
+        """Remove as entradas usadas há mais tempo até o cache caber no limite"""
+        with self._lock:
+            entradas = sorted(self._listar_entradas())
+            total = sum(tamanho for _, tamanho, _ in entradas)
+
+            for _, tamanho, caminho in entradas:
+                if total <= self.limite_bytes:
+                    break
+                shutil.rmtree(caminho, ignore_errors=True)
+                total -= tamanho
+
+    def estatisticas(self):
+        """Retorna o número de entradas e o tamanho total ocupado pelo cache"""
+        entradas = self._listar_entradas()
+        return {
+            'entradas': len(entradas),
+            'tamanho_bytes': sum(tamanho for _, tamanho, _ in entradas),
+            'limite_bytes': self.limite_bytes
+        }
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import zipfile
+import tempfile
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.utils import secure_filename
+import pandas as pd
+from cache_planilhas import compativel_com_arrow
+
+# As abas lidas em outros processos voltam como buffers Arrow IPC; sem o pyarrow, por pickle
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Tamanho (em bytes) a partir do qual a leitura em modo streaming é usada
+LIMITE_STREAMING_PADRAO = 8 * 1024 * 1024
+
+# Tamanho (em bytes) a partir do qual as abas são lidas em paralelo, quando há workers
+LIMITE_PARALELO_PADRAO = 2 * 1024 * 1024
+WORKERS_LEITURA_PADRAO = 1  # 1 = leitura serial
+
+# Leitura de vários arquivos de uma vez (upload em lote)
+WORKERS_LOTE_PADRAO = min(4, os.cpu_count() or 1)
+LIMITE_DESCOMPACTADO_PADRAO = 256 * 1024 * 1024  # Conteúdo máximo extraído de um .zip
+EXTENSOES_PLANILHA = ('.xlsx', '.xls')
+
+
+def _ler_aba_streaming(ws):
+    """Lê uma aba do openpyxl em modo somente leitura e retorna um DataFrame"""
+    dados = []
+    for linha in ws.iter_rows(values_only=True):
+        # Remover células vazias no fim da linha, como faz o pd.read_excel
+        linha = list(linha)
+        while linha and linha[-1] is None:
+            linha.pop()
+        dados.append(linha)
+
+    # Remover linhas vazias no fim da aba
+    while dados and not dados[-1]:
+        dados.pop()
+
+    if not dados:
+        return pd.DataFrame()
+
+    largura = max(len(linha) for linha in dados)
+    dados = [linha + [None] * (largura - len(linha)) for linha in dados]
+
+    # A primeira linha é usada como cabeçalho, como no pd.read_excel
+    return pd.DataFrame(dados[1:], columns=_nomes_colunas(dados[0]))
+
+
+def _nomes_colunas(cabecalho):
+    """Gera os nomes das colunas seguindo a convenção do pd.read_excel"""
+    colunas = []
+    contagem = {}
+    for i, nome in enumerate(cabecalho):
+        if nome is None:
+            nome = f'Unnamed: {i}'
+
+        # Nomes repetidos recebem sufixo numérico (ex.: "Valor.1")
+        if nome in contagem:
+            contagem[nome] += 1
+            nome = f'{nome}.{contagem[nome]}'
+        else:
+            contagem[nome] = 0
+        colunas.append(nome)
+    return colunas
+
+
+def _ler_planilha_streaming(file_path):
+    """Lê todas as abas com o openpyxl em modo somente leitura, em uma única abertura"""
+    from openpyxl import load_workbook
+
+    dados_planilha = {}
+    tempos_abas = {}
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            inicio = time.perf_counter()
+            dados_planilha[ws.title] = _ler_aba_streaming(ws)
+            tempos_abas[ws.title] = time.perf_counter() - inicio
+    finally:
+        wb.close()
+
+    return dados_planilha, tempos_abas
+
+
+def _ler_planilha_completa(file_path):
+    """Lê todas as abas reaproveitando um único pd.ExcelFile"""
+    dados_planilha = {}
+    tempos_abas = {}
+
+    # O arquivo é descompactado e o workbook é analisado apenas uma vez
+    with pd.ExcelFile(file_path) as xls:
+        for sheet_name in xls.sheet_names:
+            inicio = time.perf_counter()
+            dados_planilha[sheet_name] = xls.parse(sheet_name)
+            tempos_abas[sheet_name] = time.perf_counter() - inicio
+
+    return dados_planilha, tempos_abas
+
+
+def _serializar_aba(df):
+    """Converte a aba em um buffer Arrow IPC, mais barato de transferir que o pickle do DataFrame"""
+    if pa is not None and compativel_com_arrow(df):
+        try:
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            destino = pa.BufferOutputStream()
+            with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+            return 'arrow', destino.getvalue()
+        except (pa.ArrowException, ValueError, TypeError):
+            pass
+    return 'pickle', df
+
+
+def _desserializar_aba(formato, conteudo):
+    if formato == 'arrow':
+        return pa.ipc.open_stream(conteudo).read_all().to_pandas()
+    return conteudo
+
+
+def _ler_grupo_abas(file_path, nomes_abas, modo_streaming):
+    """Executado em um processo do pool: lê um grupo de abas e as devolve serializadas"""
+    resultado = []
+    if modo_streaming:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for nome in nomes_abas:
+                inicio = time.perf_counter()
+                df = _ler_aba_streaming(wb[nome])
+                resultado.append((nome, time.perf_counter() - inicio) + _serializar_aba(df))
+        finally:
+            wb.close()
+    else:
+        with pd.ExcelFile(file_path) as xls:
+            for nome in nomes_abas:
+                inicio = time.perf_counter()
+                df = xls.parse(nome)
+                resultado.append((nome, time.perf_counter() - inicio) + _serializar_aba(df))
+    return resultado
+
+
+_pool_leitura = None
+_pool_leitura_config = None
+_trava_pool_leitura = threading.Lock()
+
+
+def _obter_pool_leitura(max_workers):
+    """Pool de processos reaproveitado entre leituras (recriado após um fork ou mudança de tamanho)"""
+    global _pool_leitura, _pool_leitura_config
+    with _trava_pool_leitura:
+        config = (os.getpid(), max_workers)
+        if _pool_leitura is None or _pool_leitura_config != config:
+            if _pool_leitura is not None and _pool_leitura_config[0] == os.getpid():
+                _pool_leitura.shutdown(wait=False)
+            _pool_leitura = ProcessPoolExecutor(max_workers=max_workers)
+            _pool_leitura_config = config
+        return _pool_leitura
+
+
+def _nomes_abas(file_path):
+    """Lista as abas de um .xlsx sem ler o conteúdo delas"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def _ler_planilha_paralela(file_path, nomes_abas, modo_streaming, max_workers):
+    """Divide as abas entre processos; cada processo abre o arquivo uma vez e lê o seu grupo"""
+    max_workers = min(max_workers, len(nomes_abas))
+    grupos = [nomes_abas[i::max_workers] for i in range(max_workers)]
+    pool = _obter_pool_leitura(max_workers)
+
+    lidas = {}
+    futuros = [pool.submit(_ler_grupo_abas, file_path, grupo, modo_streaming) for grupo in grupos]
+    for futuro in futuros:
+        for nome, tempo, formato, conteudo in futuro.result():
+            lidas[nome] = (_desserializar_aba(formato, conteudo), tempo)
+
+    # Manter a ordem das abas no arquivo
+    dados_planilha = {nome: lidas[nome][0] for nome in nomes_abas}
+    tempos_abas = {nome: lidas[nome][1] for nome in nomes_abas}
+    return dados_planilha, tempos_abas
+
+
+def ler_planilha(file_path, modo_streaming=None, limite_streaming=LIMITE_STREAMING_PADRAO,
+                 max_workers=WORKERS_LEITURA_PADRAO, limite_paralelo=LIMITE_PARALELO_PADRAO):
+    """Lê todas as abas de uma planilha em uma única passada e retorna (dados, tempos por aba)
+
+    Se modo_streaming for None, o modo somente leitura do openpyxl é usado
+    automaticamente para arquivos .xlsx maiores que limite_streaming.
+    Com max_workers > 1, arquivos .xlsx a partir de limite_paralelo e com mais de
+    uma aba são lidos em um pool de processos; abaixo disso a leitura é serial.
+    """
+    eh_xlsx = file_path.lower().endswith('.xlsx')
+    tamanho = os.path.getsize(file_path)
+
+    if modo_streaming is None:
+        modo_streaming = eh_xlsx and tamanho >= limite_streaming
+
+    if max_workers and max_workers > 1 and eh_xlsx and tamanho >= limite_paralelo:
+        nomes_abas = _nomes_abas(file_path)
+        if len(nomes_abas) > 1:
+            return _ler_planilha_paralela(file_path, nomes_abas, modo_streaming, max_workers)
+
+    if modo_streaming:
+        return _ler_planilha_streaming(file_path)
+
+    return _ler_planilha_completa(file_path)
+
+
+def _ler_arquivo_serializado(file_path, modo_streaming, limite_streaming):
+    """Executado em um processo do pool: lê um arquivo inteiro e devolve as abas serializadas"""
+    dados_planilha, tempos_abas = ler_planilha(file_path, modo_streaming, limite_streaming)
+    return [(nome, tempos_abas[nome]) + _serializar_aba(df) for nome, df in dados_planilha.items()]
+
+
+def ler_varias_planilhas(caminhos, max_workers=WORKERS_LOTE_PADRAO, modo_streaming=None,
+                         limite_streaming=LIMITE_STREAMING_PADRAO):
+    """Lê vários arquivos, um por processo, e retorna {caminho: (dados, tempos por aba) ou a exceção}"""
+    resultados = {}
+    if not max_workers or max_workers <= 1 or len(caminhos) <= 1:
+        for caminho in caminhos:
+            try:
+                resultados[caminho] = ler_planilha(caminho, modo_streaming, limite_streaming)
+            except Exception as e:
+                resultados[caminho] = e
+        return resultados
+
+    pool = _obter_pool_leitura(max_workers)
+    futuros = {
+        caminho: pool.submit(_ler_arquivo_serializado, caminho, modo_streaming, limite_streaming)
+        for caminho in caminhos
+    }
+    for caminho, futuro in futuros.items():
+        try:
+            abas = futuro.result()
+            resultados[caminho] = (
+                {nome: _desserializar_aba(formato, conteudo) for nome, _, formato, conteudo in abas},
+                {nome: tempo for nome, tempo, _, _ in abas}
+            )
+        except Exception as e:
+            resultados[caminho] = e
+    return resultados
+
+
+def extrair_planilhas_zip(arquivo_zip, destino, limite_bytes=LIMITE_DESCOMPACTADO_PADRAO, travar=None):
+    """Extrai as planilhas de um .zip para o destino e retorna os caminhos gravados
+
+    Os nomes passam por secure_filename (sem diretórios) e o total descompactado
+    é limitado antes de qualquer extração. Planilhas que resultam no mesmo nome
+    (ex.: em pastas diferentes) são rejeitadas, em vez de uma sobrescrever a outra.
+    Todas as planilhas são extraídas para temporários antes de qualquer uma
+    substituir o destino, então uma falha no meio não deixa extração parcial; com
+    travar(nome), a troca de cada arquivo acontece dentro da trava retornada.
+    """
+    with zipfile.ZipFile(arquivo_zip) as zf:
+        membros = [
+            info for info in zf.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+            and info.filename.lower().endswith(EXTENSOES_PLANILHA)
+        ]
+
+        total = sum(info.file_size for info in membros)
+        if total > limite_bytes:
+            raise ValueError(
+                f"Conteúdo descompactado ({total / 1024 / 1024:.1f} MB) acima do limite "
+                f"de {limite_bytes / 1024 / 1024:.1f} MB"
+            )
+
+        nomes = {}
+        for info in membros:
+            nome = secure_filename(os.path.basename(info.filename))
+            if nome:
+                nomes.setdefault(nome, []).append(info)
+        repetidos = sorted(nome for nome, infos in nomes.items() if len(infos) > 1)
+        if repetidos:
+            raise ValueError(f"Mais de uma planilha do .zip resulta no mesmo nome: {', '.join(repetidos)}")
+
+        temporarios = {}
+        extraidos = 0
+        try:
+            for nome, (info,) in nomes.items():
+                descritor, temporarios[nome] = tempfile.mkstemp(dir=os.path.abspath(destino), prefix='.recebendo-')
+                with zf.open(info) as origem, os.fdopen(descritor, 'wb') as saida:
+                    while True:
+                        bloco = origem.read(1024 * 1024)
+                        if not bloco:
+                            break
+                        # O tamanho declarado no .zip pode ser falso
+                        extraidos += len(bloco)
+                        if extraidos > limite_bytes:
+                            raise ValueError("Conteúdo descompactado acima do limite")
+                        saida.write(bloco)
+                os.chmod(temporarios[nome], 0o644)
+
+            caminhos = []
+            for nome, temporario in temporarios.items():
+                caminho = os.path.join(destino, nome)
+                with travar(nome) if travar is not None else nullcontext():
+                    os.replace(temporario, caminho)
+                caminhos.append(caminho)
+            return caminhos
+        finally:
+            # Temporários que não chegaram a substituir o destino
+            for temporario in temporarios.values():
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+
+
+def formatar_tempos_abas(tempos_abas):
+    """Formata os tempos de leitura por aba para exibição no log"""
+    total = sum(tempos_abas.values())
+    partes = [f"{aba}: {tempo * 1000:.1f} ms" for aba, tempo in tempos_abas.items()]
+    return f"{len(tempos_abas)} aba(s) em {total * 1000:.1f} ms ({'; '.join(partes)})"
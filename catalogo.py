@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Catálogo em memória dos IDs de setores e indicadores
+
+As tabelas setores e indicadores são pequenas e quase nunca mudam, mas eram
+consultadas a cada gravação, migração e consulta só para trocar nomes por IDs.
+O catálogo carrega as duas de uma vez, resolve os nomes sem ir ao banco e se
+recarrega quando o TTL vence, depois de escritas nessas tabelas e quando um
+nome não é encontrado (pode ter sido criado por outro processo). Indicadores
+que ainda não existem são criados com um único upsert.
+"""
+
+import time
+import threading
+
+TTL_CATALOGO_PADRAO = 300  # Segundos até o catálogo ser recarregado do banco
+INTERVALO_RECARGA_FALHA_PADRAO = 5  # Segundos mínimos de idade do catálogo para recarregar após um nome não encontrado
+
+
+class CatalogoIndicadores:
+    """Resolve nomes de setores e indicadores em IDs a partir de uma cópia local das duas tabelas
+
+    carregar() deve retornar (setores, indicadores), com setores como pares
+    (id, nome) e indicadores como trincas (id, nome, setor_id).
+    criar_indicador(setor_id, nome) deve fazer o upsert e retornar o ID.
+    Um nome não encontrado recarrega o catálogo uma vez, se a última carga tiver
+    mais de intervalo_recarga_falha segundos, e é procurado de novo.
+    """
+
+    def __init__(self, carregar, criar_indicador, ttl_segundos=TTL_CATALOGO_PADRAO,
+                 intervalo_recarga_falha=INTERVALO_RECARGA_FALHA_PADRAO):
+        self._carregar = carregar
+        self._criar_indicador = criar_indicador
+        self.ttl_segundos = ttl_segundos
+        self.intervalo_recarga_falha = intervalo_recarga_falha
+        self._trava = threading.Lock()
+        self._setores = {}  # nome -> id
+        self._indicadores = {}  # (setor_id, nome) -> id
+        self._carregado_em = None
+        self.recargas = 0
+        self.recargas_por_falha = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.criados = 0
+
+    def recarregar(self):
+        """Lê as duas tabelas do banco e substitui o catálogo"""
+        setores, indicadores = self._carregar()
+        with self._trava:
+            self._setores = {nome: setor_id for setor_id, nome in setores}
+            self._indicadores = {(setor_id, nome): indicador_id for indicador_id, nome, setor_id in indicadores}
+            self._carregado_em = time.monotonic()
+            self.recargas += 1
+
+    def invalidar(self):
+        """Força a recarga no próximo acesso (usar depois de escritas feitas fora do catálogo)"""
+        with self._trava:
+            self._carregado_em = None
+
+    def _atualizar_se_vencido(self):
+        with self._trava:
+            vencido = self._carregado_em is None or time.monotonic() - self._carregado_em > self.ttl_segundos
+        if vencido:
+            self.recarregar()
+
+    def _recarregar_apos_falha(self):
+        """Recarrega o catálogo depois de um nome não encontrado, a menos que a carga seja recente; retorna se recarregou"""
+        with self._trava:
+            recente = (
+                self._carregado_em is not None
+                and time.monotonic() - self._carregado_em < self.intervalo_recarga_falha
+            )
+            if not recente:
+                self.recargas_por_falha += 1
+        if recente:
+            return False
+
+        self.invalidar()
+        self._atualizar_se_vencido()
+        return True
+
+    def _buscar(self, setor, indicador):
+        with self._trava:
+            setor_id = self._setores.get(setor)
+            return setor_id, self._indicadores.get((setor_id, indicador)) if setor_id is not None else None
+
+    def id_setor(self, setor):
+        """ID do setor, ou None se não existir no banco"""
+        self._atualizar_se_vencido()
+        with self._trava:
+            setor_id = self._setores.get(setor)
+        if setor_id is None and self._recarregar_apos_falha():
+            with self._trava:
+                setor_id = self._setores.get(setor)
+        return setor_id
+
+    def id_indicador(self, setor, indicador, criar=False):
+        """ID do indicador do setor, ou None se não existir; com criar=True, cria o indicador que faltar
+
+        Retorna None se o setor não existir, mesmo com criar=True.
+        """
+        self._atualizar_se_vencido()
+        setor_id, indicador_id = self._buscar(setor, indicador)
+        # Com criar=True e o setor conhecido, o upsert já resolve o ID sem recarregar o catálogo
+        if indicador_id is None and (setor_id is None or not criar) and self._recarregar_apos_falha():
+            setor_id, indicador_id = self._buscar(setor, indicador)
+
+        with self._trava:
+            if indicador_id is not None:
+                self.acertos += 1
+                return indicador_id
+            self.falhas += 1
+
+        if setor_id is None or not criar:
+            return None
+
+        # O upsert devolve o ID mesmo se outro processo tiver criado o indicador antes
+        indicador_id = self._criar_indicador(setor_id, indicador)
+        with self._trava:
+            self._indicadores[(setor_id, indicador)] = indicador_id
+            self.criados += 1
+        return indicador_id
+
+    def indicadores_do_setor(self, setor):
+        """Nomes dos indicadores cadastrados para o setor"""
+        self._atualizar_se_vencido()
+        with self._trava:
+            setor_id = self._setores.get(setor)
+            return [nome for (id_setor, nome) in self._indicadores if id_setor == setor_id]
+
+    def ids_indicadores(self, setor):
+        """{nome: id} dos indicadores cadastrados para o setor"""
+        self._atualizar_se_vencido()
+        with self._trava:
+            setor_id = self._setores.get(setor)
+            return {nome: indicador_id for (id_setor, nome), indicador_id in self._indicadores.items() if id_setor == setor_id}
+
+    def estatisticas(self):
+        """Tamanho do catálogo, idade da última carga e contadores de acerto"""
+        with self._trava:
+            return {
+                'setores': len(self._setores),
+                'indicadores': len(self._indicadores),
+                'idade_segundos': round(time.monotonic() - self._carregado_em, 1) if self._carregado_em is not None else None,
+                'ttl_segundos': self.ttl_segundos,
+                'recargas': self.recargas,
+                'recargas_por_falha': self.recargas_por_falha,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'indicadores_criados': self.criados
+            }
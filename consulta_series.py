@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Consulta da série de valores de um indicador, com filtro, agregação e paginação feitos no banco
+
+A mesma consulta existe em duas formas: montar_sql_serie gera o SQL usado pelo
+app PostgreSQL, e sql/consultar_serie.sql define a função chamada por RPC no
+Supabase. Só os pontos pedidos (já agregados por período) saem do banco.
+"""
+
+from datetime import datetime
+import pandas as pd
+
+PERIODOS = {'mes': 'month', 'trimestre': 'quarter', 'ano': 'year'}  # Nome na API -> unidade do date_trunc
+FUNCOES_AGREGACAO = {
+    'media': 'avg({coluna})',
+    'soma': 'sum({coluna})',
+    'minimo': 'min({coluna})',
+    'maximo': 'max({coluna})',
+    'ultimo': '(array_agg({coluna} ORDER BY data DESC))[1]'
+}
+TAMANHO_PAGINA_PADRAO = 500
+TAMANHO_PAGINA_MAXIMO = 5000
+
+
+def _ler_data(texto, nome):
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        raise ValueError(f"Parâmetro {nome} inválido: use o formato AAAA-MM-DD")
+
+
+def _ler_inteiro(texto, nome, minimo):
+    try:
+        valor = int(texto)
+    except ValueError:
+        raise ValueError(f"Parâmetro {nome} inválido: {texto}")
+    if valor < minimo:
+        raise ValueError(f"Parâmetro {nome} deve ser no mínimo {minimo}")
+    return valor
+
+
+def ler_parametros_consulta(args):
+    """Valida os parâmetros da consulta (data_inicio, data_fim, periodo, funcao, ultimos, pagina, tamanho_pagina)
+
+    Levanta ValueError com a mensagem para o usuário se algum parâmetro for inválido.
+    """
+    parametros = {
+        'data_inicio': _ler_data(args['data_inicio'], 'data_inicio') if args.get('data_inicio') else None,
+        'data_fim': _ler_data(args['data_fim'], 'data_fim') if args.get('data_fim') else None,
+        'periodo': args.get('periodo') or None,
+        'funcao': args.get('funcao') or 'media',
+        'ultimos': _ler_inteiro(args['ultimos'], 'ultimos', 1) if args.get('ultimos') else None,
+        'pagina': _ler_inteiro(args['pagina'], 'pagina', 1) if args.get('pagina') else 1,
+        'tamanho_pagina': _ler_inteiro(args['tamanho_pagina'], 'tamanho_pagina', 1)
+        if args.get('tamanho_pagina') else TAMANHO_PAGINA_PADRAO
+    }
+
+    if parametros['periodo'] is not None and parametros['periodo'] not in PERIODOS:
+        raise ValueError(f"Período não suportado: {parametros['periodo']} (use {', '.join(PERIODOS)})")
+    if parametros['funcao'] not in FUNCOES_AGREGACAO:
+        raise ValueError(f"Função não suportada: {parametros['funcao']} (use {', '.join(FUNCOES_AGREGACAO)})")
+    if parametros['tamanho_pagina'] > TAMANHO_PAGINA_MAXIMO:
+        raise ValueError(f"Parâmetro tamanho_pagina deve ser no máximo {TAMANHO_PAGINA_MAXIMO}")
+
+    # A data final inclui o dia inteiro
+    if parametros['data_fim'] is not None and len(args['data_fim']) <= 10:
+        parametros['data_fim'] = parametros['data_fim'].replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    return parametros
+
+
+def parametros_serie(**valores):
+    """Parâmetros de consulta para uso interno; tamanho_pagina=None traz a série sem paginação"""
+    parametros = {
+        'data_inicio': None,
+        'data_fim': None,
+        'periodo': None,
+        'funcao': 'media',
+        'ultimos': None,
+        'pagina': 1,
+        'tamanho_pagina': None
+    }
+    parametros.update(valores)
+    return parametros
+
+
+def _deslocamento(parametros):
+    if parametros['tamanho_pagina'] is None:
+        return 0
+    return (parametros['pagina'] - 1) * parametros['tamanho_pagina']
+
+
+def montar_sql_serie(indicador_id, parametros):
+    """Monta (SQL, valores) da série de um indicador no PostgreSQL
+
+    Cada linha retornada tem data, valor, meta, quantidade (valores no ponto) e
+    total (pontos da série inteira, antes da paginação). Numa página além do fim,
+    vem uma única linha com data nula e o total.
+    """
+    valores = {
+        'indicador_id': indicador_id,
+        'limite': parametros['tamanho_pagina'],  # LIMIT NULL não limita
+        'deslocamento': _deslocamento(parametros)
+    }
+
+    filtros = ['indicador_id = %(indicador_id)s']
+    if parametros['data_inicio'] is not None:
+        filtros.append('data >= %(data_inicio)s')
+        valores['data_inicio'] = parametros['data_inicio']
+    if parametros['data_fim'] is not None:
+        filtros.append('data <= %(data_fim)s')
+        valores['data_fim'] = parametros['data_fim']
+
+    if parametros['periodo'] is None:
+        pontos = f"""
+            SELECT data, valor, meta, 1 AS quantidade
+            FROM valores_indicadores
+            WHERE {' AND '.join(filtros)}
+        """
+    else:
+        funcao = FUNCOES_AGREGACAO[parametros['funcao']]
+        pontos = f"""
+            SELECT date_trunc('{PERIODOS[parametros['periodo']]}', data) AS data,
+                   {funcao.format(coluna='valor')} AS valor,
+                   {funcao.format(coluna='meta')} AS meta,
+                   count(*) AS quantidade
+            FROM valores_indicadores
+            WHERE {' AND '.join(filtros)}
+            GROUP BY 1
+        """
+
+    # Os N pontos mais recentes são escolhidos antes da paginação
+    selecionados = 'SELECT * FROM pontos'
+    if parametros['ultimos'] is not None:
+        selecionados += ' ORDER BY data DESC LIMIT %(ultimos)s'
+        valores['ultimos'] = parametros['ultimos']
+
+    # O total é contado antes da paginação e sai mesmo quando a página está vazia
+    sql = f"""
+        WITH pontos AS ({pontos}),
+        selecionados AS ({selecionados}),
+        contagem AS (SELECT count(*) AS total FROM selecionados),
+        pagina AS (
+            SELECT * FROM selecionados
+            ORDER BY data
+            LIMIT %(limite)s OFFSET %(deslocamento)s
+        )
+        SELECT pagina.data, pagina.valor, pagina.meta, pagina.quantidade, contagem.total
+        FROM contagem
+        LEFT JOIN pagina ON true
+        ORDER BY pagina.data
+    """
+    return sql, valores
+
+
+def argumentos_rpc_serie(indicador_id, parametros):
+    """Argumentos da função consultar_serie (sql/consultar_serie.sql) para o RPC do Supabase"""
+    return {
+        'p_indicador_id': indicador_id,
+        'p_periodo': parametros['periodo'],
+        'p_funcao': parametros['funcao'],
+        'p_data_inicio': parametros['data_inicio'].isoformat() if parametros['data_inicio'] else None,
+        'p_data_fim': parametros['data_fim'].isoformat() if parametros['data_fim'] else None,
+        'p_ultimos': parametros['ultimos'],
+        'p_limite': parametros['tamanho_pagina'],
+        'p_deslocamento': _deslocamento(parametros)
+    }
+
+
+def resposta_serie(linhas, parametros):
+    """Monta a resposta da API a partir das linhas (data, valor, meta, quantidade, total)
+
+    Uma linha com data nula só informa o total (página além do fim da série).
+    """
+    pontos = []
+    total = 0
+    for data, valor, meta, quantidade, total in linhas:
+        if data is None:
+            continue
+        pontos.append({
+            'data': data.isoformat() if hasattr(data, 'isoformat') else data,
+            'valor': valor,
+            'meta': meta,
+            'quantidade': quantidade
+        })
+
+    return {
+        'pontos': pontos,
+        'total': total,
+        'pagina': parametros['pagina'],
+        'tamanho_pagina': parametros['tamanho_pagina'],
+        'paginas': -(-total // (parametros['tamanho_pagina'] or total)) if total else 0,
+        'periodo': parametros['periodo'],
+        'funcao': parametros['funcao'] if parametros['periodo'] else None
+    }
+
+
+def dataframe_serie(resposta):
+    """Converte a resposta da consulta no DataFrame (Data, Valor e Meta, se houver) exibido pelo dashboard"""
+    pontos = resposta['pontos']
+    if not pontos:
+        return None
+
+    dados = {
+        'Data': pd.to_datetime([ponto['data'] for ponto in pontos]),
+        'Valor': [ponto['valor'] for ponto in pontos]
+    }
+
+    # Adicionar meta se existir
+    if any(ponto['meta'] is not None for ponto in pontos):
+        dados['Meta'] = [ponto['meta'] for ponto in pontos]
+
+    return pd.DataFrame(dados)
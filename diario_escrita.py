@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Diário de linhas anexadas às planilhas
+
+As linhas salvas pelo formulário são gravadas primeiro em um diário SQLite
+(uma inserção pequena) e depois levadas para o arquivo .xlsx em lotes por um
+gravador em segundo plano, uma thread por planilha, em vez de regravar a aba
+inteira dentro da requisição.
+"""
+
+import os
+import json
+import time
+import fcntl
+import atexit
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from openpyxl import load_workbook
+
+INTERVALO_COMPACTACAO_PADRAO = 30  # Segundos entre verificações do diário sem novas edições
+ATRASO_GRAVACAO_PADRAO = 2  # Segundos agrupando edições antes de gravar uma planilha
+
+
+class DiarioEscrita:
+    """Linhas pendentes de gravação nas planilhas, em um arquivo SQLite compartilhado entre processos"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS linhas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    arquivo TEXT NOT NULL,
+                    aba TEXT NOT NULL,
+                    colunas TEXT NOT NULL,
+                    valores TEXT NOT NULL,
+                    criado_em REAL NOT NULL
+                )
+            """)
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def registrar(self, arquivo, aba, colunas, linhas):
+        """Acrescenta linhas (listas de valores na ordem de colunas) ao diário"""
+        colunas_json = json.dumps([str(col) for col in colunas])
+        agora = time.time()
+        with self._conectar() as conn:
+            conn.executemany(
+                'INSERT INTO linhas (arquivo, aba, colunas, valores, criado_em) VALUES (?, ?, ?, ?, ?)',
+                [(arquivo, aba, colunas_json, json.dumps(valores, default=str), agora) for valores in linhas]
+            )
+
+    def registrar_dataframe(self, arquivo, aba, df_novos, colunas):
+        """Acrescenta as linhas de um DataFrame ao diário, alinhadas às colunas da aba"""
+        df_alinhado = df_novos.reindex(columns=colunas).astype(object)
+        df_alinhado = df_alinhado.where(df_alinhado.notna(), None)
+        self.registrar(arquivo, aba, colunas, df_alinhado.values.tolist())
+
+    def pendentes(self, arquivo=None):
+        """Retorna {arquivo: {aba: [(id, colunas, valores), ...]}} na ordem de gravação"""
+        consulta = 'SELECT id, arquivo, aba, colunas, valores FROM linhas'
+        parametros = ()
+        if arquivo is not None:
+            consulta += ' WHERE arquivo = ?'
+            parametros = (arquivo,)
+
+        with self._conectar() as conn:
+            registros = conn.execute(consulta + ' ORDER BY id', parametros).fetchall()
+
+        agrupados = OrderedDict()
+        for id_linha, arquivo_linha, aba, colunas, valores in registros:
+            agrupados.setdefault(arquivo_linha, OrderedDict()).setdefault(aba, []).append(
+                (id_linha, json.loads(colunas), json.loads(valores))
+            )
+        return agrupados
+
+    def confirmar(self, ids):
+        """Remove do diário as linhas já gravadas na planilha"""
+        with self._conectar() as conn:
+            conn.executemany('DELETE FROM linhas WHERE id = ?', [(id_linha,) for id_linha in ids])
+
+    def descartar(self, arquivo):
+        """Remove do diário as linhas pendentes de uma planilha; retorna quantas foram removidas"""
+        with self._conectar() as conn:
+            return conn.execute('DELETE FROM linhas WHERE arquivo = ?', (arquivo,)).rowcount
+
+    def contar_pendentes(self):
+        """Retorna {arquivo: quantidade de linhas pendentes}"""
+        with self._conectar() as conn:
+            return dict(conn.execute('SELECT arquivo, COUNT(*) FROM linhas GROUP BY arquivo').fetchall())
+
+
+def _ultima_linha_preenchida(ws):
+    """Última linha com algum valor (max_row conta linhas vazias formatadas)"""
+    for linha in range(ws.max_row, 0, -1):
+        if any(celula.value is not None for celula in ws[linha]):
+            return linha
+    return 0
+
+
+def anexar_linhas_planilha(arquivo, linhas_por_aba):
+    """Anexa ao final de cada aba as linhas {aba: [(colunas, valores), ...]} e salva o arquivo uma vez
+
+    O arquivo é gravado em um temporário no mesmo diretório e renomeado por cima do
+    original, para que um leitor nunca encontre um .xlsx pela metade.
+    """
+    wb = load_workbook(arquivo)
+    try:
+        for aba, linhas in linhas_por_aba.items():
+            if aba in wb.sheetnames:
+                ws = wb[aba]
+                proxima = _ultima_linha_preenchida(ws) + 1
+            else:
+                # Aba nova: o cabeçalho vem das colunas da primeira linha
+                ws = wb.create_sheet(aba)
+                for indice_coluna, coluna in enumerate(linhas[0][0], start=1):
+                    ws.cell(row=1, column=indice_coluna, value=coluna)
+                proxima = 2
+
+            for _, valores in linhas:
+                for indice_coluna, valor in enumerate(valores, start=1):
+                    if valor is not None:
+                        ws.cell(row=proxima, column=indice_coluna, value=valor)
+                proxima += 1
+
+        descritor, temporario = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(arquivo)), prefix='.gravando-', suffix='.xlsx'
+        )
+        os.close(descritor)
+        try:
+            wb.save(temporario)
+            shutil.copymode(arquivo, temporario)
+            os.replace(temporario, arquivo)
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+    finally:
+        wb.close()
+
+
+@contextmanager
+def travar_arquivo(caminho_trava):
+    """Trava exclusiva entre processos (fcntl), liberada ao sair do bloco"""
+    with open(caminho_trava, 'a') as arquivo_trava:
+        fcntl.flock(arquivo_trava, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo_trava, fcntl.LOCK_UN)
+
+
+class _EscritorPlanilha(threading.Thread):
+    """Thread única de gravação de uma planilha
+
+    Ao ser notificada, aguarda o intervalo de agrupamento para juntar as edições
+    que chegarem nesse meio tempo e grava todas em uma só passada.
+    """
+
+    def __init__(self, compactador, arquivo):
+        super().__init__(name=f'gravacao-{arquivo}', daemon=True)
+        self.compactador = compactador
+        self.arquivo = arquivo
+        self.acordar = threading.Event()
+
+    def run(self):
+        parar = self.compactador._parar
+        while not parar.is_set():
+            self.acordar.wait(self.compactador.intervalo_segundos)
+            if not parar.is_set():
+                parar.wait(self.compactador.atraso_segundos)
+            self.acordar.clear()
+            self.compactador.compactar(self.arquivo)
+        self.compactador.compactar(self.arquivo)
+
+
+class CompactadorPlanilhas:
+    """Grava em segundo plano as linhas do diário nos arquivos .xlsx
+
+    Cada planilha tem uma fila própria (as linhas dela no diário) e uma única thread
+    de gravação no processo. Entre processos, uma trava de arquivo por planilha
+    garante um gravador por vez; as linhas pendentes são lidas já com a trava,
+    então nenhuma linha é gravada duas vezes.
+    """
+
+    def __init__(self, diario, diretorio, intervalo_segundos=INTERVALO_COMPACTACAO_PADRAO,
+                 atraso_segundos=ATRASO_GRAVACAO_PADRAO):
+        self.diario = diario
+        self.diretorio = diretorio
+        self.intervalo_segundos = intervalo_segundos
+        self.atraso_segundos = atraso_segundos
+        self.diretorio_travas = os.path.join(os.path.dirname(os.path.abspath(diario.caminho)), 'travas')
+        os.makedirs(self.diretorio_travas, exist_ok=True)
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._escritores = {}
+        self._situacao = {}
+        self._pid = None
+        atexit.register(self.parar)
+
+    def _verificar_processo(self):
+        """Threads não sobrevivem a um fork: cada processo começa sem escritores"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._escritores = {}
+            self._situacao = {}
+
+    def agendar(self, arquivo):
+        """Agenda a gravação das linhas pendentes de uma planilha"""
+        with self._trava:
+            primeiro_agendamento = self._pid != os.getpid()
+            self._verificar_processo()
+            escritor = self._escritores.get(arquivo)
+            if escritor is None or not escritor.is_alive():
+                escritor = _EscritorPlanilha(self, arquivo)
+                self._escritores[arquivo] = escritor
+                escritor.start()
+        escritor.acordar.set()
+
+        if primeiro_agendamento:
+            self.iniciar()
+
+    def iniciar(self):
+        """Agenda as planilhas com linhas deixadas no diário por processos anteriores"""
+        for arquivo in self.diario.contar_pendentes():
+            self.agendar(arquivo)
+
+    def parar(self):
+        """Encerra os escritores após uma última gravação"""
+        if self._pid != os.getpid():
+            return
+        self._parar.set()
+        for escritor in list(self._escritores.values()):
+            escritor.acordar.set()
+            if escritor is not threading.current_thread():
+                escritor.join(timeout=30)
+
+    def _atualizar_situacao(self, arquivo, **valores):
+        with self._trava:
+            situacao = self._situacao.setdefault(arquivo, {
+                'gravando': False,
+                'linhas_gravadas': 0,
+                'gravacoes': 0,
+                'ultima_gravacao': None,
+                'ultimo_erro': None
+            })
+            situacao.update(valores)
+            return situacao
+
+    def _caminho_trava(self, arquivo):
+        return os.path.join(self.diretorio_travas, arquivo + '.lock')
+
+    @contextmanager
+    def substituindo(self, arquivo):
+        """Trava a planilha enquanto uma nova versão enviada substitui o arquivo
+
+        Sem a trava, uma gravação em andamento poderia renomear a versão anterior
+        (com as linhas do diário) por cima da nova. As linhas pendentes gravadas
+        contra a versão anterior são descartadas: a versão enviada passa a ser a
+        referência, assim como na sessão, que descarta os blocos anexados ao
+        receber a planilha de novo.
+        """
+        with travar_arquivo(self._caminho_trava(arquivo)):
+            yield
+            descartadas = self.diario.descartar(arquivo)
+        if descartadas:
+            print(f"Aviso: {descartadas} linha(s) pendentes de {arquivo} descartadas do diário pela nova versão enviada")
+
+    def compactar(self, arquivo):
+        """Grava as linhas pendentes de uma planilha; retorna quantas foram gravadas"""
+        caminho = os.path.join(self.diretorio, arquivo)
+        self._atualizar_situacao(arquivo, gravando=True)
+        try:
+            with travar_arquivo(self._caminho_trava(arquivo)):
+                abas = self.diario.pendentes(arquivo).get(arquivo)
+                if not abas:
+                    return 0
+
+                ids = [id_linha for linhas in abas.values() for id_linha, _, _ in linhas]
+                if os.path.exists(caminho):
+                    anexar_linhas_planilha(caminho, {
+                        aba: [(colunas, valores) for _, colunas, valores in linhas]
+                        for aba, linhas in abas.items()
+                    })
+                else:
+                    print(f"Aviso: arquivo {caminho} não encontrado; {len(ids)} linha(s) descartadas do diário")
+
+                self.diario.confirmar(ids)
+        except Exception as e:
+            # As linhas continuam no diário para a próxima rodada
+            self._atualizar_situacao(arquivo, ultimo_erro=str(e))
+            print(f"Erro ao gravar o diário em {caminho}: {str(e)}")
+            return 0
+        finally:
+            self._atualizar_situacao(arquivo, gravando=False)
+
+        with self._trava:
+            situacao = self._situacao[arquivo]
+            situacao['linhas_gravadas'] += len(ids)
+            situacao['gravacoes'] += 1
+            situacao['ultima_gravacao'] = time.time()
+            situacao['ultimo_erro'] = None
+        return len(ids)
+
+    def estatisticas(self, arquivo=None):
+        """Retorna, por planilha, as linhas pendentes e a situação da gravação neste processo"""
+        pendentes = self.diario.contar_pendentes()
+        with self._trava:
+            situacoes = {nome: dict(situacao) for nome, situacao in self._situacao.items()}
+            ativos = {nome for nome, escritor in self._escritores.items() if escritor.is_alive()}
+
+        arquivos = {}
+        for nome in sorted(set(pendentes) | set(situacoes)):
+            if arquivo is not None and nome != arquivo:
+                continue
+            arquivos[nome] = dict(situacoes.get(nome, {}), pendentes=pendentes.get(nome, 0), escritor_ativo=nome in ativos)
+
+        return {
+            'sincronizado': all(situacao['pendentes'] == 0 for situacao in arquivos.values()),
+            'arquivos': arquivos
+        }
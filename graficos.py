@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import re
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+LIMITE_CACHE_GRAFICOS_PADRAO = 64 * 1024 * 1024  # 64MB
+LIMITE_CACHE_GRAFICOS_DISCO_PADRAO = 256 * 1024 * 1024  # 256MB
+
+# Formatos suportados e seus tipos MIME
+FORMATOS_GRAFICO = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+
+def calcular_impressao_df(df):
+    """Calcula um hash do conteúdo do DataFrame (valores, colunas e tipos)"""
+    sha1 = hashlib.sha1()
+    sha1.update(repr([(str(col), str(tipo)) for col, tipo in df.dtypes.items()]).encode('utf-8'))
+    try:
+        sha1.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    except TypeError:
+        # Células com objetos que o pandas não sabe hashear
+        sha1.update(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    return sha1.hexdigest()
+
+
+def identificar_coluna_x(df):
+    """Identifica a coluna usada no eixo x, priorizando colunas de data"""
+    for col in df.columns:
+        if 'data' in str(col).lower() or 'mes' in str(col).lower() or 'ano' in str(col).lower():
+            return col
+
+    # Se não encontrou coluna de data, usar a primeira coluna
+    if len(df.columns) > 0:
+        return df.columns[0]
+
+    return None
+
+
+def _valor_json(valor):
+    """Converte um valor do DataFrame para um tipo serializável em JSON"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    if isinstance(valor, (np.integer, np.floating)):
+        return valor.item()
+    if isinstance(valor, (int, float, bool)):
+        return valor
+    return str(valor)
+
+
+def calcular_tendencia(valores):
+    """Calcula os coeficientes [angular, linear] da reta de tendência, como no np.polyfit"""
+    y = np.asarray(valores, dtype=float)
+    x = np.arange(len(y))
+    validos = np.isfinite(y)
+    if validos.sum() < 2:
+        return None
+
+    angular, linear = np.polyfit(x[validos], y[validos], 1)
+    return [float(angular), float(linear)]
+
+
+def extrair_series(df, tipo_grafico='linha', mostrar_tendencia=False):
+    """Extrai o eixo x e as séries numéricas do DataFrame em formato colunar para desenho no navegador"""
+    dados_numericos = df.select_dtypes(include=['number'])
+    if dados_numericos.empty:
+        return None
+
+    # O gráfico de pizza só é usado para uma única série, como no gráfico renderizado
+    if tipo_grafico not in ('linha', 'barra', 'pizza') or (
+            tipo_grafico == 'pizza' and len(dados_numericos.columns) != 1):
+        tipo_grafico = 'linha'
+
+    x_col = identificar_coluna_x(df)
+    series = {
+        'tipo_grafico': tipo_grafico,
+        'eixo_x': str(x_col),
+        'x': [_valor_json(valor) for valor in df[x_col]] if x_col is not None else list(range(len(df))),
+        'colunas': [str(col) for col in dados_numericos.columns],
+        'valores': [[_valor_json(valor) for valor in dados_numericos[col]] for col in dados_numericos.columns]
+    }
+
+    # Coeficientes da linha de tendência calculados no servidor
+    if mostrar_tendencia and tipo_grafico == 'linha':
+        series['tendencias'] = [calcular_tendencia(dados_numericos[col].values) for col in dados_numericos.columns]
+
+    return series
+
+
+def renderizar_grafico(df, titulo, tipo_grafico='linha', mostrar_tendencia=False, formato='png'):
+    """Renderiza um gráfico com os dados do DataFrame e retorna os bytes da imagem
+
+    Usa a API orientada a objetos (Figure/FigureCanvasAgg) em vez do pyplot,
+    sem estado global, para que vários gráficos possam ser renderizados em
+    paralelo em threads ou processos.
+    """
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+
+    # Tentar identificar dados numéricos para o gráfico
+    dados_numericos = df.select_dtypes(include=['number'])
+
+    if not dados_numericos.empty:
+        # Identificar a coluna do eixo x
+        x_col = identificar_coluna_x(df)
+
+        # Criar gráfico conforme seleção
+        if tipo_grafico == 'linha':
+            # Gráfico de linha
+            for col in dados_numericos.columns:
+                ax.plot(df[x_col] if x_col else range(len(df)), dados_numericos[col],
+                       marker='o', label=str(col))
+
+                # Adicionar linha de tendência se selecionado
+                if mostrar_tendencia:
+                    x = range(len(df))
+                    y = dados_numericos[col].values
+                    z = np.polyfit(x, y, 1)
+                    p = np.poly1d(z)
+                    ax.plot(x, p(x), "r--", alpha=0.5)
+
+        elif tipo_grafico == 'barra':
+            # Gráfico de barras
+            if len(dados_numericos.columns) == 1:
+                # Uma única série
+                ax.bar(df[x_col] if x_col else range(len(df)),
+                      dados_numericos[dados_numericos.columns[0]])
+            else:
+                # Múltiplas séries
+                x = range(len(df))
+                width = 0.8 / len(dados_numericos.columns)
+                for i, col in enumerate(dados_numericos.columns):
+                    ax.bar([p + width*i for p in x], dados_numericos[col],
+                          width=width, label=str(col))
+
+        elif tipo_grafico == 'pizza' and len(dados_numericos.columns) == 1:
+            # Gráfico de pizza (apenas para uma série)
+            ax.pie(dados_numericos[dados_numericos.columns[0]],
+                  labels=df[x_col] if x_col else None,
+                  autopct='%1.1f%%', shadow=True, startangle=90)
+            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle
+
+        else:
+            # Gráfico de linha (padrão)
+            for col in dados_numericos.columns:
+                ax.plot(df[x_col] if x_col else range(len(df)), dados_numericos[col],
+                       marker='o', label=str(col))
+
+        ax.set_title(titulo)
+        ax.legend()
+        ax.grid(True, linestyle='--', alpha=0.7)
+
+        # Rotacionar labels do eixo x para melhor visualização
+        for label in ax.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+
+        fig.tight_layout()
+    else:
+        # Se não tiver dados numéricos, exibir mensagem
+        ax.text(0.5, 0.5, "Não foram encontrados dados numéricos para gerar o gráfico",
+               horizontalalignment='center', verticalalignment='center')
+
+    # Salvar o gráfico em um buffer de memória (a figura não fica registrada em estado global)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=formato)
+
+    return buf.getvalue()
+
+
+def _renderizar_tarefa(tarefa):
+    return renderizar_grafico(**tarefa)
+
+
+def renderizar_em_paralelo(tarefas, max_workers=None, usar_processos=False):
+    """Renderiza vários gráficos em paralelo e retorna os bytes na mesma ordem das tarefas
+
+    Cada tarefa é um dicionário com os argumentos de renderizar_grafico.
+    Com usar_processos=True, cada gráfico é renderizado em um processo
+    separado, evitando a disputa pelo GIL.
+    """
+    executor_classe = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+    with executor_classe(max_workers=max_workers) as executor:
+        return list(executor.map(_renderizar_tarefa, tarefas))
+
+
+def gerar_chave_grafico(df, titulo, tipo_grafico, mostrar_tendencia, formato='png'):
+    """Gera a chave do cache a partir dos dados e das opções de renderização"""
+    opcoes = f"{titulo}|{tipo_grafico}|{bool(mostrar_tendencia)}|{formato}"
+    return hashlib.sha1(f"{calcular_impressao_df(df)}|{opcoes}".encode('utf-8')).hexdigest()
+
+
+def chave_grafico_valida(chave):
+    """Indica se a chave tem o formato gerado por gerar_chave_grafico (sha1 em hexadecimal)"""
+    return re.fullmatch(r'[0-9a-f]{40}', chave) is not None
+
+
+class CacheGraficos:
+    """Cache LRU de gráficos renderizados, limitado em bytes
+
+    Com um diretório configurado, os gráficos também são gravados em disco
+    para que qualquer processo consiga servi-los pelo identificador. A chave é
+    o hash dos dados e das opções, então dados novos geram chaves novas e os
+    gráficos antigos só saem pelo limite de tamanho, sem invalidação.
+    """
+
+    def __init__(self, limite_bytes=LIMITE_CACHE_GRAFICOS_PADRAO, diretorio=None,
+                 limite_bytes_disco=LIMITE_CACHE_GRAFICOS_DISCO_PADRAO):
+        self.limite_bytes = limite_bytes
+        self.diretorio = diretorio
+        self.limite_bytes_disco = limite_bytes_disco
+        self._graficos = OrderedDict()  # chave -> (grafico, formato, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._contadores = {'acertos': 0, 'acertos_disco': 0, 'faltas': 0, 'removidos': 0}
+
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho_disco(self, chave, formato):
+        return os.path.join(self.diretorio, f"{chave}.{formato}")
+
+    def obter(self, chave):
+        """Retorna (gráfico, formato) ou None se o gráfico não estiver no cache"""
+        if not chave_grafico_valida(chave):
+            # A chave vira nome de arquivo: nada que não seja um hash chega ao disco
+            return None
+
+        with self._lock:
+            entrada = self._graficos.get(chave)
+            if entrada is not None:
+                self._graficos.move_to_end(chave)
+                self._contadores['acertos'] += 1
+                return entrada[0], entrada[1]
+
+        # Procurar o gráfico gravado por outro processo
+        if self.diretorio:
+            for formato in FORMATOS_GRAFICO:
+                caminho = self._caminho_disco(chave, formato)
+                try:
+                    with open(caminho, 'rb') as f:
+                        grafico = f.read()
+                    os.utime(caminho, None)
+                except OSError:
+                    continue
+                self._armazenar_memoria(chave, grafico, formato)
+                with self._lock:
+                    self._contadores['acertos_disco'] += 1
+                return grafico, formato
+
+        with self._lock:
+            self._contadores['faltas'] += 1
+        return None
+
+    def armazenar(self, chave, grafico, formato='png'):
+        """Armazena um gráfico, removendo os usados há mais tempo se o limite for excedido"""
+        self._armazenar_memoria(chave, grafico, formato)
+
+        if self.diretorio:
+            caminho = self._caminho_disco(chave, formato)
+            caminho_tmp = f"{caminho}.tmp-{os.getpid()}-{threading.get_ident()}"
+            try:
+                with open(caminho_tmp, 'wb') as f:
+                    f.write(grafico)
+                os.replace(caminho_tmp, caminho)
+                self._remover_excedente_disco()
+            except OSError as e:
+                print(f"Erro ao gravar gráfico {chave} em disco: {str(e)}")
+
+    def _armazenar_memoria(self, chave, grafico, formato):
+        tamanho = len(grafico)
+        if tamanho > self.limite_bytes:
+            return
+
+        with self._lock:
+            anterior = self._graficos.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+
+            self._graficos[chave] = (grafico, formato, tamanho)
+            self._bytes += tamanho
+
+            while self._bytes > self.limite_bytes:
+                _, entrada_removida = self._graficos.popitem(last=False)
+                self._bytes -= entrada_removida[2]
+                self._contadores['removidos'] += 1
+
+    def _remover_excedente_disco(self):
+        """Remove os arquivos usados há mais tempo até o diretório caber no limite"""
+        extensoes = tuple(f".{formato}" for formato in FORMATOS_GRAFICO)
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if not nome.endswith(extensoes):
+                # Temporários de gravações em andamento (*.tmp-*) e arquivos alheios ao cache
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                arquivos.append((os.path.getmtime(caminho), os.path.getsize(caminho), caminho))
+            except OSError:
+                continue
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.limite_bytes_disco:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+
+    def estatisticas(self):
+        """Retorna os contadores de uso e a ocupação do cache"""
+        with self._lock:
+            estatisticas = dict(self._contadores)
+            estatisticas.update({
+                'entradas': len(self._graficos),
+                'bytes': self._bytes,
+                'limite_bytes': self.limite_bytes
+            })
+            return estatisticas
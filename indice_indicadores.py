@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unicodedata
+
+
+def normalizar_nome(nome):
+    """Normaliza um nome para comparação: sem acentos, sem diferença de caixa e espaços simples"""
+    texto = unicodedata.normalize('NFKD', str(nome))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+def identificar_setor(nome_planilha, setores):
+    """Identifica o setor pelo nome da planilha (o primeiro setor da lista contido no nome)"""
+    chave_planilha = normalizar_nome(nome_planilha)
+    for setor in setores:
+        if normalizar_nome(setor) in chave_planilha:
+            return setor
+    return None
+
+
+class IndiceIndicadores:
+    """Índice de setores e indicadores das planilhas carregadas em uma sessão
+
+    Guarda, para cada setor normalizado, o nome normalizado de cada aba apontando
+    para (planilha, aba). A busca segue sempre a mesma ordem:
+      1. nome da aba igual ao indicador;
+      2. nome da aba contendo o indicador (menor nome em ordem alfabética);
+      3. alguma coluna da aba contendo o indicador (primeira aba em ordem alfabética).
+    O resultado de cada busca fica memorizado até o índice ser alterado.
+    """
+
+    def __init__(self):
+        self._setor_planilha = {}  # nome da planilha -> setor
+        self._abas = {}  # setor normalizado -> {aba normalizada: (planilha, aba)}
+        self._colunas = {}  # (planilha, aba) -> colunas normalizadas
+        self._buscas = {}  # (setor, indicador) normalizados -> resultado
+
+    def adicionar(self, setor, nome_planilha, nome_aba, df):
+        """Indexa (ou reindexa) uma aba; uma aba de mesmo nome no setor é substituída"""
+        self._setor_planilha[nome_planilha] = setor
+        self._abas.setdefault(normalizar_nome(setor), {})[normalizar_nome(nome_aba)] = (nome_planilha, nome_aba)
+        self._colunas[(nome_planilha, nome_aba)] = tuple(normalizar_nome(col) for col in df.columns)
+        self._buscas.clear()
+
+    def remover_planilha(self, nome_planilha):
+        """Remove as abas de uma planilha do índice
+
+        Retorna (setor, abas removidas, abas restauradas); uma aba restaurada é a de
+        outra planilha do setor com o mesmo nome, que estava encoberta pela removida.
+        """
+        setor = self._setor_planilha.pop(nome_planilha, None)
+        if setor is None:
+            return None, [], []
+
+        chave_setor = normalizar_nome(setor)
+        abas_setor = self._abas.get(chave_setor, {})
+        removidas = [aba for planilha, aba in self._colunas if planilha == nome_planilha]
+        restauradas = []
+
+        for nome_aba in removidas:
+            del self._colunas[(nome_planilha, nome_aba)]
+            chave_aba = normalizar_nome(nome_aba)
+            if abas_setor.get(chave_aba) != (nome_planilha, nome_aba):
+                continue
+
+            del abas_setor[chave_aba]
+            for planilha, aba in self._colunas:
+                if (normalizar_nome(aba) == chave_aba and
+                        normalizar_nome(self._setor_planilha[planilha]) == chave_setor):
+                    abas_setor[chave_aba] = (planilha, aba)
+                    restauradas.append((planilha, aba))
+                    break
+
+        self._buscas.clear()
+        return setor, removidas, restauradas
+
+    def setor_da_planilha(self, nome_planilha):
+        """Retorna o setor atribuído a uma planilha indexada"""
+        return self._setor_planilha.get(nome_planilha)
+
+    def buscar(self, setor, indicador):
+        """Retorna (planilha, aba) do indicador no setor, ou None"""
+        chave = (normalizar_nome(setor), normalizar_nome(indicador))
+        if chave not in self._buscas:
+            self._buscas[chave] = self._resolver(*chave)
+        return self._buscas[chave]
+
+    def _resolver(self, chave_setor, chave_indicador):
+        abas = self._abas.get(chave_setor, {})
+
+        # 1. Nome exato
+        if chave_indicador in abas:
+            return abas[chave_indicador]
+
+        candidatas = sorted(abas.items())
+
+        # 2. Nome da aba contendo o indicador
+        for chave_aba, localizacao in candidatas:
+            if chave_indicador in chave_aba:
+                return localizacao
+
+        # 3. Coluna contendo o indicador, em qualquer aba das planilhas do setor
+        for localizacao, colunas in sorted(self._colunas.items()):
+            if normalizar_nome(self._setor_planilha[localizacao[0]]) != chave_setor:
+                continue
+            if any(chave_indicador in coluna for coluna in colunas):
+                return localizacao
+
+        return None
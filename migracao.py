@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+
+TAMANHO_LOTE_PADRAO = 500
+
+
+def identificar_colunas(df):
+    """Identifica as colunas de data, valor e meta de uma aba"""
+    col_data = None
+    col_valor = None
+    col_meta = None
+
+    # Priorizar colunas de data
+    for col in df.columns:
+        if 'data' in str(col).lower() or 'mes' in str(col).lower() or 'ano' in str(col).lower():
+            col_data = col
+            break
+
+    # Identificar coluna de valor
+    for col in df.columns:
+        if 'valor' in str(col).lower() or 'resultado' in str(col).lower():
+            col_valor = col
+            break
+
+    # Se não encontrou coluna de valor, usar a primeira coluna numérica
+    if not col_valor:
+        for col in df.columns:
+            if pd.api.types.is_numeric_dtype(df[col]) and col != col_data:
+                col_valor = col
+                break
+
+    # Identificar coluna de meta
+    for col in df.columns:
+        if 'meta' in str(col).lower() or 'objetivo' in str(col).lower() or 'target' in str(col).lower():
+            col_meta = col
+            break
+
+    # Se não encontrou coluna de data, usar a primeira coluna
+    if not col_data and len(df.columns) > 0:
+        col_data = df.columns[0]
+
+    return col_data, col_valor, col_meta
+
+
+def _converter_datas(serie):
+    """Converte uma coluna inteira para datetime; valores inválidos viram NaT"""
+    if not pd.api.types.is_datetime64_any_dtype(serie):
+        try:
+            serie = pd.to_datetime(serie, errors='coerce', format='mixed')
+        except (TypeError, ValueError):
+            serie = pd.to_datetime(serie, errors='coerce')
+    return serie
+
+
+def preparar_valores(df, col_data, col_valor, col_meta=None):
+    """Converte as colunas de uma aba em um DataFrame com data, valor e meta, de forma vetorizada
+
+    Linhas com data inválida ficam de fora: datá-las com o dia atual faria a
+    marca da migração e os agregados avançarem para uma data que não existe na aba.
+    """
+    valores = df[col_valor]
+    if not pd.api.types.is_numeric_dtype(valores):
+        # Valores não numéricos passam a valer 0.0
+        valores = pd.to_numeric(valores, errors='coerce').fillna(0.0)
+
+    if col_meta is not None:
+        metas = pd.to_numeric(df[col_meta], errors='coerce')
+    else:
+        metas = pd.Series([float('nan')] * len(df), index=df.index)
+
+    df_valores = pd.DataFrame({
+        'data': _converter_datas(df[col_data]),
+        'valor': valores.astype(float),
+        'meta': metas.astype(float)
+    })
+    return df_valores[df_valores['data'].notna()]
+
+
+def registros_valores(df_valores, indicador_id):
+    """Converte o DataFrame preparado em registros prontos para inserção (NaN vira None)"""
+    datas = df_valores['data'].map(lambda data: data.isoformat())
+    valores = df_valores['valor'].astype(object).where(df_valores['valor'].notna(), None)
+    metas = df_valores['meta'].astype(object).where(df_valores['meta'].notna(), None)
+
+    return [
+        {"indicador_id": indicador_id, "data": data, "valor": valor, "meta": meta}
+        for data, valor, meta in zip(datas, valores, metas)
+    ]
+
+
+def _ler_marca(marca):
+    """Converte a data mais recente já gravada (datetime ou texto ISO do Supabase) em Timestamp sem fuso"""
+    marca = pd.Timestamp(marca)
+    if marca.tzinfo is not None:
+        marca = marca.tz_convert(None)
+    return marca
+
+
+def registros_pendentes(df_valores, indicador_id, marca=None):
+    """Registros para o upsert em (indicador_id, data), em ordem de data e com uma linha por data
+
+    Datas repetidas na aba ficam com a última linha. Com marca (a data mais
+    recente já gravada para o indicador), só as datas posteriores são enviadas.
+    A ordem de data faz a marca avançar a cada lote confirmado, então uma
+    migração interrompida continua de onde parou.
+    """
+    df_valores = df_valores[df_valores['data'].notna()]
+    df_valores = df_valores.sort_values('data', kind='stable').drop_duplicates('data', keep='last')
+    if marca is not None:
+        df_valores = df_valores[df_valores['data'] > _ler_marca(marca)]
+    return registros_valores(df_valores, indicador_id)
+
+
+def inicio_agregados(df_valores, pendentes, inicio=0):
+    """Data (texto ISO) a partir da qual recalcular os agregados depois de migrar uma aba, ou None
+
+    Normalmente é a primeira data enviada (pendentes está em ordem de data). Numa
+    retomada (inicio > 0), os lotes enviados antes da interrupção podem ter datas
+    anteriores às pendentes, então vale a primeira data da aba inteira.
+    """
+    if inicio > 0:
+        primeira = df_valores['data'].min()
+        return None if pd.isna(primeira) else primeira.isoformat()
+    return pendentes[0]['data'] if pendentes else None
+
+
+def em_lotes(itens, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Divide uma lista em lotes de tamanho fixo"""
+    for inicio in range(0, len(itens), tamanho_lote):
+        yield itens[inicio:inicio + tamanho_lote]
+
+
+def informar_progresso(linhas_enviadas, total_linhas, nome_planilha, nome_aba):
+    """Callback padrão de progresso da migração"""
+    print(f"Migração {nome_planilha}/{nome_aba}: {linhas_enviadas}/{total_linhas} linha(s) enviadas")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class Setor(Base):
+    """Setor da empresa"""
+    __tablename__ = 'setores'
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String, nullable=False, unique=True)
+
+
+class Indicador(Base):
+    """Indicador acompanhado por um setor"""
+    __tablename__ = 'indicadores'
+    __table_args__ = (
+        # Alvo do upsert que cria indicadores (sql/catalogo.sql)
+        Index('uq_indicadores_setor_nome', 'setor_id', 'nome', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String, nullable=False)
+    setor_id = Column(Integer, ForeignKey('setores.id'), nullable=False)
+
+
+class ValorIndicador(Base):
+    """Valor de um indicador em uma data"""
+    __tablename__ = 'valores_indicadores'
+    __table_args__ = (
+        # Um valor por data: alvo do upsert da migração e índice das consultas de série
+        # (sql/valores_indicadores_unicos.sql)
+        Index('uq_valores_indicadores_indicador_data', 'indicador_id', 'data', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    indicador_id = Column(Integer, ForeignKey('indicadores.id'), nullable=False)
+    data = Column(DateTime, nullable=False)
+    valor = Column(Float)
+    meta = Column(Float)
+
+
+class AgregadoIndicador(Base):
+    """Agregados de um indicador por mês, trimestre ou ano (agregados.py)"""
+    __tablename__ = 'agregados_indicadores'
+
+    indicador_id = Column(Integer, ForeignKey('indicadores.id'), primary_key=True)
+    periodo = Column(String, primary_key=True)  # mes, trimestre ou ano
+    inicio = Column(DateTime, primary_key=True)
+    ultimo = Column(Float)
+    media = Column(Float)
+    minimo = Column(Float)
+    maximo = Column(Float)
+    meta = Column(Float)
+    atingimento = Column(Float)  # Último valor sobre a meta, em %
+    quantidade = Column(Integer, nullable=False)
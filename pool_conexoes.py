@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+from psycopg2 import pool as pool_psycopg2
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+TAMANHO_POOL_PADRAO = 5
+EXCEDENTE_POOL_PADRAO = 10
+RECICLAR_CONEXOES_PADRAO = 1800  # Segundos até uma conexão ser substituída
+ESPERA_POOL_PADRAO = 30  # Segundos aguardando uma conexão livre
+
+
+class _MetricasPool:
+    """Contadores de retirada e espera de conexões de um pool"""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.retiradas = 0
+        self.conexoes_criadas = 0
+        self.em_uso = 0
+        self.esperas_esgotadas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar_retirada(self, espera):
+        with self._trava:
+            self.retiradas += 1
+            self.em_uso += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def registrar_devolucao(self):
+        with self._trava:
+            self.em_uso = max(0, self.em_uso - 1)
+
+    def registrar_conexao(self):
+        with self._trava:
+            self.conexoes_criadas += 1
+
+    def registrar_esgotamento(self):
+        with self._trava:
+            self.esperas_esgotadas += 1
+
+    def resumo(self):
+        with self._trava:
+            return {
+                'retiradas': self.retiradas,
+                'conexoes_criadas': self.conexoes_criadas,
+                'em_uso': self.em_uso,
+                'esperas_esgotadas': self.esperas_esgotadas,
+                'espera_media_ms': round(self.espera_total / self.retiradas * 1000, 3) if self.retiradas else 0.0,
+                'espera_maxima_ms': round(self.espera_maxima * 1000, 3)
+            }
+
+
+class PoolBancoDados:
+    """Engine do SQLAlchemy e pool psycopg2 compartilhados por todo o processo
+
+    Os dois pools são criados no primeiro uso e recriados após um fork, para que
+    cada worker do gunicorn tenha as próprias conexões.
+    """
+
+    def __init__(self, db_config, tamanho_pool=TAMANHO_POOL_PADRAO, excedente=EXCEDENTE_POOL_PADRAO,
+                 pre_ping=True, reciclar_segundos=RECICLAR_CONEXOES_PADRAO, espera_segundos=ESPERA_POOL_PADRAO):
+        self.db_config = db_config
+        self.tamanho_pool = tamanho_pool
+        self.excedente = excedente
+        self.pre_ping = pre_ping
+        self.reciclar_segundos = reciclar_segundos
+        self.espera_segundos = espera_segundos
+        self._trava = threading.Lock()
+        self._pid = None
+        self._engine = None
+        self._fabrica_sessoes = None
+        self._pool_psycopg2 = None
+        self._vagas_psycopg2 = None
+        self._metricas_engine = _MetricasPool()
+        self._metricas_psycopg2 = _MetricasPool()
+
+    def _url(self):
+        c = self.db_config
+        return f"postgresql://{c['user']}:{c['password']}@{c['host']}:{c['port']}/{c['database']}"
+
+    def _verificar_processo(self):
+        """Descarta pools herdados do processo pai (as conexões não podem ser compartilhadas)"""
+        if self._pid == os.getpid():
+            return
+        with self._trava:
+            if self._pid == os.getpid():
+                return
+            if self._engine is not None:
+                self._engine.dispose(close=False)
+            self._engine = None
+            self._fabrica_sessoes = None
+            self._pool_psycopg2 = None
+            self._vagas_psycopg2 = None
+            self._metricas_engine = _MetricasPool()
+            self._metricas_psycopg2 = _MetricasPool()
+            self._pid = os.getpid()
+
+    def engine(self):
+        """Retorna a engine do processo, criando-a no primeiro uso"""
+        self._verificar_processo()
+        if self._engine is None:
+            with self._trava:
+                if self._engine is None:
+                    engine = create_engine(
+                        self._url(),
+                        pool_size=self.tamanho_pool,
+                        max_overflow=self.excedente,
+                        pool_pre_ping=self.pre_ping,
+                        pool_recycle=self.reciclar_segundos,
+                        pool_timeout=self.espera_segundos
+                    )
+                    self._registrar_eventos(engine)
+                    self._fabrica_sessoes = sessionmaker(bind=engine)
+                    self._engine = engine
+        return self._engine
+
+    def _registrar_eventos(self, engine):
+        """Conta conexões abertas e devolvidas pela engine"""
+        metricas = self._metricas_engine
+
+        @event.listens_for(engine, 'connect')
+        def ao_conectar(conexao_dbapi, registro):
+            metricas.registrar_conexao()
+
+        @event.listens_for(engine, 'checkin')
+        def ao_devolver(conexao_dbapi, registro):
+            metricas.registrar_devolucao()
+
+    def criar_sessao(self):
+        """Cria uma sessão do SQLAlchemy já com uma conexão retirada do pool"""
+        self.engine()
+        sessao = self._fabrica_sessoes()
+
+        # Retirar a conexão agora para medir o tempo de espera pelo pool
+        inicio = time.perf_counter()
+        sessao.connection()
+        self._metricas_engine.registrar_retirada(time.perf_counter() - inicio)
+        return sessao
+
+    def _iniciar_pool_psycopg2(self):
+        self._verificar_processo()
+        if self._pool_psycopg2 is None:
+            with self._trava:
+                if self._pool_psycopg2 is None:
+                    maximo = self.tamanho_pool + self.excedente
+                    self._vagas_psycopg2 = threading.BoundedSemaphore(maximo)
+                    self._pool_psycopg2 = pool_psycopg2.ThreadedConnectionPool(
+                        0, maximo,
+                        host=self.db_config['host'],
+                        database=self.db_config['database'],
+                        user=self.db_config['user'],
+                        password=self.db_config['password'],
+                        port=self.db_config['port']
+                    )
+
+    def obter_conexao(self):
+        """Retira uma conexão psycopg2 do pool, aguardando uma vaga se todas estiverem em uso"""
+        self._iniciar_pool_psycopg2()
+
+        # O ThreadedConnectionPool falha quando esgotado; o semáforo faz a requisição esperar
+        inicio = time.perf_counter()
+        if not self._vagas_psycopg2.acquire(timeout=self.espera_segundos):
+            self._metricas_psycopg2.registrar_esgotamento()
+            raise pool_psycopg2.PoolError(
+                f"Nenhuma conexão livre após {self.espera_segundos}s de espera"
+            )
+
+        try:
+            conexoes_antes = len(self._pool_psycopg2._pool) + len(self._pool_psycopg2._used)
+            conn = self._pool_psycopg2.getconn()
+            if len(self._pool_psycopg2._pool) + len(self._pool_psycopg2._used) > conexoes_antes:
+                self._metricas_psycopg2.registrar_conexao()
+
+            # Conexões encerradas pelo servidor são descartadas e substituídas
+            if self.pre_ping and not self._conexao_valida(conn):
+                self._pool_psycopg2.putconn(conn, close=True)
+                conn = self._pool_psycopg2.getconn()
+                self._metricas_psycopg2.registrar_conexao()
+        except Exception:
+            self._vagas_psycopg2.release()
+            raise
+
+        self._metricas_psycopg2.registrar_retirada(time.perf_counter() - inicio)
+        return conn
+
+    def _conexao_valida(self, conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def devolver_conexao(self, conn):
+        """Devolve ao pool uma conexão obtida com obter_conexao"""
+        if conn is None or self._pool_psycopg2 is None:
+            return
+        try:
+            # Não devolver transações pendentes para o próximo usuário
+            if not conn.closed:
+                conn.rollback()
+            self._pool_psycopg2.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._vagas_psycopg2.release()
+            self._metricas_psycopg2.registrar_devolucao()
+
+    def estatisticas(self):
+        """Retorna as métricas dos dois pools do processo"""
+        self._verificar_processo()
+        estatisticas_engine = self._metricas_engine.resumo()
+        if self._engine is not None:
+            estatisticas_engine['status'] = self._engine.pool.status()
+
+        return {
+            'pid': os.getpid(),
+            'tamanho_pool': self.tamanho_pool,
+            'excedente': self.excedente,
+            'pre_ping': self.pre_ping,
+            'reciclar_segundos': self.reciclar_segundos,
+            'sqlalchemy': estatisticas_engine,
+            'psycopg2': self._metricas_psycopg2.resumo()
+        }
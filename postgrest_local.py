@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Servidor local que imita a API REST do Supabase (PostgREST) sobre SQLite
+
+Cobre só o que o dashboard usa: GET com select (incluindo recursos embutidos,
+com !inner), filtros (eq, neq, gt, gte, lt, lte, like, ilike, is, in), order,
+limit e offset, inclusive nos recursos embutidos; POST com Prefer
+return=representation/minimal e upsert por on_conflict; e as funções RPC
+consultar_serie e atualizar_agregados. Serve para testar o acesso ao banco sem um projeto hospedado.
+
+Uso:
+    python postgrest_local.py [banco.sqlite] [porta]
+
+e aponte o dashboard para ele com DASHBOARD_SUPABASE_URL=http://127.0.0.1:<porta>.
+"""
+
+import sys
+import json
+import sqlite3
+import threading
+import pandas as pd
+from agregados import calcular_agregados, COLUNAS_AGREGADOS
+from werkzeug.wrappers import Request, Response
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+PORTA_PADRAO = 54321
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS setores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS indicadores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        setor_id INTEGER NOT NULL REFERENCES setores (id)
+    );
+    CREATE TABLE IF NOT EXISTS valores_indicadores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        indicador_id INTEGER NOT NULL REFERENCES indicadores (id),
+        data TEXT NOT NULL,
+        valor REAL,
+        meta REAL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_indicadores_setor_nome ON indicadores (setor_id, nome);
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_valores_indicadores_indicador_data ON valores_indicadores (indicador_id, data);
+    CREATE TABLE IF NOT EXISTS agregados_indicadores (
+        indicador_id INTEGER NOT NULL REFERENCES indicadores (id),
+        periodo TEXT NOT NULL,
+        inicio TEXT NOT NULL,
+        ultimo REAL,
+        media REAL,
+        minimo REAL,
+        maximo REAL,
+        meta REAL,
+        atingimento REAL,
+        quantidade INTEGER NOT NULL,
+        PRIMARY KEY (indicador_id, periodo, inicio)
+    );
+"""
+
+PARAMETROS_RESERVADOS = ('select', 'order', 'limit', 'offset', 'on_conflict')
+OPERADORES = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'like': 'LIKE', 'ilike': 'LIKE'}
+
+
+class ErroRequisicao(Exception):
+    """Erro devolvido ao cliente como no PostgREST: status HTTP e {'message': ...}"""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _dividir_no_nivel(texto, separador=','):
+    """Divide o texto pelo separador, ignorando os que estão dentro de parênteses"""
+    partes, nivel, atual = [], 0, ''
+    for caractere in texto:
+        if caractere == '(':
+            nivel += 1
+        elif caractere == ')':
+            nivel -= 1
+        if caractere == separador and nivel == 0:
+            partes.append(atual)
+            atual = ''
+        else:
+            atual += caractere
+    if atual:
+        partes.append(atual)
+    return [parte.strip() for parte in partes if parte.strip()]
+
+
+def analisar_select(texto):
+    """Converte o parâmetro select em uma lista de colunas e recursos embutidos"""
+    itens = []
+    for parte in _dividir_no_nivel(texto or '*'):
+        alias = None
+        if ':' in parte.split('(')[0]:
+            alias, parte = parte.split(':', 1)
+
+        if '(' in parte:
+            nome, resto = parte.split('(', 1)
+            interno = nome.endswith('!inner')
+            nome = nome.split('!')[0]
+            itens.append({
+                'tipo': 'embutido',
+                'tabela': nome,
+                'alias': alias or nome,
+                'inner': interno,
+                'itens': analisar_select(resto[:-1])
+            })
+        else:
+            itens.append({'tipo': 'coluna', 'nome': parte, 'alias': alias or parte})
+    return itens
+
+
+def _condicao(coluna, expressao):
+    """Converte um filtro do PostgREST (ex.: eq.10, in.(1,2), is.null) em SQL e parâmetros"""
+    operador, _, valor = expressao.partition('.')
+    if operador == 'is':
+        literais = {'null': 'NULL', 'true': '1', 'false': '0'}
+        if valor not in literais:
+            raise ErroRequisicao(f'Valor inválido para is: {valor}')
+        return f'"{coluna}" IS {literais[valor]}', []
+    if operador == 'in':
+        valores = [item.strip().strip('"') for item in valor.strip('()').split(',') if item.strip()]
+        return f'"{coluna}" IN ({", ".join("?" for _ in valores)})', valores
+    if operador not in OPERADORES:
+        raise ErroRequisicao(f'Operador não suportado: {operador}')
+    if operador in ('like', 'ilike'):
+        valor = valor.replace('*', '%')
+    if operador == 'ilike':
+        return f'lower("{coluna}") LIKE lower(?)', [valor]
+    return f'"{coluna}" {OPERADORES[operador]} ?', [valor]
+
+
+def _ordenacao(texto):
+    termos = []
+    for termo in texto.split(','):
+        partes = termo.split('.')
+        direcao = 'DESC' if 'desc' in partes[1:] else 'ASC'
+        termos.append(f'"{partes[0]}" {direcao}')
+    return ', '.join(termos)
+
+
+class PostgrestLocal:
+    """Aplicação WSGI com a API REST sobre um arquivo SQLite"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.funcoes = {'consultar_serie': self._consultar_serie, 'atualizar_agregados': self._atualizar_agregados}
+        with self._conectar() as conn:
+            conn.executescript(ESQUEMA)
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        try:
+            resposta = self._despachar(request)
+        except ErroRequisicao as e:
+            resposta = Response(json.dumps({'message': str(e)}), status=e.status, mimetype='application/json')
+        except sqlite3.Error as e:
+            resposta = Response(json.dumps({'message': str(e)}), status=400, mimetype='application/json')
+        return resposta(environ, start_response)
+
+    def _despachar(self, request):
+        caminho = request.path.rstrip('/')
+        if not caminho.startswith('/rest/v1/'):
+            raise ErroRequisicao('Caminho não encontrado', 404)
+        recurso = caminho[len('/rest/v1/'):]
+
+        if recurso.startswith('rpc/') and request.method == 'POST':
+            funcao = self.funcoes.get(recurso[len('rpc/'):])
+            if funcao is None:
+                raise ErroRequisicao(f'Função não encontrada: {recurso}', 404)
+            return self._json(funcao(**(request.get_json(silent=True) or {})))
+
+        with self._conectar() as conn:
+            if not self._colunas(conn, recurso):
+                raise ErroRequisicao(f'Tabela não encontrada: {recurso}', 404)
+            if request.method == 'GET':
+                return self._json(self._selecionar(conn, recurso, request.args))
+            if request.method == 'POST':
+                return self._inserir(conn, recurso, request)
+        raise ErroRequisicao('Método não suportado', 405)
+
+    @staticmethod
+    def _json(dados, status=200):
+        return Response(json.dumps(dados, default=str), status=status, mimetype='application/json')
+
+    @staticmethod
+    def _colunas(conn, tabela):
+        return [linha['name'] for linha in conn.execute(f'PRAGMA table_info("{tabela}")')]
+
+    @staticmethod
+    def _relacao(conn, tabela, embutida):
+        """Retorna (coluna local, coluna remota, muitos) da chave estrangeira entre as duas tabelas"""
+        for chave in conn.execute(f'PRAGMA foreign_key_list("{tabela}")'):
+            if chave['table'] == embutida:
+                return chave['from'], chave['to'], False
+        for chave in conn.execute(f'PRAGMA foreign_key_list("{embutida}")'):
+            if chave['table'] == tabela:
+                return chave['to'], chave['from'], True
+        raise ErroRequisicao(f'Sem relação entre {tabela} e {embutida}')
+
+    def _consultar(self, conn, tabela, filtros, ordem=None):
+        condicoes, valores = [], []
+        for coluna, expressao in filtros:
+            condicao, parametros = _condicao(coluna, expressao)
+            condicoes.append(condicao)
+            valores.extend(parametros)
+
+        sql = f'SELECT * FROM "{tabela}"'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        if ordem:
+            sql += ' ORDER BY ' + _ordenacao(ordem)
+        return [dict(linha) for linha in conn.execute(sql, valores)]
+
+    def _resolver(self, conn, tabela, itens, argumentos, prefixo=''):
+        """Linhas da tabela com os recursos embutidos, aplicando os filtros do nível (prefixo) atual"""
+        filtros, ordem, limite, deslocamento = [], None, None, 0
+        for chave, expressao in argumentos:
+            if not chave.startswith(prefixo):
+                continue
+            nome = chave[len(prefixo):]
+            if '.' in nome:
+                continue
+            if nome == 'order':
+                ordem = expressao
+            elif nome == 'limit':
+                limite = int(expressao)
+            elif nome == 'offset':
+                deslocamento = int(expressao)
+            elif nome not in PARAMETROS_RESERVADOS:
+                filtros.append((nome, expressao))
+
+        linhas = self._consultar(conn, tabela, filtros, ordem)
+
+        for item in itens:
+            if item['tipo'] != 'embutido':
+                continue
+            local, remota, muitos = self._relacao(conn, tabela, item['tabela'])
+            relacionadas = self._resolver(
+                conn, item['tabela'], item['itens'] + [{'tipo': 'coluna', 'nome': remota, 'alias': '__chave'}],
+                argumentos, prefixo + item['alias'] + '.'
+            )
+
+            agrupadas = {}
+            for relacionada in relacionadas:
+                agrupadas.setdefault(relacionada.pop('__chave'), []).append(relacionada)
+
+            for linha in linhas:
+                encontradas = agrupadas.get(linha[local], [])
+                linha[item['alias']] = encontradas if muitos else (encontradas[0] if encontradas else None)
+            if item['inner']:
+                linhas = [linha for linha in linhas if linha[item['alias']]]
+
+        if limite is not None or deslocamento:
+            linhas = linhas[deslocamento:deslocamento + limite if limite is not None else None]
+        return [self._projetar(linha, itens) for linha in linhas]
+
+    @staticmethod
+    def _projetar(linha, itens):
+        projetada = {}
+        for item in itens:
+            if item['tipo'] == 'embutido':
+                projetada[item['alias']] = linha[item['alias']]
+            elif item['nome'] == '*':
+                projetada.update({chave: valor for chave, valor in linha.items() if not isinstance(valor, (list, dict))})
+            else:
+                projetada[item['alias']] = linha.get(item['nome'])
+        return projetada
+
+    def _selecionar(self, conn, tabela, argumentos):
+        itens = analisar_select(argumentos.get('select'))
+        return self._resolver(conn, tabela, itens, list(argumentos.items(multi=True)))
+
+    def _inserir(self, conn, tabela, request):
+        registros = request.get_json(silent=True)
+        if isinstance(registros, dict):
+            registros = [registros]
+        if not registros:
+            raise ErroRequisicao('Corpo da requisição vazio')
+
+        preferencias = {parte.strip() for parte in request.headers.get('Prefer', '').split(',')}
+        on_conflict = request.args.get('on_conflict')
+        colunas = list(registros[0])
+        nomes = ', '.join(f'"{coluna}"' for coluna in colunas)
+        sql = f'INSERT INTO "{tabela}" ({nomes}) VALUES ({", ".join("?" for _ in colunas)})'
+        if on_conflict:
+            alvo = ', '.join(f'"{coluna}"' for coluna in on_conflict.split(','))
+            if 'resolution=ignore-duplicates' in preferencias:
+                sql += f' ON CONFLICT ({alvo}) DO NOTHING'
+            else:
+                atualizacoes = ', '.join(f'"{coluna}" = excluded."{coluna}"' for coluna in colunas)
+                sql += f' ON CONFLICT ({alvo}) DO UPDATE SET {atualizacoes}'
+        sql += ' RETURNING *'
+
+        inseridas = []
+        for registro in registros:
+            inseridas.extend(dict(linha) for linha in conn.execute(sql, [registro.get(coluna) for coluna in colunas]))
+
+        if 'return=representation' in preferencias:
+            return self._json(inseridas, 201)
+        return Response(status=201)
+
+    def _consultar_serie(self, p_indicador_id, p_periodo=None, p_funcao='media', p_data_inicio=None, p_data_fim=None,
+                         p_ultimos=None, p_limite=500, p_deslocamento=0):
+        """Mesmo resultado da função de sql/consultar_serie.sql"""
+        with self._conectar() as conn:
+            df = pd.read_sql_query(
+                'SELECT data, valor, meta FROM valores_indicadores WHERE indicador_id = ? ORDER BY data',
+                conn, params=(p_indicador_id,)
+            )
+        df['data'] = pd.to_datetime(df['data'])
+        if p_data_inicio:
+            df = df[df['data'] >= pd.Timestamp(p_data_inicio)]
+        if p_data_fim:
+            df = df[df['data'] <= pd.Timestamp(p_data_fim)]
+
+        if p_periodo:
+            frequencias = {'mes': 'M', 'trimestre': 'Q', 'ano': 'Y'}
+            # 'ultimo' pega o valor da data mais recente mesmo se for nulo, como o array_agg do SQL
+            funcoes = {'media': 'mean', 'soma': 'sum', 'minimo': 'min', 'maximo': 'max', 'ultimo': lambda serie: serie.iloc[-1]}
+            grupos = df.groupby(df['data'].dt.to_period(frequencias[p_periodo]).dt.start_time)
+            df = grupos[['valor', 'meta']].agg(funcoes[p_funcao])
+            df['quantidade'] = grupos.size()
+            df = df.rename_axis('data').reset_index()
+        else:
+            df = df.assign(quantidade=1)
+
+        if p_ultimos:
+            df = df.tail(p_ultimos)
+        total = len(df)
+        df = df.iloc[p_deslocamento:p_deslocamento + p_limite if p_limite is not None else None]
+        if df.empty:
+            # Como o LEFT JOIN da função: uma linha sem ponto, só com o total
+            return [{'data': None, 'valor': None, 'meta': None, 'quantidade': None, 'total': total}]
+
+        return [
+            {
+                'data': linha.data.isoformat(),
+                'valor': None if pd.isna(linha.valor) else float(linha.valor),
+                'meta': None if pd.isna(linha.meta) else float(linha.meta),
+                'quantidade': int(linha.quantidade),
+                'total': total
+            }
+            for linha in df.itertuples(index=False)
+        ]
+
+
+    def _atualizar_agregados(self, p_indicador_id, p_desde=None):
+        """Mesmo efeito da função de sql/agregados.sql"""
+        with self._conectar() as conn:
+            df = pd.read_sql_query(
+                'SELECT data, valor, meta FROM valores_indicadores WHERE indicador_id = ?',
+                conn, params=(p_indicador_id,)
+            )
+            df['data'] = pd.to_datetime(df['data'])
+            agregados = calcular_agregados(df, p_desde)
+            agregados['inicio'] = agregados['inicio'].map(lambda inicio: inicio.isoformat())
+
+            colunas = ['indicador_id'] + COLUNAS_AGREGADOS
+            conn.executemany(
+                f'INSERT OR REPLACE INTO agregados_indicadores ({", ".join(colunas)}) VALUES ({", ".join("?" for _ in colunas)})',
+                [
+                    [p_indicador_id] + [None if pd.isna(valor) else valor for valor in linha]
+                    for linha in agregados[COLUNAS_AGREGADOS].astype(object).itertuples(index=False)
+                ]
+            )
+        return None
+
+
+class _ManipuladorSilencioso(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def iniciar_em_segundo_plano(caminho, host='127.0.0.1', porta=0):
+    """Inicia o servidor em uma thread, sem log por requisição; retorna (servidor, url). Use servidor.shutdown() para parar"""
+    servidor = make_server(host, porta, PostgrestLocal(caminho), threaded=True, request_handler=_ManipuladorSilencioso)
+    threading.Thread(target=servidor.serve_forever, name='postgrest-local', daemon=True).start()
+    return servidor, f'http://{host}:{servidor.server_port}'
+
+
+if __name__ == '__main__':
+    caminho = sys.argv[1] if len(sys.argv) > 1 else 'postgrest_local.sqlite'
+    porta = int(sys.argv[2]) if len(sys.argv) > 2 else PORTA_PADRAO
+    print(f"PostgREST local em http://127.0.0.1:{porta} (banco {caminho})")
+    make_server('127.0.0.1', porta, PostgrestLocal(caminho), threaded=True).serve_forever()
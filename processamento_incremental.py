@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Atualização incremental dos dados processados e do índice de indicadores
+
+Cada função aplica uma única alteração (planilha carregada, aba substituída ou
+linhas anexadas) à visão processada da sessão, com custo proporcional à alteração
+e não ao número de planilhas da sessão.
+"""
+
+import pandas as pd
+from indice_indicadores import IndiceIndicadores, identificar_setor
+from tipos_compactos import restaurar_tipos
+
+SETOR_PADRAO = "Outros"
+LIMITE_BLOCOS_PENDENTES = 32  # Blocos anexados a uma aba antes de consolidá-los
+
+
+def processar_planilhas(planilhas, setores):
+    """Monta do zero os dados processados e o índice de um conjunto de planilhas"""
+    dados_processados = {}
+    indice = IndiceIndicadores()
+    for nome_planilha, abas in planilhas.items():
+        adicionar_planilha(dados_processados, indice, planilhas, nome_planilha, abas, setores)
+    return dados_processados, indice
+
+
+def obter_visao(sessao, setores):
+    """Retorna (dados_processados, índice) da sessão, montando-os se a sessão ainda não tiver índice"""
+    if sessao.get('indice_indicadores') is None:
+        consolidar_sessao(sessao)
+        sessao['dados_processados'], sessao['indice_indicadores'] = processar_planilhas(
+            sessao.get('planilhas', {}), setores
+        )
+    return sessao['dados_processados'], sessao['indice_indicadores']
+
+
+def remover_planilha(dados_processados, indice, planilhas, nome_planilha):
+    """Retira da visão processada as abas de uma planilha"""
+    setor, removidas, restauradas = indice.remover_planilha(nome_planilha)
+    if setor is None:
+        return
+
+    abas_setor = dados_processados.get(setor, {})
+    for nome_aba in removidas:
+        abas_setor.pop(nome_aba, None)
+
+    # Abas de mesmo nome em outra planilha do setor voltam a aparecer
+    for planilha, aba in restauradas:
+        abas_setor[aba] = planilhas[planilha][aba]
+
+    if not abas_setor:
+        dados_processados.pop(setor, None)
+
+
+def adicionar_planilha(dados_processados, indice, planilhas, nome_planilha, abas, setores):
+    """Aplica uma planilha carregada (ou recarregada com o mesmo nome) à visão processada"""
+    if indice.setor_da_planilha(nome_planilha) is not None:
+        remover_planilha(dados_processados, indice, planilhas, nome_planilha)
+
+    # Identificar o setor com base no nome da planilha
+    setor = identificar_setor(nome_planilha, setores) or SETOR_PADRAO
+
+    for nome_aba, df in abas.items():
+        dados_processados.setdefault(setor, {})[nome_aba] = df
+        indice.adicionar(setor, nome_planilha, nome_aba, df)
+
+
+def substituir_aba(dados_processados, indice, nome_planilha, nome_aba, df):
+    """Aplica a substituição do conteúdo de uma aba à visão processada"""
+    setor = indice.setor_da_planilha(nome_planilha) or SETOR_PADRAO
+    dados_processados.setdefault(setor, {})[nome_aba] = df
+    indice.adicionar(setor, nome_planilha, nome_aba, df)
+
+
+def anexar_linhas(sessao, nome_planilha, nome_aba, df_novos):
+    """Anexa linhas a uma aba sem copiar o DataFrame: as linhas ficam em blocos até a próxima leitura"""
+    blocos = sessao.setdefault('blocos_pendentes', {}).setdefault((nome_planilha, nome_aba), [])
+    blocos.append(df_novos)
+
+    # Colunas novas mudam o índice; muitos blocos tornam a consolidação cara
+    colunas_atuais = sessao['planilhas'][nome_planilha][nome_aba].columns
+    if not df_novos.columns.difference(colunas_atuais).empty or len(blocos) >= LIMITE_BLOCOS_PENDENTES:
+        obter_aba(sessao, nome_planilha, nome_aba)
+
+
+def obter_aba(sessao, nome_planilha, nome_aba):
+    """Retorna o DataFrame atualizado de uma aba, juntando os blocos pendentes em um só concat"""
+    planilhas = sessao['planilhas']
+    df_atual = planilhas[nome_planilha][nome_aba]
+    blocos = sessao.get('blocos_pendentes', {}).pop((nome_planilha, nome_aba), None)
+    if not blocos:
+        return df_atual
+
+    df_atualizado = pd.concat([df_atual] + blocos, ignore_index=True)
+    restaurar_tipos(df_atualizado, df_atual.dtypes)
+    planilhas[nome_planilha][nome_aba] = df_atualizado
+
+    indice = sessao.get('indice_indicadores')
+    if indice is None:
+        return df_atualizado
+
+    # Trocar a referência na visão processada, se esta for a aba visível do setor
+    setor = indice.setor_da_planilha(nome_planilha) or SETOR_PADRAO
+    abas_setor = sessao['dados_processados'].setdefault(setor, {})
+    if abas_setor.get(nome_aba) is df_atual:
+        abas_setor[nome_aba] = df_atualizado
+
+    # Sem colunas novas o índice continua válido
+    if not df_atualizado.columns.equals(df_atual.columns):
+        indice.adicionar(setor, nome_planilha, nome_aba, df_atualizado)
+
+    return df_atualizado
+
+
+def contar_abas_pendentes(sessao):
+    """Número de abas com blocos anexados ainda não consolidados; diminui quando uma leitura os consolida"""
+    return len(sessao.get('blocos_pendentes', {}))
+
+
+def consolidar_sessao(sessao):
+    """Consolida os blocos pendentes de todas as abas da sessão"""
+    for nome_planilha, nome_aba in list(sessao.get('blocos_pendentes', {})):
+        obter_aba(sessao, nome_planilha, nome_aba)
+
+
+def descartar_blocos_planilha(sessao, nome_planilha):
+    """Descarta os blocos pendentes de uma planilha que foi recarregada"""
+    blocos_pendentes = sessao.get('blocos_pendentes', {})
+    for chave in [chave for chave in blocos_pendentes if chave[0] == nome_planilha]:
+        del blocos_pendentes[chave]
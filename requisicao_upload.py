@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Requisição do Flask com uso de memória limitado para arquivos enviados
+
+Cada arquivo do formulário fica em memória só até MEMORIA_UPLOAD_PADRAO bytes
+(ou app.config['UPLOAD_MEMORIA_MAXIMA']); acima disso passa para um arquivo
+temporário em disco. Assim o limite de tamanho do upload (MAX_CONTENT_LENGTH)
+deixa de depender da memória disponível.
+"""
+
+from tempfile import SpooledTemporaryFile
+from flask import Request, current_app
+
+MEMORIA_UPLOAD_PADRAO = 1024 * 1024  # 1MB por arquivo em memória
+LIMITE_UPLOAD_PADRAO = 256  # MB
+
+
+class RequisicaoUpload(Request):
+    """Request que guarda os arquivos enviados em SpooledTemporaryFile com limite configurável"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        return SpooledTemporaryFile(
+            max_size=config.get('UPLOAD_MEMORIA_MAXIMA', MEMORIA_UPLOAD_PADRAO),
+            mode='rb+',
+            dir=config.get('UPLOAD_TEMP_DIR')
+        )
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Inicia o dashboard em produção com vários processos (gunicorn)
+
+Uso:
+    python servidor.py [arquivo_config.json]
+
+As opções podem vir de um arquivo JSON e ser sobrescritas por variáveis
+de ambiente DASHBOARD_* (ex.: DASHBOARD_WORKERS=8).
+"""
+
+import os
+import sys
+import json
+import multiprocessing
+from wsgi import criar_app, importar_variante
+
+# Configuração padrão do servidor
+CONFIG_PADRAO = {
+    'app': 'supabase',
+    'host': '0.0.0.0',
+    'porta': 5000,
+    'workers': multiprocessing.cpu_count() * 2 + 1,
+    'threads': 1,
+    'timeout': 120,
+    'sessao_backend': 'sqlite',
+    'inicializar_banco': True
+}
+
+# Variáveis de ambiente que sobrescrevem a configuração
+VARIAVEIS_AMBIENTE = {
+    'app': ('DASHBOARD_APP', str),
+    'host': ('DASHBOARD_HOST', str),
+    'porta': ('DASHBOARD_PORTA', int),
+    'workers': ('DASHBOARD_WORKERS', int),
+    'threads': ('DASHBOARD_THREADS', int),
+    'timeout': ('DASHBOARD_TIMEOUT', int),
+    'sessao_backend': ('DASHBOARD_SESSAO_BACKEND', str),
+    'inicializar_banco': ('DASHBOARD_INICIALIZAR_BANCO', lambda valor: valor.lower() == 'true')
+}
+
+
+def carregar_config(caminho=None):
+    """Combina a configuração padrão, o arquivo JSON e as variáveis de ambiente"""
+    config = dict(CONFIG_PADRAO)
+
+    if caminho:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+
+    for chave, (variavel, conversor) in VARIAVEIS_AMBIENTE.items():
+        if variavel in os.environ:
+            config[chave] = conversor(os.environ[variavel])
+
+    return config
+
+
+def iniciar(config):
+    """Inicia o gunicorn com a configuração informada"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("Erro: o gunicorn não está instalado (pip install gunicorn)")
+        sys.exit(1)
+
+    # Os workers leem as opções de sessão ao criar a aplicação
+    os.environ['DASHBOARD_APP'] = config['app']
+    os.environ['DASHBOARD_SESSAO_BACKEND'] = config['sessao_backend']
+    if 'DASHBOARD_SECRET_KEY' not in os.environ:
+        os.environ['DASHBOARD_SECRET_KEY'] = os.urandom(32).hex()
+
+    def ao_iniciar_worker(worker):
+        # Cada worker garante os cadastros padrão (a inicialização é idempotente) e já carrega o seu catálogo
+        if not config['inicializar_banco']:
+            return
+        modulo = importar_variante(config['app'])
+        if hasattr(modulo, 'inicializar_banco_dados'):
+            try:
+                modulo.inicializar_banco_dados()
+            except Exception as e:
+                print(f"Erro ao inicializar banco de dados: {str(e)}")
+
+    class ServidorDashboard(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{config['host']}:{config['porta']}")
+            self.cfg.set('workers', config['workers'])
+            self.cfg.set('threads', config['threads'])
+            self.cfg.set('timeout', config['timeout'])
+            self.cfg.set('post_worker_init', ao_iniciar_worker)
+
+        def load(self):
+            return criar_app(config['app'])
+
+    print(f"Iniciando dashboard '{config['app']}' em {config['host']}:{config['porta']} "
+          f"com {config['workers']} worker(s) e sessões '{config['sessao_backend']}'")
+    ServidorDashboard().run()
+
+
+if __name__ == '__main__':
+    iniciar(carregar_config(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,53 @@
+-- Agregados de cada indicador por mês, trimestre e ano (agregados.py).
+-- A visão do setor (/visao_setor) lê esta tabela em vez dos valores brutos.
+-- O app Supabase chama atualizar_agregados via RPC depois de cada gravação;
+-- é o equivalente de agregados.SQL_ATUALIZAR_AGREGADOS, usado no app PostgreSQL.
+--
+-- p_desde: recalcula só os períodos a partir do período desta data; null recalcula tudo
+-- atingimento: último valor do período sobre a meta desse valor, em %
+
+CREATE TABLE IF NOT EXISTS agregados_indicadores (
+    indicador_id integer NOT NULL REFERENCES indicadores (id),
+    periodo text NOT NULL,
+    inicio timestamp NOT NULL,
+    ultimo double precision,
+    media double precision,
+    minimo double precision,
+    maximo double precision,
+    meta double precision,
+    atingimento double precision,
+    quantidade integer NOT NULL,
+    PRIMARY KEY (indicador_id, periodo, inicio)
+);
+
+CREATE OR REPLACE FUNCTION atualizar_agregados(p_indicador_id integer, p_desde timestamp DEFAULT NULL)
+RETURNS void
+LANGUAGE sql VOLATILE
+AS $$
+    INSERT INTO agregados_indicadores
+        (indicador_id, periodo, inicio, ultimo, media, minimo, maximo, meta, atingimento, quantidade)
+    SELECT p_indicador_id, p.periodo, a.inicio, a.ultimo, a.media, a.minimo, a.maximo, a.meta,
+           CASE WHEN a.meta <> 0 THEN a.ultimo / a.meta * 100 END, a.quantidade
+    FROM (VALUES ('mes', 'month'), ('trimestre', 'quarter'), ('ano', 'year')) AS p (periodo, unidade)
+    CROSS JOIN LATERAL (
+        SELECT date_trunc(p.unidade, v.data) AS inicio,
+               (array_agg(v.valor ORDER BY v.data DESC))[1] AS ultimo,
+               avg(v.valor) AS media,
+               min(v.valor) AS minimo,
+               max(v.valor) AS maximo,
+               (array_agg(v.meta ORDER BY v.data DESC))[1] AS meta,
+               count(*) AS quantidade
+        FROM valores_indicadores v
+        WHERE v.indicador_id = p_indicador_id
+          AND (p_desde IS NULL OR v.data >= date_trunc(p.unidade, p_desde))
+        GROUP BY 1
+    ) AS a
+    ON CONFLICT (indicador_id, periodo, inicio) DO UPDATE SET
+        ultimo = EXCLUDED.ultimo,
+        media = EXCLUDED.media,
+        minimo = EXCLUDED.minimo,
+        maximo = EXCLUDED.maximo,
+        meta = EXCLUDED.meta,
+        atingimento = EXCLUDED.atingimento,
+        quantidade = EXCLUDED.quantidade;
+$$;
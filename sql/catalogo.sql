@@ -0,0 +1,8 @@
+-- Um indicador por nome em cada setor. É o alvo do upsert usado pelo catálogo
+-- (catalogo.py) para criar indicadores sem consultar antes:
+--   INSERT ... ON CONFLICT (setor_id, nome), ou on_conflict=setor_id,nome no Supabase.
+--
+-- A criação falha se já houver indicadores repetidos; eles precisam ser unificados antes.
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_indicadores_setor_nome
+    ON indicadores (setor_id, nome);
@@ -0,0 +1,76 @@
+-- Série de valores de um indicador, com filtro, agregação e paginação no banco.
+-- Chamada pelo app Supabase via RPC (supabase.rpc('consultar_serie', {...}));
+-- é o equivalente de consulta_series.montar_sql_serie, usado no app PostgreSQL.
+--
+-- p_periodo: 'mes', 'trimestre', 'ano' ou null (pontos originais)
+-- p_funcao: 'media', 'soma', 'minimo', 'maximo' ou 'ultimo' (com p_periodo)
+-- p_ultimos: mantém só os N pontos mais recentes, antes da paginação
+-- total: quantidade de pontos da série inteira, para a paginação; numa página
+--        além do fim, vem uma única linha com data nula e o total
+
+-- A consulta usa o índice único em (indicador_id, data) de sql/valores_indicadores_unicos.sql.
+
+CREATE OR REPLACE FUNCTION consultar_serie(
+    p_indicador_id integer,
+    p_periodo text DEFAULT NULL,
+    p_funcao text DEFAULT 'media',
+    p_data_inicio timestamp DEFAULT NULL,
+    p_data_fim timestamp DEFAULT NULL,
+    p_ultimos integer DEFAULT NULL,
+    p_limite integer DEFAULT 500,
+    p_deslocamento integer DEFAULT 0
+)
+RETURNS TABLE (data timestamp, valor double precision, meta double precision, quantidade bigint, total bigint)
+LANGUAGE sql STABLE
+AS $$
+    WITH filtrados AS (
+        SELECT v.data, v.valor, v.meta
+        FROM valores_indicadores v
+        WHERE v.indicador_id = p_indicador_id
+          AND (p_data_inicio IS NULL OR v.data >= p_data_inicio)
+          AND (p_data_fim IS NULL OR v.data <= p_data_fim)
+    ),
+    pontos AS (
+        SELECT f.data, f.valor, f.meta, 1::bigint AS quantidade
+        FROM filtrados f
+        WHERE p_periodo IS NULL
+        UNION ALL
+        SELECT date_trunc(CASE p_periodo WHEN 'mes' THEN 'month' WHEN 'trimestre' THEN 'quarter' ELSE 'year' END, f.data),
+               CASE p_funcao
+                   WHEN 'soma' THEN sum(f.valor)
+                   WHEN 'minimo' THEN min(f.valor)
+                   WHEN 'maximo' THEN max(f.valor)
+                   WHEN 'ultimo' THEN (array_agg(f.valor ORDER BY f.data DESC))[1]
+                   ELSE avg(f.valor)
+               END,
+               CASE p_funcao
+                   WHEN 'soma' THEN sum(f.meta)
+                   WHEN 'minimo' THEN min(f.meta)
+                   WHEN 'maximo' THEN max(f.meta)
+                   WHEN 'ultimo' THEN (array_agg(f.meta ORDER BY f.data DESC))[1]
+                   ELSE avg(f.meta)
+               END,
+               count(*)
+        FROM filtrados f
+        WHERE p_periodo IS NOT NULL
+        GROUP BY 1
+    ),
+    selecionados AS (
+        SELECT p.* FROM pontos p
+        ORDER BY p.data DESC
+        LIMIT p_ultimos  -- LIMIT NULL não limita
+    ),
+    contagem AS (
+        SELECT count(*) AS total FROM selecionados
+    ),
+    pagina AS (
+        SELECT s.* FROM selecionados s
+        ORDER BY s.data
+        LIMIT p_limite OFFSET p_deslocamento
+    )
+    -- O total é contado antes da paginação e sai mesmo quando a página está vazia
+    SELECT pg.data, pg.valor, pg.meta, pg.quantidade, c.total
+    FROM contagem c
+    LEFT JOIN pagina pg ON true
+    ORDER BY pg.data;
+$$;
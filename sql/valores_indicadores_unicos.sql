@@ -0,0 +1,18 @@
+-- Um valor por indicador e data. É o alvo do upsert da migração incremental
+-- (ON CONFLICT (indicador_id, data), ou on_conflict=indicador_id,data no Supabase)
+-- e atende a consulta da data mais recente de cada indicador e as consultas de série.
+--
+-- Migrações antigas podem ter gravado a mesma data mais de uma vez; fica a linha
+-- gravada por último (maior id).
+
+DELETE FROM valores_indicadores a
+USING valores_indicadores b
+WHERE a.indicador_id = b.indicador_id
+  AND a.data = b.data
+  AND a.id < b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_valores_indicadores_indicador_data
+    ON valores_indicadores (indicador_id, data);
+
+-- Substituído pelo índice único acima
+DROP INDEX IF EXISTS ix_valores_indicadores_indicador_data;
@@ -5,6 +5,7 @@ let loadingModal;
 let successModal;
 let errorModal;
 let currentView = 'visualizacao'; // visualizacao, preenchimento, analise
+let graficoAtual = null; // Instância do Chart.js exibida no dashboard
 
 // Dados para armazenar informações do indicador selecionado para preenchimento
 let indicadorPreenchimento = {
@@ -28,6 +29,7 @@ $(document).ready(function() {
     // Event listeners para visualização
     $('#select-setor').change(carregarIndicadores);
     $('#btn-atualizar').click(atualizarDashboard);
+    $('#btn-exportar-grafico').click(exportarGrafico);
     $('#upload-form').submit(uploadPlanilha);
     
     // Event listeners para navegação entre abas
@@ -160,7 +162,8 @@ function atualizarDashboard() {
             setor: setor, 
             indicador: indicador,
             tipo_grafico: tipoGrafico,
-            mostrar_tendencia: mostrarTendencia
+            mostrar_tendencia: mostrarTendencia,
+            modo: 'dados'
         },
         success: function(response) {
             // Esconder modal de carregamento
@@ -173,8 +176,8 @@ function atualizarDashboard() {
                 // Aplicar formatação condicional para valores numéricos
                 aplicarFormatacaoCondicional();
                 
-                // Atualizar gráfico
-                $('#grafico-container').html(`<img src="${response.grafico_base64}" alt="Gráfico de ${indicador}" class="img-fluid">`);
+                // Desenhar o gráfico no navegador a partir das séries
+                desenharGrafico(response.series, indicador);
             } else {
                 // Exibir mensagem de erro
                 $('#tabela-container').html(`<div class="alert alert-danger">${response.error}</div>`);
@@ -193,6 +196,105 @@ function atualizarDashboard() {
     });
 }
 
+// Função para desenhar o gráfico no navegador com as séries retornadas pelo servidor
+function desenharGrafico(series, titulo) {
+    // Descartar o gráfico anterior
+    if (graficoAtual) {
+        graficoAtual.destroy();
+        graficoAtual = null;
+    }
+    
+    if (!series) {
+        $('#grafico-container').html('<div class="alert alert-warning">Não foram encontrados dados numéricos para gerar o gráfico</div>');
+        return;
+    }
+    
+    $('#grafico-container').html('<canvas id="grafico-canvas"></canvas>');
+    
+    // Formatar datas ISO do eixo x
+    const rotulos = series.x.map(function(valor) {
+        if (typeof valor === 'string' && /^\d{4}-\d{2}-\d{2}T/.test(valor)) {
+            return new Date(valor).toLocaleDateString('pt-BR');
+        }
+        return valor;
+    });
+    
+    const datasets = series.colunas.map(function(coluna, i) {
+        return {
+            label: coluna,
+            data: series.valores[i],
+            fill: false
+        };
+    });
+    
+    // Linhas de tendência a partir dos coeficientes calculados no servidor
+    if (series.tendencias) {
+        series.tendencias.forEach(function(coeficientes, i) {
+            if (!coeficientes) {
+                return;
+            }
+            datasets.push({
+                label: `Tendência (${series.colunas[i]})`,
+                data: rotulos.map(function(_, x) { return coeficientes[0] * x + coeficientes[1]; }),
+                borderColor: 'rgba(255, 0, 0, 0.5)',
+                borderDash: [6, 4],
+                pointRadius: 0,
+                fill: false
+            });
+        });
+    }
+    
+    const tipos = { linha: 'line', barra: 'bar', pizza: 'pie' };
+    
+    graficoAtual = new Chart(document.getElementById('grafico-canvas'), {
+        type: tipos[series.tipo_grafico] || 'line',
+        data: {
+            labels: rotulos,
+            datasets: datasets
+        },
+        options: {
+            responsive: true,
+            plugins: {
+                title: { display: true, text: titulo }
+            }
+        }
+    });
+}
+
+// Função para exportar o gráfico como imagem PNG renderizada no servidor
+function exportarGrafico() {
+    const setor = $('#select-setor').val();
+    const indicador = $('#select-indicador').val();
+    
+    if (!setor || !indicador) {
+        mostrarErro('Por favor, selecione um setor e um indicador.');
+        return;
+    }
+    
+    $.ajax({
+        url: '/get_dados',
+        type: 'GET',
+        data: {
+            setor: setor,
+            indicador: indicador,
+            tipo_grafico: $('input[name="tipo-grafico"]:checked').val(),
+            mostrar_tendencia: $('#check-tendencia').is(':checked'),
+            modo: 'imagem'
+        },
+        success: function(response) {
+            if (response.success) {
+                window.open(response.grafico_url, '_blank');
+            } else {
+                mostrarErro(response.error);
+            }
+        },
+        error: function(xhr, status, error) {
+            mostrarErro(`Erro ao exportar gráfico: ${error}`);
+            console.error(error);
+        }
+    });
+}
+
 // Função para aplicar formatação condicional na tabela
 function aplicarFormatacaoCondicional() {
     // Selecionar todas as células da tabela
@@ -211,35 +313,36 @@ function aplicarFormatacaoCondicional() {
     });
 }
 
-// Função para upload de planilha
+// Função para upload de planilhas (uma ou várias, ou um .zip com planilhas)
 function uploadPlanilha(e) {
     e.preventDefault();
     
-    // Verificar se um arquivo foi selecionado
+    // Verificar se algum arquivo foi selecionado
     const fileInput = $('#file-input')[0];
     if (fileInput.files.length === 0) {
         mostrarErro('Por favor, selecione um arquivo para upload.');
         return;
     }
     
-    // Verificar se o arquivo é uma planilha Excel
-    const file = fileInput.files[0];
-    if (!file.name.endsWith('.xlsx') && !file.name.endsWith('.xls')) {
-        mostrarErro('Por favor, selecione um arquivo Excel (.xlsx ou .xls).');
+    // Verificar se os arquivos são planilhas Excel ou arquivos .zip
+    const files = Array.from(fileInput.files);
+    const invalidos = files.filter(file => !/\.(xlsx|xls|zip)$/i.test(file.name));
+    if (invalidos.length > 0) {
+        mostrarErro(`Por favor, selecione arquivos Excel (.xlsx ou .xls) ou .zip: ${invalidos.map(file => file.name).join(', ')}`);
         return;
     }
     
     // Mostrar modal de carregamento
     loadingModal.show();
-    $('#loading-message').text('Enviando arquivo, por favor aguarde...');
+    $('#loading-message').text(`Enviando ${files.length} arquivo(s), por favor aguarde...`);
     
-    // Criar FormData para envio do arquivo
+    // Criar FormData com todos os arquivos
     const formData = new FormData();
-    formData.append('file', file);
+    files.forEach(file => formData.append('files', file));
     
-    // Fazer requisição AJAX para upload do arquivo
+    // Fazer requisição AJAX para upload dos arquivos
     $.ajax({
-        url: '/upload',
+        url: '/upload_lote',
         type: 'POST',
         data: formData,
         processData: false,
@@ -248,6 +351,15 @@ function uploadPlanilha(e) {
             // Esconder modal de carregamento
             loadingModal.hide();
             
+            // Resumo por arquivo
+            const falhas = (response.arquivos || []).filter(arquivo => !arquivo.success);
+            const detalhesFalhas = falhas.map(arquivo => `${arquivo.arquivo}: ${arquivo.error}`).join('; ');
+            (response.arquivos || []).forEach(arquivo => {
+                if (arquivo.success) {
+                    console.log(`${arquivo.arquivo}: ${arquivo.origem}, ${arquivo.tempo_ms} ms`);
+                }
+            });
+            
             if (response.success) {
                 // Atualizar status de upload
                 $('#planilhas-carregadas').text(
@@ -260,19 +372,24 @@ function uploadPlanilha(e) {
                 // Recarregar indicadores
                 carregarIndicadores();
                 
-                // Exibir mensagem de sucesso
-                mostrarSucesso(response.message);
+                // Exibir mensagem de sucesso (e os arquivos que falharam, se houver)
+                if (falhas.length > 0) {
+                    mostrarErro(`${response.message}. Falhas: ${detalhesFalhas}`);
+                } else {
+                    mostrarSucesso(`${response.message} em ${(response.tempo_total_ms / 1000).toFixed(1)} s`);
+                }
             } else {
                 // Exibir mensagem de erro
-                mostrarErro(response.error);
+                mostrarErro(detalhesFalhas ? `${response.error}. ${detalhesFalhas}` : response.error);
             }
         },
         error: function(xhr, status, error) {
             // Esconder modal de carregamento
             loadingModal.hide();
             
-            // Exibir mensagem de erro
-            mostrarErro(`Erro ao fazer upload do arquivo: ${error}`);
+            // Exibir mensagem de erro (o servidor explica, por exemplo, o limite de tamanho)
+            const mensagem = xhr.responseJSON && xhr.responseJSON.error ? xhr.responseJSON.error : error;
+            mostrarErro(`Erro ao fazer upload dos arquivos: ${mensagem}`);
             console.error(error);
         }
     });
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Fila de tarefas de migração das planilhas para o banco de dados
+
+Cada tarefa é registrada em uma tabela SQLite local, com uma linha por aba, e
+as planilhas são guardadas em disco. Assim a migração roda fora da requisição
+e, se o processo cair, pode ser retomada a partir das abas não concluídas (e da
+última linha enviada de cada uma).
+"""
+
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS_MIGRACAO_PADRAO = 1
+
+
+def _inicio_processo(pid):
+    """Instante de início do processo (em ticks desde o boot, de /proc), ou None se não estiver disponível
+
+    Junto com o pid identifica o processo: um pid reaproveitado por outro
+    processo tem outro instante de início.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            campos = f.read().rsplit(b')', 1)[1].split()
+        return int(campos[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _processo_ativo(pid, inicio=None):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    if inicio is not None:
+        atual = _inicio_processo(pid)
+        if atual is not None and atual != inicio:
+            return False
+    return True
+
+
+class FilaMigracao:
+    """Executa migrações em threads de fundo, com progresso persistido por aba
+
+    funcao_migrar(planilhas, progresso=..., inicio_por_aba=..., propagar_erros=True)
+    é chamada uma vez por aba, e deve levantar exceção em caso de falha.
+    """
+
+    def __init__(self, caminho, funcao_migrar, max_workers=WORKERS_MIGRACAO_PADRAO):
+        self.caminho = caminho
+        self.funcao_migrar = funcao_migrar
+        self.max_workers = max_workers
+        self.diretorio_dados = os.path.join(os.path.dirname(os.path.abspath(caminho)), 'tarefas_migracao')
+        os.makedirs(self.diretorio_dados, exist_ok=True)
+        self._trava = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pid_inicio = None
+
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    pid INTEGER,
+                    pid_inicio INTEGER,
+                    criada_em REAL NOT NULL,
+                    iniciada_em REAL,
+                    concluida_em REAL,
+                    erro TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS abas_tarefa (
+                    tarefa_id TEXT NOT NULL,
+                    ordem INTEGER NOT NULL,
+                    planilha TEXT NOT NULL,
+                    aba TEXT NOT NULL,
+                    linhas INTEGER NOT NULL,
+                    linhas_enviadas INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    erro TEXT,
+                    PRIMARY KEY (tarefa_id, ordem)
+                )
+            """)
+            # Bancos criados antes da coluna pid_inicio
+            colunas = [coluna[1] for coluna in conn.execute('PRAGMA table_info(tarefas)')]
+            if 'pid_inicio' not in colunas:
+                conn.execute('ALTER TABLE tarefas ADD COLUMN pid_inicio INTEGER')
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _arquivo_dados(self, tarefa_id):
+        return os.path.join(self.diretorio_dados, f"{tarefa_id}.pkl")
+
+    def _obter_executor(self):
+        """Um pool de threads por processo (threads não sobrevivem a um fork)"""
+        with self._trava:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pid_inicio = _inicio_processo(self._pid)
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='migracao')
+                self._marcar_interrompidas()
+            return self._executor
+
+    def _marcar_interrompidas(self, tarefa_id=None):
+        """Tarefas cujo processo não existe mais (ou cujo pid é de outro processo) ficam disponíveis para retomada
+
+        Sem tarefa_id, verifica todas as tarefas pendentes ou em execução.
+        """
+        with self._conectar() as conn:
+            consulta = "SELECT id, pid, pid_inicio FROM tarefas WHERE status IN ('pendente', 'executando')"
+            parametros = ()
+            if tarefa_id is not None:
+                consulta += ' AND id = ?'
+                parametros = (tarefa_id,)
+            for id_tarefa, pid, pid_inicio in conn.execute(consulta, parametros).fetchall():
+                if pid is None or not _processo_ativo(pid, pid_inicio):
+                    # Só se outro processo não retomou a tarefa nesse meio tempo
+                    conn.execute(
+                        "UPDATE tarefas SET status = 'interrompida' WHERE id = ? AND pid IS ? "
+                        "AND status IN ('pendente', 'executando')",
+                        (id_tarefa, pid)
+                    )
+
+    def criar(self, planilhas):
+        """Registra uma migração e a coloca na fila; retorna o id da tarefa"""
+        executor = self._obter_executor()
+        tarefa_id = uuid.uuid4().hex
+
+        with open(self._arquivo_dados(tarefa_id), 'wb') as f:
+            pickle.dump(planilhas, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        abas = [
+            (tarefa_id, ordem, nome_planilha, nome_aba, len(df), 'pendente')
+            for ordem, (nome_planilha, nome_aba, df) in enumerate(
+                (nome_planilha, nome_aba, df)
+                for nome_planilha, abas_planilha in planilhas.items()
+                for nome_aba, df in abas_planilha.items()
+            )
+        ]
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO tarefas (id, status, pid, pid_inicio, criada_em) VALUES (?, 'pendente', ?, ?, ?)",
+                (tarefa_id, os.getpid(), self._pid_inicio, time.time())
+            )
+            conn.executemany(
+                'INSERT INTO abas_tarefa (tarefa_id, ordem, planilha, aba, linhas, status) VALUES (?, ?, ?, ?, ?, ?)',
+                abas
+            )
+
+        executor.submit(self._executar, tarefa_id)
+        return tarefa_id
+
+    def retomar(self, tarefa_id):
+        """Recoloca na fila uma tarefa interrompida ou com erro; retorna False se não for possível"""
+        executor = self._obter_executor()
+        if not os.path.exists(self._arquivo_dados(tarefa_id)):
+            return False
+
+        # A tarefa pode ter ficado como pendente ou em execução num processo que já caiu
+        self._marcar_interrompidas(tarefa_id)
+        with self._conectar() as conn:
+            cursor = conn.execute(
+                "UPDATE tarefas SET status = 'pendente', pid = ?, pid_inicio = ?, erro = NULL "
+                "WHERE id = ? AND status IN ('interrompida', 'erro')",
+                (os.getpid(), self._pid_inicio, tarefa_id)
+            )
+            if cursor.rowcount == 0:
+                return False
+
+        executor.submit(self._executar, tarefa_id)
+        return True
+
+    def _executar(self, tarefa_id):
+        try:
+            with open(self._arquivo_dados(tarefa_id), 'rb') as f:
+                planilhas = pickle.load(f)
+
+            with self._conectar() as conn:
+                conn.execute(
+                    "UPDATE tarefas SET status = 'executando', pid = ?, pid_inicio = ?, "
+                    "iniciada_em = COALESCE(iniciada_em, ?) WHERE id = ?",
+                    (os.getpid(), self._pid_inicio, time.time(), tarefa_id)
+                )
+                abas = conn.execute(
+                    "SELECT ordem, planilha, aba, linhas_enviadas FROM abas_tarefa "
+                    "WHERE tarefa_id = ? AND status != 'concluida' ORDER BY ordem",
+                    (tarefa_id,)
+                ).fetchall()
+
+            erros = 0
+            for ordem, nome_planilha, nome_aba, linhas_enviadas in abas:
+                if not self._migrar_aba(tarefa_id, ordem, nome_planilha, nome_aba,
+                                        planilhas[nome_planilha][nome_aba], linhas_enviadas):
+                    erros += 1
+
+            status = 'erro' if erros else 'concluida'
+            with self._conectar() as conn:
+                conn.execute(
+                    'UPDATE tarefas SET status = ?, concluida_em = ?, erro = ? WHERE id = ?',
+                    (status, time.time(), f"{erros} aba(s) com erro" if erros else None, tarefa_id)
+                )
+
+            if not erros:
+                os.remove(self._arquivo_dados(tarefa_id))
+        except Exception as e:
+            print(f"Erro na tarefa de migração {tarefa_id}: {str(e)}")
+            with self._conectar() as conn:
+                conn.execute(
+                    "UPDATE tarefas SET status = 'erro', concluida_em = ?, erro = ? WHERE id = ?",
+                    (time.time(), str(e), tarefa_id)
+                )
+
+    def _migrar_aba(self, tarefa_id, ordem, nome_planilha, nome_aba, df, linhas_enviadas):
+        # linhas começa como o tamanho da aba; no modo incremental, o total informado
+        # pela migração (só as linhas novas, mais as já enviadas) o substitui
+        informado = []
+
+        def progresso(enviadas, total, planilha, aba):
+            informado.append(total)
+            with self._conectar() as conn:
+                conn.execute(
+                    'UPDATE abas_tarefa SET linhas_enviadas = ?, linhas = ? WHERE tarefa_id = ? AND ordem = ?',
+                    (enviadas, total, tarefa_id, ordem)
+                )
+
+        try:
+            self.funcao_migrar(
+                {nome_planilha: {nome_aba: df}},
+                progresso=progresso,
+                inicio_por_aba={(nome_planilha, nome_aba): linhas_enviadas},
+                propagar_erros=True
+            )
+        except Exception as e:
+            with self._conectar() as conn:
+                conn.execute(
+                    "UPDATE abas_tarefa SET status = 'erro', erro = ? WHERE tarefa_id = ? AND ordem = ?",
+                    (str(e), tarefa_id, ordem)
+                )
+            return False
+
+        with self._conectar() as conn:
+            if informado:
+                conn.execute(
+                    "UPDATE abas_tarefa SET status = 'concluida', erro = NULL WHERE tarefa_id = ? AND ordem = ?",
+                    (tarefa_id, ordem)
+                )
+            else:
+                # Nada a enviar (aba já migrada, sem setor ou sem colunas reconhecidas): o total é o já enviado
+                conn.execute(
+                    "UPDATE abas_tarefa SET status = 'concluida', erro = NULL, linhas = linhas_enviadas "
+                    "WHERE tarefa_id = ? AND ordem = ?",
+                    (tarefa_id, ordem)
+                )
+        return True
+
+    def status(self, tarefa_id):
+        """Retorna o andamento da tarefa (linhas enviadas, vazão e erros) ou None se não existir"""
+        self._marcar_interrompidas(tarefa_id)
+        with self._conectar() as conn:
+            tarefa = conn.execute(
+                'SELECT status, criada_em, iniciada_em, concluida_em, erro FROM tarefas WHERE id = ?',
+                (tarefa_id,)
+            ).fetchone()
+            if tarefa is None:
+                return None
+            abas = conn.execute(
+                'SELECT planilha, aba, linhas, linhas_enviadas, status, erro FROM abas_tarefa '
+                'WHERE tarefa_id = ? ORDER BY ordem',
+                (tarefa_id,)
+            ).fetchall()
+
+        status, criada_em, iniciada_em, concluida_em, erro = tarefa
+        linhas_enviadas = sum(aba[3] for aba in abas)
+        duracao = ((concluida_em or time.time()) - iniciada_em) if iniciada_em else 0.0
+
+        return {
+            'id': tarefa_id,
+            'status': status,
+            'criada_em': criada_em,
+            'iniciada_em': iniciada_em,
+            'concluida_em': concluida_em,
+            'erro': erro,
+            'linhas_total': sum(aba[2] for aba in abas),
+            'linhas_enviadas': linhas_enviadas,
+            'linhas_por_segundo': round(linhas_enviadas / duracao, 1) if duracao > 0 else 0.0,
+            'abas_concluidas': sum(1 for aba in abas if aba[4] == 'concluida'),
+            'abas_total': len(abas),
+            'abas': [
+                {
+                    'planilha': planilha,
+                    'aba': aba,
+                    'linhas': linhas,
+                    'linhas_enviadas': enviadas,
+                    'status': status_aba,
+                    'erro': erro_aba
+                }
+                for planilha, aba, linhas, enviadas, status_aba, erro_aba in abas
+            ]
+        }
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Testes do AcessoSupabase contra o servidor local (postgrest_local)
+
+Execute com: python -m pytest -q
+"""
+
+import pytest
+from acesso_supabase import AcessoSupabase
+from catalogo import CatalogoIndicadores
+from consulta_series import parametros_serie
+from postgrest_local import iniciar_em_segundo_plano
+
+SETORES = ['Compras', 'Qualidade']
+INDICADORES = {
+    'Compras': ['Saving', 'Lead Time'],
+    'Qualidade': ['Refugo'],
+    'Inexistente': ['Ignorado']
+}
+
+
+@pytest.fixture
+def acesso(tmp_path):
+    servidor, url = iniciar_em_segundo_plano(str(tmp_path / 'postgrest.sqlite'))
+    try:
+        yield AcessoSupabase(url, 'chave-local')
+    finally:
+        servidor.shutdown()
+
+
+@pytest.fixture
+def semeado(acesso):
+    acesso.executar(acesso.semear(SETORES, INDICADORES))
+    return acesso
+
+
+def _catalogo(acesso, **opcoes):
+    return CatalogoIndicadores(
+        lambda: acesso.executar(acesso.carregar_catalogo()),
+        lambda setor_id, nome: acesso.executar(acesso.criar_indicador(setor_id, nome)),
+        **opcoes
+    )
+
+
+def _conteudo(acesso):
+    setores, indicadores = acesso.executar(acesso.carregar_catalogo())
+    return sorted(setores), sorted(indicadores)
+
+
+def test_semear_cadastra_setores_e_indicadores(semeado):
+    setores, indicadores = _conteudo(semeado)
+    assert sorted(nome for _, nome in setores) == SETORES
+    # Indicadores de setores que não existem são ignorados
+    assert sorted(nome for _, nome, _ in indicadores) == ['Lead Time', 'Refugo', 'Saving']
+
+
+def test_semear_de_novo_nao_duplica(semeado):
+    antes = _conteudo(semeado)
+    semeado.executar(semeado.semear(SETORES, INDICADORES))
+    assert _conteudo(semeado) == antes
+
+
+def test_semear_completa_cadastro_parcial(semeado):
+    semeado.executar(semeado.semear(SETORES + ['PCP'], dict(INDICADORES, PCP=['OTD'], Compras=['Saving', 'Estoque'])))
+    setores, indicadores = _conteudo(semeado)
+    assert sorted(nome for _, nome in setores) == ['Compras', 'PCP', 'Qualidade']
+    assert sorted(nome for _, nome, _ in indicadores) == ['Estoque', 'Lead Time', 'OTD', 'Refugo', 'Saving']
+
+
+def test_catalogo_resolve_e_cria_indicadores(semeado):
+    catalogo = _catalogo(semeado)
+    id_saving = catalogo.id_indicador('Compras', 'Saving')
+    assert id_saving is not None
+    assert catalogo.id_indicador('Compras', 'Novo') is None
+    assert catalogo.id_indicador('Setor inexistente', 'Saving', criar=True) is None
+
+    id_novo = catalogo.id_indicador('Compras', 'Novo', criar=True)
+    assert id_novo is not None
+    assert sorted(catalogo.indicadores_do_setor('Compras')) == ['Lead Time', 'Novo', 'Saving']
+
+    # O upsert devolve o mesmo ID se o indicador já existir
+    id_setor = catalogo.id_setor('Compras')
+    assert semeado.executar(semeado.criar_indicador(id_setor, 'Novo')) == id_novo
+    assert _catalogo(semeado).id_indicador('Compras', 'Novo') == id_novo
+
+
+def test_catalogo_recarrega_ao_nao_encontrar(semeado):
+    catalogo = _catalogo(semeado, intervalo_recarga_falha=0)
+    assert catalogo.id_indicador('Compras', 'Criado em outro processo') is None
+    recargas = catalogo.estatisticas()['recargas']
+
+    # Um indicador criado por outro processo aparece sem esperar o TTL
+    id_criado = _catalogo(semeado).id_indicador('Compras', 'Criado em outro processo', criar=True)
+    assert catalogo.id_indicador('Compras', 'Criado em outro processo') == id_criado
+    assert catalogo.estatisticas()['recargas'] == recargas + 1
+
+    # Com a carga recente, nomes inexistentes não recarregam o catálogo a cada consulta
+    catalogo.intervalo_recarga_falha = 60
+    assert catalogo.id_setor('Setor inexistente') is None
+    assert catalogo.estatisticas()['recargas'] == recargas + 1
+
+
+def test_gravar_valores_substitui_a_mesma_data(semeado):
+    id_saving = _catalogo(semeado).id_indicador('Compras', 'Saving')
+    semeado.executar(semeado.gravar_valores([
+        {'indicador_id': id_saving, 'data': '2024-02-10T00:00:00', 'valor': 20.0, 'meta': 25.0},
+        {'indicador_id': id_saving, 'data': '2024-01-10T00:00:00', 'valor': 10.0, 'meta': 25.0}
+    ]))
+    semeado.executar(semeado.salvar_valor(id_saving, '2024-02-10T00:00:00', 22.0, 25.0))
+
+    indicador = semeado.executar(semeado.buscar_indicador('Compras', 'Saving', com_valores=True))
+    assert indicador['id'] == id_saving
+    assert indicador['setor']['nome'] == 'Compras'
+    assert [(valor['data'], valor['valor']) for valor in indicador['valores']] == [
+        ('2024-01-10T00:00:00', 10.0),
+        ('2024-02-10T00:00:00', 22.0)
+    ]
+    assert semeado.executar(semeado.data_mais_recente(id_saving)) == '2024-02-10T00:00:00'
+
+
+def test_buscar_indicador_filtra_pelo_setor(semeado):
+    assert semeado.executar(semeado.buscar_indicador('Qualidade', 'Saving')) is None
+    indicador = semeado.executar(semeado.buscar_indicador('Qualidade', 'Refugo'))
+    assert indicador['nome'] == 'Refugo'
+    assert 'valores' not in indicador
+
+
+def test_consultar_serie_agrega_no_servidor(semeado):
+    id_refugo = _catalogo(semeado).id_indicador('Qualidade', 'Refugo')
+    semeado.executar(semeado.gravar_valores([
+        {'indicador_id': id_refugo, 'data': f'2024-0{mes}-{dia:02d}T00:00:00', 'valor': float(mes * 10 + dia), 'meta': 5.0}
+        for mes in (1, 2) for dia in (1, 15)
+    ]))
+
+    resposta = semeado.executar(semeado.consultar_serie(id_refugo, parametros_serie(periodo='mes', funcao='media')))
+    assert resposta['total'] == 2
+    assert [(ponto['data'], ponto['valor'], ponto['quantidade']) for ponto in resposta['pontos']] == [
+        ('2024-01-01T00:00:00', 18.0, 2),
+        ('2024-02-01T00:00:00', 28.0, 2)
+    ]
+
+    pagina = semeado.executar(semeado.consultar_serie(id_refugo, parametros_serie(tamanho_pagina=3, pagina=2)))
+    assert pagina['total'] == 4
+    assert [ponto['valor'] for ponto in pagina['pontos']] == [35.0]
+
+    # Uma página além do fim não tem pontos, mas mantém o total
+    alem_do_fim = semeado.executar(semeado.consultar_serie(id_refugo, parametros_serie(tamanho_pagina=3, pagina=5)))
+    assert (alem_do_fim['pontos'], alem_do_fim['total'], alem_do_fim['paginas']) == ([], 4, 2)
+
+
+def test_atualizar_agregados_incremental(semeado):
+    id_saving = _catalogo(semeado).id_indicador('Compras', 'Saving')
+    semeado.executar(semeado.gravar_valores([
+        {'indicador_id': id_saving, 'data': '2024-01-10T00:00:00', 'valor': 10.0, 'meta': 20.0},
+        {'indicador_id': id_saving, 'data': '2024-01-20T00:00:00', 'valor': 30.0, 'meta': 20.0}
+    ]))
+    semeado.executar(semeado.atualizar_agregados(id_saving))
+
+    semeado.executar(semeado.salvar_valor(id_saving, '2024-03-05T00:00:00', 5.0, 10.0))
+    semeado.executar(semeado.atualizar_agregados(id_saving, '2024-03-05T00:00:00'))
+
+    meses = semeado.executar(semeado.agregados([id_saving], 'mes'))
+    assert [(linha['inicio'][:10], linha['ultimo'], linha['media'], linha['atingimento']) for linha in meses] == [
+        ('2024-01-01', 30.0, 20.0, 150.0),
+        ('2024-03-01', 5.0, 5.0, 50.0)
+    ]
+
+    # O ano é recalculado a partir de março com todas as linhas do ano
+    (ano,) = semeado.executar(semeado.agregados([id_saving], 'ano'))
+    assert (ano['minimo'], ano['maximo'], ano['quantidade']) == (5.0, 30.0, 3)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Testes da preparação dos valores migrados para o banco
+
+Execute com: python -m pytest -q
+"""
+
+import pandas as pd
+from migracao import preparar_valores, registros_pendentes, inicio_agregados
+
+
+def _aba(datas, valores):
+    return pd.DataFrame({'Data': datas, 'Valor': valores, 'Meta': [10.0] * len(datas)})
+
+
+def test_data_invalida_fica_fora_dos_valores():
+    df_valores = preparar_valores(_aba(['2024-01-10', 'sem data', '2024-03-10'], [1.0, 2.0, 3.0]), 'Data', 'Valor', 'Meta')
+    assert list(df_valores['valor']) == [1.0, 3.0]
+    assert df_valores['data'].max() == pd.Timestamp('2024-03-10')
+
+
+def test_data_invalida_nao_avanca_a_marca():
+    df_valores = preparar_valores(_aba(['2024-01-10', 'sem data', '2024-03-10'], [1.0, 2.0, 3.0]), 'Data', 'Valor', 'Meta')
+    pendentes = registros_pendentes(df_valores, 7)
+    assert [registro['data'] for registro in pendentes] == ['2024-01-10T00:00:00', '2024-03-10T00:00:00']
+
+    # A próxima migração parte da data mais recente gravada, que é a da última linha válida
+    marca = pendentes[-1]['data']
+    nova = preparar_valores(_aba(['2024-01-10', 'sem data', '2024-03-10', '2024-04-10'], [1.0, 2.0, 3.0, 4.0]), 'Data', 'Valor', 'Meta')
+    assert [(registro['data'], registro['valor']) for registro in registros_pendentes(nova, 7, marca)] == [
+        ('2024-04-10T00:00:00', 4.0)
+    ]
+
+
+def test_aba_sem_datas_validas_nao_gera_registros():
+    df_valores = preparar_valores(_aba(['sem data', None], [1.0, 2.0]), 'Data', 'Valor', 'Meta')
+    pendentes = registros_pendentes(df_valores, 7)
+    assert pendentes == []
+    assert inicio_agregados(df_valores, pendentes) is None
+    assert inicio_agregados(df_valores, pendentes, inicio=3) is None
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Normalização dos tipos das abas carregadas para ocupar menos memória na sessão
+
+Todas as conversões são sem perda: uma coluna só muda de tipo se todos os seus
+valores sobreviverem à conversão.
+  - colunas de texto com nome de data ('data', 'mes', 'ano') viram datetime64;
+  - inteiros e floats são reduzidos ao menor tipo que representa os mesmos valores;
+  - textos repetidos viram categorias, quando isso ocupa menos memória.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+from indice_indicadores import normalizar_nome
+
+PALAVRAS_COLUNA_DATA = ('data', 'mes', 'ano')  # As mesmas usadas para o eixo x dos gráficos
+
+
+def _coluna_de_texto(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def _nome_de_data(col):
+    nome = normalizar_nome(col)
+    return any(palavra in nome for palavra in PALAVRAS_COLUNA_DATA)
+
+
+def _converter_datas(serie):
+    """Retorna a coluna como datetime64, ou None se algum valor preenchido não for uma data"""
+    preenchidos = serie.notna()
+    if not preenchidos.any():
+        return None
+
+    # Números soltos (ex.: o ano 2023) seriam lidos como nanossegundos
+    tipos = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipos not in ('string', 'date', 'datetime', 'datetime64', 'mixed'):
+        return None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        try:
+            # ISO (como o formulário envia) primeiro; o restante no padrão brasileiro, dia antes do mês
+            convertida = pd.to_datetime(serie, errors='coerce', format='ISO8601')
+            faltando = preenchidos & convertida.isna()
+            if faltando.any():
+                convertida[faltando] = pd.to_datetime(serie[faltando], errors='coerce', format='mixed', dayfirst=True)
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+    if convertida.notna().sum() != preenchidos.sum():
+        return None
+    return convertida
+
+
+def _reduzir_numeros(serie):
+    """Retorna a coluna no menor tipo numérico com os mesmos valores, ou None se não houver ganho"""
+    if pd.api.types.is_bool_dtype(serie):
+        return None
+
+    if pd.api.types.is_integer_dtype(serie):
+        reduzida = pd.to_numeric(serie, downcast='integer')
+    elif pd.api.types.is_float_dtype(serie):
+        reduzida = serie.astype(np.float32)
+        # Só vale se todos os valores forem representáveis exatamente em float32
+        if not np.array_equal(reduzida.to_numpy(dtype=np.float64), serie.to_numpy(dtype=np.float64), equal_nan=True):
+            return None
+    else:
+        return None
+
+    return reduzida if reduzida.dtype.itemsize < serie.dtype.itemsize else None
+
+
+def _converter_numeros(serie):
+    """Retorna a coluna como número (o formulário envia números como texto), ou None se algum valor não for numérico"""
+    if not pd.api.types.is_numeric_dtype(serie):
+        convertida = pd.to_numeric(serie, errors='coerce')
+        if convertida.notna().sum() != serie.notna().sum():
+            return None
+        serie = convertida
+    reduzida = _reduzir_numeros(serie)
+    return reduzida if reduzida is not None else serie
+
+
+def _categorizar(serie):
+    """Retorna a coluna como categoria, se todos os valores forem textos e ocuparem menos memória assim"""
+    if pd.api.types.infer_dtype(serie, skipna=True) != 'string':
+        return None
+
+    categorizada = serie.astype('category')
+    if categorizada.memory_usage(deep=True, index=False) >= serie.memory_usage(deep=True, index=False):
+        return None
+    return categorizada
+
+
+def normalizar_tipos(df):
+    """Retorna (DataFrame com tipos compactos, bytes economizados)"""
+    antes = int(df.memory_usage(deep=True).sum())
+    colunas = {}
+
+    for posicao, col in enumerate(df.columns):
+        serie = df.iloc[:, posicao]
+        convertida = None
+
+        if _coluna_de_texto(serie):
+            if _nome_de_data(col):
+                convertida = _converter_datas(serie)
+            if convertida is None:
+                convertida = _categorizar(serie)
+        elif pd.api.types.is_numeric_dtype(serie):
+            convertida = _reduzir_numeros(serie)
+
+        if convertida is not None:
+            colunas[posicao] = convertida
+
+    if not colunas:
+        return df, 0
+
+    # Trocar pelas posições, que continuam válidas mesmo com nomes de coluna repetidos
+    df_normalizado = df.copy(deep=False)
+    for posicao, convertida in colunas.items():
+        df_normalizado.isetitem(posicao, convertida)
+
+    return df_normalizado, antes - int(df_normalizado.memory_usage(deep=True).sum())
+
+
+def normalizar_planilha(dados_planilha):
+    """Normaliza todas as abas de uma planilha; retorna (dados, bytes economizados)"""
+    economia = 0
+    dados_normalizados = {}
+    for nome_aba, df in dados_planilha.items():
+        dados_normalizados[nome_aba], economia_aba = normalizar_tipos(df)
+        economia += economia_aba
+    return dados_normalizados, economia
+
+
+def restaurar_tipos(df, tipos_referencia):
+    """Devolve às colunas os tipos compactos que foram perdidos ao anexar linhas
+
+    O concat de categorias diferentes ou de datas com texto resulta em object; a
+    conversão de volta só é feita se for sem perda, como na normalização.
+    """
+    if df.columns.has_duplicates:
+        return df
+
+    for col, tipo in tipos_referencia.items():
+        if col not in df.columns or df[col].dtype == tipo:
+            continue
+
+        serie = df[col]
+        if isinstance(tipo, pd.CategoricalDtype):
+            convertida = _categorizar(serie)
+        elif pd.api.types.is_datetime64_any_dtype(tipo):
+            convertida = _converter_datas(serie)
+        elif pd.api.types.is_numeric_dtype(tipo):
+            convertida = _converter_numeros(serie)
+        else:
+            convertida = None
+
+        if convertida is not None:
+            df[col] = convertida
+    return df
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import importlib
+from armazenamento_sessao import criar_armazenamento_sessao
+
+# Módulo de cada variante do dashboard
+VARIANTES = {
+    'supabase': 'app_supabase',
+    'postgresql': 'app_postgresql',
+    'preenchimento': 'app_preenchimento'
+}
+
+
+def importar_variante(variante):
+    """Importa o módulo da variante do dashboard"""
+    if variante not in VARIANTES:
+        raise ValueError(f"Variante desconhecida: {variante} (opções: {', '.join(VARIANTES)})")
+    return importlib.import_module(VARIANTES[variante])
+
+
+def criar_app(variante=None, config=None):
+    """Cria a aplicação Flask da variante escolhida, pronta para rodar em vários processos
+
+    Uso com o gunicorn: gunicorn -w 4 'wsgi:criar_app()'
+    """
+    variante = variante or os.environ.get('DASHBOARD_APP', 'supabase')
+    modulo = importar_variante(variante)
+    app = modulo.app
+
+    # A chave precisa ser a mesma em todos os processos
+    if os.environ.get('DASHBOARD_SECRET_KEY'):
+        app.config['SECRET_KEY'] = os.environ['DASHBOARD_SECRET_KEY']
+
+    # Sessões em memória do processo não são vistas pelos outros workers
+    app.config['SESSAO_BACKEND'] = os.environ.get('DASHBOARD_SESSAO_BACKEND', 'sqlite')
+
+    if config:
+        app.config.update(config)
+
+    if app.config['SESSAO_BACKEND'] == 'memoria':
+        print("Aviso: sessões em memória não são compartilhadas entre workers")
+
+    modulo.session_store = criar_armazenamento_sessao(
+        app.config['SESSAO_BACKEND'],
+        ttl_segundos=app.config['SESSAO_TTL'],
+        limite_bytes=app.config['SESSAO_LIMITE_BYTES'],
+        limite_sessoes=app.config['SESSAO_LIMITE_SESSOES'],
+        caminho=app.config['SESSAO_ARQUIVO']
+    )
+
+    return app